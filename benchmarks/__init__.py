@@ -0,0 +1,4 @@
+"""
+Micro-benchmarks for the Control Plane.
+Run each module directly, e.g. `python -m benchmarks.bench_middleware`.
+"""
@@ -0,0 +1,102 @@
+"""
+Usage metering and invoice pricing benchmark.
+
+Generates 10M synthetic usage events for a month (orgs, agents, records,
+CPU time), meters a sample through `UsageMeter.record` as run completions
+do, rolls all events into per org/agent/hour aggregates with
+`group_sums`, then prices the month with `price_usage`. The vectorized
+totals are checked against exact Python integer arithmetic.
+
+Usage:
+    python -m benchmarks.bench_billing [--events 10000000] [--orgs 2000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from control_plane.services.billing_service import UsageMeter, group_sums, price_usage
+
+AGENTS = 200
+HOURS = 30 * 24
+METER_SAMPLE = 1_000_000
+
+
+def main(events: int, orgs: int) -> None:
+    rng = np.random.default_rng(7)
+    # Skewed usage: a few orgs and agents account for most runs
+    org_codes = np.minimum(rng.zipf(1.3, events) - 1, orgs - 1).astype(np.int64)
+    agent_codes = np.minimum(rng.zipf(1.2, events) - 1, AGENTS - 1).astype(np.int64)
+    hours = rng.integers(0, HOURS, events, dtype=np.int64)
+    records = rng.integers(0, 20_000, events, dtype=np.int64)
+    cpu_ms = rng.integers(1_000, 7_200_000, events, dtype=np.int64)
+    base_micros = rng.choice([0, 100_000, 500_000, 1_250_000], AGENTS).astype(np.int64)
+
+    meter = UsageMeter()
+    month = datetime(2026, 1, 1)
+    start = time.perf_counter()
+    for index in range(METER_SAMPLE):
+        meter.record(
+            f"org-{org_codes[index]}",
+            f"agent-{agent_codes[index]}",
+            month + timedelta(hours=int(hours[index])),
+            records=int(records[index]),
+            cpu_ms=int(cpu_ms[index]),
+        )
+    elapsed = time.perf_counter() - start
+    print(f"meter.record       {METER_SAMPLE / elapsed:,.0f} events/s "
+          f"({len(meter._pending):,} hourly counters)")
+
+    start = time.perf_counter()
+    keys, runs, hourly_records, hourly_cpu = group_sums(
+        (org_codes * AGENTS + agent_codes) * HOURS + hours,
+        np.ones(events, dtype=np.int64),
+        records,
+        cpu_ms,
+    )
+    rollup_seconds = time.perf_counter() - start
+    print(f"hourly rollup      {events:,} events -> {len(keys):,} rows in {rollup_seconds:.2f}s")
+
+    start = time.perf_counter()
+    line_keys, line_runs, line_records, line_cpu = group_sums(
+        keys // HOURS, runs, hourly_records, hourly_cpu
+    )
+    charges = price_usage(
+        line_runs,
+        line_records,
+        line_cpu,
+        base_micros[line_keys % AGENTS],
+        per_record_micros=1000,
+        cpu_hour_micros=500_000,
+        developer_percent=80,
+    )
+    org_totals = group_sums(line_keys // AGENTS, charges["total_cents"])[1]
+    pricing_seconds = time.perf_counter() - start
+    print(f"month pricing      {len(line_keys):,} lines, {len(org_totals):,} invoices "
+          f"in {pricing_seconds * 1000:.0f} ms")
+
+    # Exact check against Python ints on the first lines
+    for index in range(min(5000, len(line_keys))):
+        base = int(line_runs[index]) * int(base_micros[line_keys[index] % AGENTS])
+        expected = (
+            (base + 5000) // 10_000
+            + (int(line_records[index]) * 1000 + 5000) // 10_000
+            + (int(line_cpu[index]) * 500_000 // 3_600_000 + 5000) // 10_000
+        )
+        assert expected == charges["total_cents"][index], index
+    grand_total = int(charges["total_cents"].sum())
+    developer = int(charges["developer_cents"].sum())
+    platform = int(charges["platform_cents"].sum())
+    assert developer + platform == grand_total
+    print(f"billed             ${grand_total / 100:,.2f} "
+          f"(developers ${developer / 100:,.2f}, platform ${platform / 100:,.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--orgs", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.events, args.orgs)
@@ -0,0 +1,106 @@
+"""
+Agent catalog pagination benchmark.
+
+Seeds a SQLite stand-in with synthetic agents and compares OFFSET
+pagination against the keyset pagination used by `GET /agents`, at
+increasing page depths. Also prints the query plan of the
+category-filtered keyset query so index use can be checked.
+
+Usage:
+    python -m benchmarks.bench_catalog [--rows 100000] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import select, text
+
+from benchmarks.catalog_fixtures import create_catalog
+from control_plane.models import Agent
+from control_plane.schemas import AgentStatus
+from control_plane.services.agent_service import list_published_agents
+
+PAGE_SIZE = 50
+REPEATS = 5
+
+
+async def time_offset_page(session, category, offset) -> float:
+    stmt = select(Agent).where(Agent.status == AgentStatus.PUBLISHED.value)
+    if category is not None:
+        stmt = stmt.where(Agent.category == category)
+    stmt = (
+        stmt.order_by(Agent.category, Agent.rating.desc(), Agent.id.desc())
+        .offset(offset)
+        .limit(PAGE_SIZE)
+    )
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        (await session.execute(stmt)).scalars().all()
+    return (time.perf_counter() - start) / REPEATS
+
+
+async def time_keyset_page(session, category, cursor) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        await list_published_agents(session, category=category, cursor=cursor, limit=PAGE_SIZE)
+    return (time.perf_counter() - start) / REPEATS
+
+
+async def main(rows: int, database_url: str) -> None:
+    print(f"Seeding {rows} agents...")
+    engine, session_maker = await create_catalog(database_url, rows)
+
+    async with session_maker() as session:
+        print(f"{'category':<10}{'offset':>10}{'OFFSET ms':>12}{'keyset ms':>12}")
+        for category in ("finops", None):
+            # Walk the keyset pages once to collect cursors at each depth
+            cursors = {0: None}
+            cursor, page = None, 0
+            while True:
+                _, cursor = await list_published_agents(
+                    session, category=category, cursor=cursor, limit=PAGE_SIZE
+                )
+                page += 1
+                if cursor is None:
+                    break
+                cursors[page * PAGE_SIZE] = cursor
+            depths = sorted(cursors)
+            depths = [depths[0], depths[len(depths) // 4], depths[len(depths) // 2], depths[-1]]
+
+            for depth in depths:
+                offset_ms = await time_offset_page(session, category, depth) * 1000
+                keyset_ms = await time_keyset_page(session, category, cursors[depth]) * 1000
+                print(
+                    f"{category or '(all)':<10}{depth:>10}"
+                    f"{offset_ms:>12.3f}{keyset_ms:>12.3f}"
+                )
+
+        if database_url.startswith("sqlite"):
+            plan = await session.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT * FROM agents "
+                    "WHERE status = 'published' AND category = :category "
+                    "AND (rating, id) < (:rating, :id) "
+                    "ORDER BY category, rating DESC, id DESC LIMIT 51"
+                ),
+                {"category": "finops", "rating": 2.5, "id": rows // 2},
+            )
+            print("Keyset query plan:")
+            for row in plan:
+                print("  ", row[-1])
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    url = args.database_url or "sqlite+aiosqlite:///" + os.path.join(
+        tempfile.gettempdir(), "bench_catalog.db"
+    )
+    asyncio.run(main(args.rows, url))
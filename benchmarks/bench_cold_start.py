@@ -0,0 +1,108 @@
+"""
+Cold start regression benchmark.
+
+Imports `control_plane.main` in fresh interpreters and reports the median
+import time. With `--serve`, it also starts uvicorn and times how long it
+takes for the first `/health` response, which is what a Cloud Run
+instance scaled from zero pays. Exits non-zero when a median is over its
+budget, and prints the slowest modules from `python -X importtime` so
+the regression can be traced.
+
+Usage:
+    python -m benchmarks.bench_cold_start [--runs 5] [--budget 3.0]
+    python -m benchmarks.bench_cold_start --serve [--serve-budget 8.0]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List, Tuple
+
+
+def import_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import control_plane.main"], check=True)
+    return time.perf_counter() - start
+
+
+def first_response_seconds(timeout: float) -> float:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "control_plane.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    response.read()
+                return time.perf_counter() - start
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before serving a request")
+                time.sleep(0.02)
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(limit: int) -> List[Tuple[int, int, str]]:
+    """(self us, cumulative us, module) for the slowest modules by self time."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import control_plane.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(own), int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def check(label: str, samples: List[float], budget: float) -> bool:
+    median = statistics.median(samples)
+    verdict = "ok" if median <= budget else "OVER BUDGET"
+    print(
+        f"{label:<15} median {median:6.3f}s  min {min(samples):6.3f}s  "
+        f"budget {budget:6.3f}s  {verdict}"
+    )
+    return median <= budget
+
+
+def main(runs: int, budget: float, serve: bool, serve_budget: float) -> int:
+    # Profiling mode adds its own overhead; measure the real thing
+    os.environ.pop("CONTROL_PLANE_STARTUP_PROFILE", None)
+    passed = check("import", [import_seconds() for _ in range(runs)], budget)
+    if serve:
+        samples = [first_response_seconds(serve_budget * 3) for _ in range(runs)]
+        passed = check("first response", samples, serve_budget) and passed
+    if not passed:
+        print("\nSlowest imports (ms self, ms cumulative):")
+        for own, cumulative, name in slowest_imports(20):
+            print(f"{own / 1000:9.1f} {cumulative / 1000:9.1f}  {name}")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=3.0, help="Import budget in seconds")
+    parser.add_argument("--serve", action="store_true", help="Also time the first response")
+    parser.add_argument("--serve-budget", type=float, default=8.0)
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.budget, args.serve, args.serve_budget))
@@ -0,0 +1,95 @@
+"""
+Database pool benchmark.
+
+Runs bursts of concurrent read requests, each holding a pooled connection
+for a query plus simulated think time, against SQLite files standing in
+for a primary and a replica. Compares all reads on the primary with reads
+routed through `SessionRouter`, and reports throughput together with the
+checkout wait, pre-ping cost and overflow that the pool instrumentation
+records, which is the data pools are sized from.
+
+Usage:
+    python -m benchmarks.bench_db_pool [--requests 2000] [--concurrency 200]
+        [--pool-size 5] [--hold 0.02]
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from control_plane.database import Replica, SessionRouter, build_engine
+
+
+def sample(name: str, pool: str) -> float:
+    return REGISTRY.get_sample_value(f"control_plane_{name}", {"pool": pool}) or 0.0
+
+
+def report(label: str, pools, elapsed: float, requests: int) -> None:
+    print(f"{label}: {requests / elapsed:8.0f} requests/s")
+    for pool in pools:
+        waits = sample("db_pool_checkout_wait_seconds_count", pool)
+        pings = sample("db_pool_preping_seconds_count", pool)
+        wait_ms = sample("db_pool_checkout_wait_seconds_sum", pool) / max(waits, 1) * 1000
+        ping_ms = sample("db_pool_preping_seconds_sum", pool) / max(pings, 1) * 1000
+        print(
+            f"  {pool:<16} {waits:6.0f} checkouts  mean wait {wait_ms:7.2f} ms  "
+            f"mean pre-ping {ping_ms:6.3f} ms  last overflow {sample('db_pool_overflow', pool):.0f}"
+        )
+
+
+async def burst(open_session, requests: int, concurrency: int, hold: float) -> float:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with gate:
+            async with open_session() as session:
+                await session.execute(text("SELECT 1"))
+                await asyncio.sleep(hold)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start
+
+
+async def main(requests: int, concurrency: int, pool_size: int, hold: float) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        def engine(name: str):
+            url = f"sqlite+aiosqlite:///{os.path.join(directory, name)}.db"
+            return build_engine(url, name, pool_size=pool_size, max_overflow=pool_size)
+
+        primary = engine("bench-primary")
+        primary_sessions = async_sessionmaker(primary, class_=AsyncSession)
+        elapsed = await burst(primary_sessions, requests, concurrency, hold)
+        report("primary only", ["bench-primary"], elapsed, requests)
+
+        routed = engine("bench-routed")
+        replica = Replica("bench-replica", engine("bench-replica"))
+        router = SessionRouter(routed, [replica], max_lag_seconds=5.0)
+        await router.check_lag()
+        # Half the reads go to the replica, the other half stay on the primary
+        sessions = [router.read_session, async_sessionmaker(routed, class_=AsyncSession)]
+        turn = itertools.count()
+        elapsed = await burst(lambda: sessions[next(turn) % 2](), requests, concurrency, hold)
+        report("routed", ["bench-routed", "bench-replica"], elapsed, requests)
+
+        for db_engine in (primary, routed, replica.engine):
+            await db_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument(
+        "--hold", type=float, default=0.02, help="Seconds each request holds its connection"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.pool_size, args.hold))
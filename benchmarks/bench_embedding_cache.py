@@ -0,0 +1,96 @@
+"""
+Embedding cache benchmark.
+
+Replays a scheduled-agent workload: bursts of concurrent embedding
+requests where most texts repeat earlier ones up to whitespace. Runs
+against a fake provider with a fixed per-call latency and reports
+provider calls, batch sizes and latency three ways: cold, warm (LRU),
+and after a restart, when the LRU is empty but the disk store is not.
+
+Usage:
+    python -m benchmarks.bench_embedding_cache [--requests 5000] [--distinct 1000]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from control_plane.services.embedding_cache import EmbeddingCache, FakeEmbedder
+
+DIM = 1536
+
+
+class SlowEmbedder(FakeEmbedder):
+    """Fake provider with a round trip of `latency` seconds per call."""
+
+    def __init__(self, dim: int, latency: float):
+        super().__init__(dim)
+        self.latency = latency
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        await asyncio.sleep(self.latency)
+        return await super().embed(texts)
+
+
+def workload(requests: int, distinct: int) -> List[str]:
+    rng = random.Random(7)
+    texts = [f"Summarize open invoices for customer {n} and flag overdue ones" for n in range(distinct)]
+    # Scheduled agents resend the same inputs with incidental whitespace changes
+    return [
+        rng.choice(["", " ", "\n"]) + rng.choice(texts).replace(" ", rng.choice([" ", "  "]), 1)
+        for _ in range(requests)
+    ]
+
+
+async def run(cache: EmbeddingCache, texts: List[str]) -> List[float]:
+    async def one(text: str) -> float:
+        start = time.perf_counter()
+        await cache.embed([text])
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(one(text) for text in texts))
+
+
+def report(label: str, embedder: SlowEmbedder, latencies: List[float]) -> None:
+    batches = embedder.batches
+    mean_batch = statistics.mean(batches) if batches else 0.0
+    print(
+        f"{label:<8} calls {len(batches):>5}  mean batch {mean_batch:>6.1f}  "
+        f"p50 {statistics.median(latencies):>6.2f} ms  "
+        f"p99 {np.percentile(latencies, 99):>6.2f} ms"
+    )
+    batches.clear()
+
+
+async def main(requests: int, distinct: int, latency: float) -> None:
+    texts = workload(requests, distinct)
+    print(f"{requests} requests, {distinct} distinct texts; without the cache: {requests} calls")
+    with tempfile.TemporaryDirectory() as path:
+        embedder = SlowEmbedder(DIM, latency)
+        cache = EmbeddingCache(embedder, path, lru_size=distinct, batch_window_seconds=0.01, max_batch=256)
+        report("cold", embedder, await run(cache, texts))
+        report("warm", embedder, await run(cache, texts))
+        await cache.close()
+
+        restarted = EmbeddingCache(embedder, path, lru_size=distinct, batch_window_seconds=0.01, max_batch=256)
+        report("restart", embedder, await run(restarted, texts))
+        print(f"disk rows {len(restarted.store)} for {distinct} distinct texts")
+
+        first = await restarted.embed(["  Summarize open invoices for customer 1 and flag overdue ones"])
+        again = await restarted.embed(["Summarize  open invoices for customer 1 and flag overdue ones\n"])
+        print(f"normalized variants equal: {np.array_equal(first, again)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Provider round trip, seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.distinct, args.latency))
@@ -0,0 +1,108 @@
+"""
+Health probe benchmark.
+
+Simulates load balancer probes polling `/health` on one worker: `probers`
+probers each calling every `interval` seconds. The database probe holds a
+connection from a small simulated pool for a round trip, and one
+dependency hangs. Compares probing on every call against `HealthChecker`'s
+cached, single-flight probes, reporting probe response latency and how
+many database queries the probes cost.
+
+Usage:
+    python -m benchmarks.bench_health [--probers 50] [--interval 0.05] [--seconds 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from control_plane.services.health import HealthChecker, LoopLagMonitor, Probe
+
+DB_LATENCY_SECONDS = 0.005
+POOL_SIZE = 5
+TIMEOUT_SECONDS = 0.25
+
+
+class FakeDependencies:
+    """A database behind a bounded pool, a fast cache and a hung service."""
+
+    def __init__(self):
+        self.queries = 0
+        self.pool = asyncio.Semaphore(POOL_SIZE)
+
+    async def database(self) -> None:
+        async with self.pool:
+            self.queries += 1
+            await asyncio.sleep(DB_LATENCY_SECONDS)
+
+    async def cache(self) -> None:
+        await asyncio.sleep(0)
+
+    async def data_plane(self) -> None:
+        await asyncio.sleep(3600)
+
+    def probes(self) -> Dict[str, Probe]:
+        return {"database": self.database, "cache": self.cache, "data_plane": self.data_plane}
+
+
+async def poll(check, probers: int, interval: float, seconds: float) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.monotonic() + seconds
+
+    async def prober(offset: float) -> None:
+        await asyncio.sleep(offset)
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            await check()
+            latencies.append(time.monotonic() - start)
+            await asyncio.sleep(interval)
+
+    await asyncio.gather(*(prober(interval * n / probers) for n in range(probers)))
+    return latencies
+
+
+def report(label: str, latencies: List[float], queries: int, seconds: float) -> None:
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{label:<9} {len(latencies):>6} probes  p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+        f"p99 {p99 * 1000:7.2f} ms  {queries / seconds:8.1f} DB queries/s"
+    )
+
+
+async def main(probers: int, interval: float, seconds: float) -> None:
+    deps = FakeDependencies()
+
+    async def uncached() -> None:
+        # What the endpoint would do without caching: every call probes
+        async def bounded(probe: Probe) -> None:
+            try:
+                await asyncio.wait_for(probe(), TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+        await asyncio.gather(*(bounded(probe) for probe in deps.probes().values()))
+
+    report("uncached", await poll(uncached, probers, interval, seconds), deps.queries, seconds)
+
+    deps = FakeDependencies()
+    checker = HealthChecker(
+        deps.probes(),
+        timeout_seconds=TIMEOUT_SECONDS,
+        cache_seconds=2.0,
+        loop_monitor=LoopLagMonitor(0.5),
+    )
+    report("cached", await poll(checker.check, probers, interval, seconds), deps.queries, seconds)
+    statuses = {name: result.status for name, result in (await checker.check()).items()}
+    print(f"last results: {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--probers", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between probes")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.probers, args.interval, args.seconds))
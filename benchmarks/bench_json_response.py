@@ -0,0 +1,193 @@
+"""
+JSON response benchmark.
+
+Builds and sends the bodies of the catalog, approval queue and task lease
+endpoints from row-like objects, and of a metrics query from its series,
+both the way FastAPI does for a `response_model` (validate, then
+`jsonable_encoder` and `json.dumps`) and through `FastJSONResponse`.
+Reports CPU time per response and bytes encoded per CPU second.
+
+Usage:
+    python -m benchmarks.bench_json_response [--items 100] [--seconds 1]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from control_plane.responses import FastJSONResponse, row_dicts
+from control_plane.schemas import (
+    AgentListResponse,
+    AgentResponse,
+    ApprovalListResponse,
+    ApprovalResponse,
+    TaskLeaseResponse,
+    TaskResponse,
+)
+
+
+def agent_rows(count: int) -> List[Any]:
+    return [
+        SimpleNamespace(
+            id=n, agent_id=f"agent-{n}", name=f"Agent {n}", description="Summarizes tickets " * 8,
+            version="1.2.0", status="published", category="support", tags=["nlp", "support"],
+            rating=4.5, review_count=n, price=9.99, risk_level="low", developer_id=7,
+            created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 6, 1),
+        )
+        for n in range(count)
+    ]
+
+
+def approval_rows(count: int) -> List[Any]:
+    return [
+        SimpleNamespace(
+            approval_id=f"apr-{n}", org_id="org-1", run_id=f"run-{n}", agent_id="agent-1",
+            action="send_email", impact={"recipients": 120, "cost_micros": 4000},
+            status="pending", decided_by=None, decided_at=None, comments=None,
+            created_at=datetime(2024, 1, 1), expires_at=datetime(2024, 1, 2),
+        )
+        for n in range(count)
+    ]
+
+
+def task_rows(count: int) -> List[Any]:
+    return [
+        SimpleNamespace(
+            id=n, run_id=f"run-{n}", org_id="org-1", agent_id="agent-1", deployment_id=None,
+            payload={"input": {"text": "hello " * 20}}, attempts=0,
+            lease_expires_at=datetime(2024, 1, 1),
+        )
+        for n in range(count)
+    ]
+
+
+def metrics_body(points: int) -> dict:
+    return {
+        "metric_name": "latency_ms",
+        "start": 0,
+        "end": points,
+        "step": None,
+        "series": [
+            {
+                "labels": {"route": f"/r{n}"},
+                "timestamps": list(range(points)),
+                "values": [i * 0.37 for i in range(points)],
+            }
+            for n in range(10)
+        ],
+    }
+
+
+async def send_all(response) -> int:
+    sent = 0
+
+    async def send(message) -> None:
+        nonlocal sent
+        sent += len(message.get("body", b""))
+
+    await response({"type": "http"}, None, send)
+    return sent
+
+
+def measure(label: str, build: Callable[[], Any], seconds: float) -> float:
+    loop = asyncio.new_event_loop()
+    calls = sent = 0
+    start = time.process_time()
+    while time.process_time() - start < seconds:
+        sent += loop.run_until_complete(send_all(loop.run_until_complete(build())))
+        calls += 1
+    cpu = time.process_time() - start
+    loop.close()
+    per_call = cpu / calls
+    print(
+        f"  {label:<8} {per_call * 1e6:9.1f} us CPU/response  "
+        f"{sent / cpu / 1e6:8.1f} MB/CPU-s  {sent // calls:>9} bytes"
+    )
+    return per_call
+
+
+def compare(name: str, default, fast, seconds: float) -> None:
+    print(name)
+    slow = measure("default", default, seconds)
+    quick = measure("fast", fast, seconds)
+    print(f"  speedup  {slow / quick:6.1f}x")
+
+
+def main(items: int, seconds: float) -> None:
+    def validated(model):
+        field = create_response_field(name="bench", type_=model)
+
+        async def build(content):
+            body = await serialize_response(field=field, response_content=content, is_coroutine=True)
+            return JSONResponse(body)
+
+        return build
+
+    agents = agent_rows(items)
+    # The catalog page is cached as JSON-compatible dicts, as `list_agents` stores it
+    page = AgentListResponse(
+        items=[AgentResponse.model_validate(agent) for agent in agents]
+    ).model_dump(mode="json")
+    build = validated(AgentListResponse)
+
+    async def fast_page():
+        return FastJSONResponse(page)
+
+    compare("GET /agents (cached page)", lambda: build(page), fast_page, seconds)
+
+    approvals = approval_rows(items)
+    build_approvals = validated(ApprovalListResponse)
+
+    async def default_approvals():
+        return await build_approvals(
+            ApprovalListResponse(
+                approvals=[ApprovalResponse.model_validate(row) for row in approvals],
+                total=items, limit=items, offset=0,
+            )
+        )
+
+    async def fast_approvals():
+        return FastJSONResponse(
+            {"approvals": row_dicts(ApprovalResponse, approvals), "total": items,
+             "limit": items, "offset": 0}
+        )
+
+    compare("GET /orgs/{org_id}/approvals (rows)", default_approvals, fast_approvals, seconds)
+
+    tasks = task_rows(items)
+    build_tasks = validated(TaskLeaseResponse)
+
+    async def default_tasks():
+        return await build_tasks(
+            TaskLeaseResponse(tasks=[TaskResponse.model_validate(row) for row in tasks])
+        )
+
+    async def fast_tasks():
+        return FastJSONResponse({"tasks": row_dicts(TaskResponse, tasks)})
+
+    compare("GET /tasks/next (rows)", default_tasks, fast_tasks, seconds)
+
+    series = metrics_body(items * 50)
+
+    async def default_metrics():
+        return JSONResponse(series)
+
+    async def fast_metrics():
+        return FastJSONResponse(series)
+
+    compare("GET /orgs/{org_id}/metrics (series)", default_metrics, fast_metrics, seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100, help="Rows per list response")
+    parser.add_argument("--seconds", type=float, default=1.0, help="CPU seconds per measurement")
+    args = parser.parse_args()
+    main(args.items, args.seconds)
@@ -0,0 +1,118 @@
+"""
+Lazy session benchmark.
+
+Fires 1k concurrent catalog-style requests at a small pool. A share of
+them miss the cache and run a query; every request then spends time
+serializing and sending its response. Compares:
+
+- eager: a session per request, as `get_session` gives, whose connection
+  is held from the first query until teardown after the response is sent
+- read_only / autocommit: a `LazySession` in that scope, released once
+  the query is done
+
+and reports the pool checkout wait and connection hold time per request.
+
+Usage:
+    python -m benchmarks.bench_lazy_session [--requests 1000] [--miss-ratio 0.3]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.database import (
+    SESSION_OPTIONS,
+    LazySession,
+    StatementStats,
+    TransactionScope,
+    build_engine,
+)
+
+POOL_SIZE = 10
+QUERY_HOLD_SECONDS = 0.002
+SEND_SECONDS = 0.01
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+async def run(label: str, db_engine, requests: int, miss_ratio: float, scope) -> None:
+    rng = random.Random(11)
+    misses = [rng.random() < miss_ratio for _ in range(requests)]
+    waits: List[float] = []
+    holds: List[float] = []
+
+    async def query(session) -> None:
+        started = time.perf_counter()
+        await session.execute(text("SELECT 1"))
+        waits.append(time.perf_counter() - started)
+        await asyncio.sleep(QUERY_HOLD_SECONDS)
+
+    async def eager(miss: bool) -> None:
+        session = AsyncSession(bind=db_engine, **SESSION_OPTIONS)
+        stats = session.sync_session.info["statement_stats"] = StatementStats()
+        try:
+            if miss:
+                await query(session)
+            await asyncio.sleep(SEND_SECONDS)
+        finally:
+            await session.close()
+        if miss:
+            holds.append(stats.hold_seconds)
+
+    async def lazy(miss: bool) -> None:
+        session = LazySession(lambda: db_engine, scope)
+        try:
+            if miss:
+                await query(session)
+        finally:
+            await session.release()
+        if session.used:
+            holds.append(session.stats.hold_seconds)
+        await asyncio.sleep(SEND_SECONDS)
+
+    handler = eager if scope is None else lazy
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(miss) for miss in misses))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<11} {elapsed:6.2f}s  statement incl. pool wait p50 "
+        f"{statistics.median(waits) * 1000:7.1f} ms  p99 {percentile(waits, 0.99) * 1000:7.1f} ms  "
+        f"hold p50 {statistics.median(holds) * 1000:6.1f} ms"
+    )
+
+
+async def run_query(db_engine) -> None:
+    async with db_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        await asyncio.sleep(QUERY_HOLD_SECONDS)
+
+
+async def main(requests: int, miss_ratio: float) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        db_engine = build_engine(url, "bench", pool_size=POOL_SIZE, max_overflow=0)
+        # Open the pool's connections so no run pays for connecting
+        await asyncio.gather(*(run_query(db_engine) for _ in range(POOL_SIZE)))
+        await run("eager", db_engine, requests, miss_ratio, None)
+        await run("read_only", db_engine, requests, miss_ratio, TransactionScope.READ_ONLY)
+        await run("autocommit", db_engine, requests, miss_ratio, TransactionScope.AUTOCOMMIT)
+        await db_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--miss-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.miss_ratio))
@@ -0,0 +1,96 @@
+"""
+Log store benchmark.
+
+Appends a day of synthetic agent logs for one org to a `LogStore` in a
+temporary directory, then streams queries with time, level, text and
+trace filters, reading every chunk the way `StreamingResponse` does.
+Reports ingest rate, compression ratio, query latency and peak Python
+memory per query, which should stay flat as result sizes grow.
+
+Usage:
+    python -m benchmarks.bench_log_store [--entries 500000]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from control_plane.schemas import LogEntry
+from control_plane.services.log_store import LogStore
+
+ORG_ID = "org-bench"
+LEVELS = ["debug"] * 30 + ["info"] * 60 + ["warning"] * 8 + ["error"] * 2
+MESSAGES = [
+    "Fetched billing export page",
+    "Normalized cost records",
+    "Detected spend anomaly",
+    "Retrying cloud API call after throttling",
+    "Wrote summary to output bucket",
+]
+
+
+def main(entries: int) -> None:
+    rng = random.Random(7)
+    root = tempfile.mkdtemp(prefix="bench_log_store_")
+    store = LogStore(root, block_bytes=256 * 1024, flush_seconds=5.0)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=1) / entries
+
+    batch = []
+    raw_bytes = 0
+    ingest_start = time.perf_counter()
+    for index in range(entries):
+        batch.append(
+            LogEntry(
+                timestamp=start + step * index,
+                level=rng.choice(LEVELS),
+                message=f"{rng.choice(MESSAGES)} (step {index % 12})",
+                fields={"agent_id": f"com.bench.agent-{index % 40}", "attempt": 1},
+                trace_id=f"trace-{index // 25}",
+            )
+        )
+        if len(batch) == 500:
+            store.append(ORG_ID, batch)
+            raw_bytes += sum(len(entry.model_dump_json()) + 1 for entry in batch)
+            batch = []
+    store.append(ORG_ID, batch)
+    raw_bytes += sum(len(entry.model_dump_json()) + 1 for entry in batch)
+    store.flush()
+    ingest_seconds = time.perf_counter() - ingest_start
+
+    segment = store._segment(ORG_ID, start.date().isoformat())
+    print(f"entries            {entries} ({entries / ingest_seconds:.0f}/s ingest)")
+    print(
+        f"segment size       {segment.size / 1024 / 1024:.1f} MiB in {len(segment.blocks)} "
+        f"blocks ({raw_bytes / segment.size:.1f}x compression)"
+    )
+
+    queries = {
+        "last hour": {"start": start + timedelta(hours=23), "limit": 10_000},
+        "errors": {"level": "error", "limit": 10_000},
+        "text": {"text": "anomaly", "limit": 10_000},
+        "one trace": {"trace_id": f"trace-{entries // 50}", "limit": 10_000},
+        "full scan 10k": {"limit": 10_000},
+        "full scan all": {"limit": entries},
+    }
+    print(f"{'query':<16}{'rows':>10}{'ms':>10}{'peak KiB':>10}")
+    for name, params in queries.items():
+        tracemalloc.start()
+        query_start = time.perf_counter()
+        rows = 0
+        for chunk in store.query(ORG_ID, **params):
+            rows += chunk.count(b"\n")
+        elapsed = (time.perf_counter() - query_start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<16}{rows - 1:>10}{elapsed:>10.1f}{peak / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=500_000)
+    args = parser.parse_args()
+    main(args.entries)
@@ -0,0 +1,105 @@
+"""
+Metrics store benchmark.
+
+Fills a `TimeSeriesStore` with a day of 10-second samples for a set of
+agent series, then times raw range queries and downsampled queries
+(min/max/avg/p95) against building the same raw response from per-point
+`MetricPoint` models. Reports ingest rate, query latency and response
+size.
+
+Usage:
+    python -m benchmarks.bench_metrics_store [--series 50] [--hours 24]
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from control_plane.schemas import MetricPoint, MetricsResponse
+from control_plane.services.timeseries import TimeSeriesStore, now_ms
+
+ORG_ID = "org-bench"
+METRIC = "agent_run_duration_ms"
+INTERVAL_MS = 10_000
+REPEATS = 20
+
+
+def timed(fn, repeats: int = REPEATS):
+    """Run `fn` `repeats` times; return its last result and the median ms."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main(series: int, hours: int) -> None:
+    store = TimeSeriesStore(retention_seconds=7 * 86400, max_buckets=11000)
+    rng = np.random.default_rng(7)
+    end = now_ms()
+    start = end - hours * 3600 * 1000
+    timestamps = np.arange(start, end, INTERVAL_MS, dtype=np.int64)
+
+    ingest_start = time.perf_counter()
+    for index in range(series):
+        values = rng.gamma(2.0, 600.0, size=len(timestamps))
+        # Ingest in one-minute batches, as agents report them
+        for offset in range(0, len(timestamps), 6):
+            store.append(
+                ORG_ID,
+                METRIC,
+                timestamps[offset:offset + 6],
+                values[offset:offset + 6],
+                {"agent_id": f"com.bench.agent-{index}", "status": "completed"},
+            )
+    ingest_seconds = time.perf_counter() - ingest_start
+    points = series * len(timestamps)
+    print(f"points             {points} ({points / ingest_seconds:.0f}/s ingest)")
+
+    window_start = end - 3600 * 1000
+    body, raw_ms = timed(lambda: store.query_json(ORG_ID, METRIC, window_start, end))
+    print(f"raw 1h query       {raw_ms:.2f} ms, {len(body) / 1024:.0f} KiB")
+
+    def per_point_models():
+        column_ts, column_values, _ = store._metrics[ORG_ID][METRIC].window(window_start, end)
+        response = MetricsResponse(
+            metric_name=METRIC,
+            points=[
+                MetricPoint(
+                    timestamp=datetime.fromtimestamp(ts / 1000, tz=timezone.utc),
+                    value=value,
+                )
+                for ts, value in zip(column_ts.tolist(), column_values.tolist())
+            ],
+        )
+        return response.model_dump_json().encode()
+
+    _, models_ms = timed(per_point_models, repeats=5)
+    print(f"raw 1h via models  {models_ms:.2f} ms")
+
+    aggregations = ("min", "max", "avg", "p95")
+    for label, step in (("5m", 300_000), ("1h", 3_600_000)):
+        body, ms = timed(
+            lambda: store.query_json(ORG_ID, METRIC, start, end, step, aggregations)
+        )
+        print(f"{hours}h @ {label} buckets   {ms:.2f} ms, {len(body) / 1024:.0f} KiB")
+
+    body, ms = timed(
+        lambda: store.query_json(
+            ORG_ID, METRIC, start, end, 300_000, aggregations,
+            matchers={"agent_id": "com.bench.agent-0"},
+        )
+    )
+    print(f"one series @ 5m    {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--hours", type=int, default=24)
+    args = parser.parse_args()
+    main(args.series, args.hours)
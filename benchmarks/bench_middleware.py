@@ -0,0 +1,159 @@
+"""
+Middleware stack benchmark.
+
+Compares the legacy `BaseHTTPMiddleware` stack (request logging, error
+handling, auth) with the fused `RequestPipelineMiddleware` by driving the
+ASGI apps in-process, so the numbers reflect middleware and routing cost
+rather than socket I/O.
+
+Usage:
+    python -m benchmarks.bench_middleware [--requests 5000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import FastAPI
+
+from benchmarks.catalog_fixtures import create_catalog
+from control_plane.database import get_session
+from control_plane.middleware import (
+    AuthMiddleware,
+    ErrorHandlerMiddleware,
+    RequestLoggingMiddleware,
+    RequestPipelineMiddleware,
+)
+from control_plane.routers import agents, health
+
+ROUTES = ["/health", "/api/v1/agents"]
+
+
+def build_app(
+    install_middleware: Callable[[FastAPI], None],
+    session_maker=None,
+) -> FastAPI:
+    """Build a FastAPI app with the benchmarked routes and middleware."""
+    app = FastAPI()
+    install_middleware(app)
+    if session_maker is not None:
+
+        async def get_bench_session():
+            async with session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_bench_session
+    app.include_router(health.router, prefix="/api/v1")
+    app.include_router(agents.router, prefix="/api/v1")
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "service": "control-plane"}
+
+    return app
+
+
+def install_legacy(app: FastAPI) -> None:
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(ErrorHandlerMiddleware)
+    app.add_middleware(AuthMiddleware)
+
+
+def install_fused(app: FastAPI) -> None:
+    app.add_middleware(RequestPipelineMiddleware)
+
+
+async def call(app: FastAPI, path: str) -> float:
+    """Issue one GET through the ASGI interface and return its latency."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    status_code = 0
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    assert status_code == 200, f"{path} returned {status_code}"
+    return elapsed
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int) -> Dict[str, float]:
+    """Run `requests` GETs with bounded concurrency and summarize latency."""
+    for _ in range(100):
+        await call(app, path)
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker():
+        async with semaphore:
+            latencies.append(await call(app, path))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "req_per_s": requests / wall,
+    }
+
+
+async def main(requests: int, concurrency: int) -> None:
+    # Access logs would dominate the measurement; keep the log calls but
+    # discard their output, as a production log level above INFO would.
+    logging.getLogger("control_plane.middleware").setLevel(logging.WARNING)
+
+    # Catalog reads are served from a small in-memory SQLite stand-in
+    engine, session_maker = await create_catalog("sqlite+aiosqlite://", rows=100)
+    stacks: List[Tuple[str, FastAPI]] = [
+        ("legacy", build_app(install_legacy, session_maker)),
+        ("fused", build_app(install_fused, session_maker)),
+    ]
+    print(f"{'route':<18}{'stack':<8}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>12}")
+    for path in ROUTES:
+        for name, app in stacks:
+            result = await run(app, path, requests, concurrency)
+            print(
+                f"{path:<18}{name:<8}{result['p50_ms']:>10.3f}"
+                f"{result['p99_ms']:>10.3f}{result['req_per_s']:>12.0f}"
+            )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
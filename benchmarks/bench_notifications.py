@@ -0,0 +1,89 @@
+"""
+Notification dispatcher benchmark.
+
+Submits a burst of approval notifications to three stub channels that
+mimic email (slow), Slack (fast, flaky) and in-app delivery. Reports what
+the approve request pays to submit, how long each channel takes to
+deliver the burst, the peak concurrency it reached against its limit, and
+how many retries it took for every delivery to succeed.
+
+Usage:
+    python -m benchmarks.bench_notifications [--notifications 1000]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from control_plane.services.notifications import (
+    Notification,
+    NotificationDispatcher,
+    StubSink,
+)
+
+CHANNELS = {
+    # name: (latency seconds, failure rate, concurrency)
+    "email": (0.2, 0.02, 16),
+    "slack": (0.05, 0.1, 4),
+    "in_app": (0.0, 0.0, 2),
+}
+
+
+class MeteredSink(StubSink):
+    """Stub sink that tracks its peak concurrency and when it finished."""
+
+    def __init__(self, latency: float, fail_rate: float):
+        super().__init__(latency, fail_rate)
+        self.active = 0
+        self.peak = 0
+        self.finished_at = 0.0
+
+    async def send(self, notification: Notification) -> None:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await super().send(notification)
+        finally:
+            self.active -= 1
+            self.finished_at = time.perf_counter()
+
+
+async def main(notifications: int) -> None:
+    sinks = {name: MeteredSink(latency, fail) for name, (latency, fail, _) in CHANNELS.items()}
+    dispatcher = NotificationDispatcher(
+        sinks=sinks,
+        concurrency={name: limit for name, (_, _, limit) in CHANNELS.items()},
+        queue_size=notifications,
+        max_attempts=8,
+        retry_base_seconds=0.05,
+    )
+    dispatcher.start()
+
+    submit_us = []
+    started = time.perf_counter()
+    for n in range(notifications):
+        notification = Notification(
+            "approval.requested", f"org-{n % 20}", {"approval_id": f"app-{n}", "action": "Stop idle VM"}
+        )
+        start = time.perf_counter()
+        dispatcher.submit(notification)
+        submit_us.append((time.perf_counter() - start) * 1e6)
+    print(f"submit p50 {statistics.median(submit_us):.1f} us, max {max(submit_us):.1f} us")
+
+    while any(len(sink.delivered) < notifications for sink in sinks.values()):
+        await asyncio.sleep(0.05)
+    for name, sink in sinks.items():
+        limit = CHANNELS[name][2]
+        print(
+            f"{name:<7} delivered {len(sink.delivered)} in {sink.finished_at - started:6.2f} s  "
+            f"peak concurrency {sink.peak}/{limit}  retries {sink.attempts - len(sink.delivered)}"
+        )
+    await dispatcher.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notifications", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.notifications))
@@ -0,0 +1,158 @@
+"""
+Webhook delivery benchmark.
+
+Starts local stub receivers (plain HTTP/1.1 with keep-alive) and pushes a
+burst of signed events through `WebhookSender`, the shared pool the outbox
+dispatcher uses, then repeats a slice of the burst with a new client per
+event for comparison. Reports deliveries/sec and how many TCP connections
+each receiver accepted. A last run points at a receiver that always
+answers 503 to show its breaker shedding load instead of queueing it.
+
+HTTP/2 is only negotiated over TLS, so these plaintext runs measure the
+keep-alive pool; against an HTTPS receiver the same client multiplexes.
+
+Usage:
+    python -m benchmarks.bench_outbox [--events 20000] [--receivers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+import httpx
+
+from control_plane.services.outbox import CircuitOpenError, DeliveryError, WebhookSender, sign
+
+
+class Receiver:
+    """Minimal HTTP/1.1 server that answers every request with `status`."""
+
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.connections = 0
+        self.requests = 0
+        self.port = 0
+        self._server = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/hooks"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        reason = b"OK" if self.status == 200 else b"Unavailable"
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 %d %s\r\nContent-Length: 0\r\n\r\n" % (self.status, reason)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def events(count: int, receivers: List[Receiver]):
+    for n in range(count):
+        body = json.dumps({
+            "event_id": f"evt-{n}",
+            "event_type": "agent.run.completed",
+            "org_id": f"org-{n % 50}",
+            "data": {"run_id": f"run-{n}", "status": "completed"},
+        })
+        headers = {"Content-Type": "application/json", "X-Webhook-Signature": sign("secret", body)}
+        yield receivers[n % len(receivers)].url, body, headers
+
+
+async def pooled(count: int, receivers: List[Receiver], concurrency: int) -> None:
+    sender = WebhookSender(
+        max_connections=100,
+        destination_concurrency=concurrency,
+        breaker_threshold=5,
+        breaker_reset_seconds=30,
+    )
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(sender.send(url, body, headers, 10) for url, body, headers in events(count, receivers))
+    )
+    elapsed = time.perf_counter() - start
+    await sender.close()
+    connections = sum(receiver.connections for receiver in receivers)
+    print(f"pooled     {count:>6} events  {count / elapsed:>8.0f} /s  {connections:>6} connections")
+
+
+async def per_event(count: int, receivers: List[Receiver], concurrency: int) -> None:
+    before = sum(receiver.connections for receiver in receivers)
+    semaphore = asyncio.Semaphore(concurrency * len(receivers))
+
+    async def send(url: str, body: str, headers: dict) -> None:
+        async with semaphore:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(url, content=body, headers=headers)
+                response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(*event) for event in events(count, receivers)))
+    elapsed = time.perf_counter() - start
+    connections = sum(receiver.connections for receiver in receivers) - before
+    print(f"per-event  {count:>6} events  {count / elapsed:>8.0f} /s  {connections:>6} connections")
+
+
+async def failing(count: int) -> None:
+    receiver = Receiver(status=503)
+    await receiver.start()
+    sender = WebhookSender(
+        max_connections=10, destination_concurrency=4, breaker_threshold=5, breaker_reset_seconds=30
+    )
+    deferred = failed = 0
+    for url, body, headers in events(count, [receiver]):
+        try:
+            await sender.send(url, body, headers, 10)
+        except CircuitOpenError:
+            deferred += 1
+        except DeliveryError:
+            failed += 1
+    await sender.close()
+    await receiver.stop()
+    print(
+        f"failing    {count:>6} events  {receiver.requests} reached the receiver, "
+        f"{failed} failed, {deferred} deferred by the breaker"
+    )
+
+
+async def main(count: int, receiver_count: int, concurrency: int) -> None:
+    receivers = [Receiver() for _ in range(receiver_count)]
+    for receiver in receivers:
+        await receiver.start()
+    await pooled(count, receivers, concurrency)
+    await per_event(max(count // 10, 1), receivers, concurrency)
+    for receiver in receivers:
+        await receiver.stop()
+    await failing(1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--receivers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16, help="In flight per receiver")
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.receivers, args.concurrency))
@@ -0,0 +1,119 @@
+"""
+Rate limit benchmark.
+
+Measures what rate limiting adds to a request: `RateLimiter.admit` and
+`release` alone, and `RateLimitMiddleware` around a trivial ASGI app
+compared with calling the app directly, over many orgs and users so
+lookups miss CPU caches as they would in production. Then replays a
+noisy org sending 10x its limit next to a quiet one and reports how much
+of each was shed.
+
+Usage:
+    python -m benchmarks.bench_rate_limit [--requests 200000] [--orgs 1000]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from control_plane.middleware import RateLimitMiddleware
+from control_plane.services.rate_limit import (
+    Limit,
+    MemoryBackend,
+    RateLimiter,
+    route_classifier,
+)
+
+
+def limiter() -> RateLimiter:
+    return RateLimiter(
+        MemoryBackend(max_keys=100000),
+        org_limit=Limit("org", 1e9, 1e9),
+        user_limit=Limit("user", 1e9, 1e9),
+        class_limits={"read": Limit("route_class", 1e9, 1e9)},
+        max_in_flight=16,
+    )
+
+
+async def app(scope, receive, send) -> None:
+    pass
+
+
+def scopes(requests: int, orgs: int) -> List[dict]:
+    return [
+        {
+            "type": "http",
+            "method": "GET",
+            "path": f"/api/v1/orgs/org-{n % orgs}/approvals",
+            "state": {"user": {"id": f"user-{n % (orgs * 4)}", "org_id": f"org-{n % orgs}"}},
+        }
+        for n in range(requests)
+    ]
+
+
+async def overhead(requests: int, orgs: int) -> None:
+    rate_limiter = limiter()
+    org_ids = [f"org-{n % orgs}" for n in range(requests)]
+    users = [f"user-{n % (orgs * 4)}" for n in range(requests)]
+    start = time.perf_counter()
+    for org_id, user_id in zip(org_ids, users):
+        await rate_limiter.admit(org_id, user_id, "read")
+        rate_limiter.release(org_id, "read")
+    per_check = (time.perf_counter() - start) / requests
+    print(f"admit + release          {per_check * 1e6:6.2f} us/request")
+
+    requests_scopes = scopes(requests, orgs)
+    start = time.perf_counter()
+    for scope in requests_scopes:
+        await app(scope, None, None)
+    bare = (time.perf_counter() - start) / requests
+
+    middleware = RateLimitMiddleware(app, limiter=limiter(), classifier=route_classifier)
+    start = time.perf_counter()
+    for scope in requests_scopes:
+        await middleware(scope, None, None)
+    wrapped = (time.perf_counter() - start) / requests
+    print(f"middleware               {(wrapped - bare) * 1e6:6.2f} us/request added")
+
+
+async def shedding(seconds: float) -> None:
+    rate_limiter = RateLimiter(
+        MemoryBackend(max_keys=1000),
+        org_limit=Limit("org", 100, 100),
+        user_limit=Limit("user", 1000, 1000),
+        class_limits={},
+        max_in_flight=16,
+    )
+    sent = {"noisy": 0, "quiet": 0}
+    shed = {"noisy": 0, "quiet": 0}
+
+    async def client(org_id: str, rate: float) -> None:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            sent[org_id] += 1
+            if await rate_limiter.admit(org_id, None, "read") is not None:
+                shed[org_id] += 1
+            else:
+                rate_limiter.release(org_id, "read")
+            await asyncio.sleep(1 / rate)
+
+    await asyncio.gather(client("noisy", 1000), client("quiet", 50))
+    for org_id in sent:
+        print(
+            f"{org_id:<6} sent {sent[org_id] / seconds:6.0f}/s  "
+            f"shed {shed[org_id] / max(sent[org_id], 1):6.1%}  (limit 100/s)"
+        )
+
+
+async def main(requests: int, orgs: int) -> None:
+    await overhead(requests, orgs)
+    await shedding(2.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--orgs", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.orgs))
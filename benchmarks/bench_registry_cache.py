@@ -0,0 +1,121 @@
+"""
+Agent registry cache benchmark.
+
+Drives `RegistryCache` with a simulated database loader, once over the
+in-process LRU and once over `RedisBackend` with an in-process fake client,
+and reports hit latency, how many loads a burst of concurrent cold
+requests triggers, and stale-while-revalidate behaviour.
+
+Usage:
+    python -m benchmarks.bench_registry_cache [--requests 20000] [--concurrency 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from control_plane.services.registry_cache import (
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    RegistryCache,
+)
+
+DB_LATENCY_SECONDS = 0.005
+
+
+class FakeRedis:
+    """In-process stand-in for a `redis.asyncio` client."""
+
+    def __init__(self):
+        self._values: Dict[str, bytes] = {}
+        self._expiry: Dict[str, float] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self._expiry.get(key, float("inf")) <= time.monotonic():
+            self._values.pop(key, None)
+        return self._values.get(key)
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        self._values[key] = value.encode()
+        if ex is not None:
+            self._expiry[key] = time.monotonic() + ex
+
+    async def delete(self, key: str) -> int:
+        self._expiry.pop(key, None)
+        return int(self._values.pop(key, None) is not None)
+
+    async def incr(self, key: str) -> int:
+        value = int(self._values.get(key, b"0")) + 1
+        self._values[key] = str(value).encode()
+        return value
+
+
+class FakeDatabase:
+    """Loader target that counts queries and sleeps like a round trip."""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def load(self, session) -> dict:
+        self.queries += 1
+        await asyncio.sleep(DB_LATENCY_SECONDS)
+        return {"agent_id": "com.bench.finops.agent-1", "queries": self.queries}
+
+    @asynccontextmanager
+    async def session(self):
+        yield None
+
+
+async def bench_backend(name: str, backend: CacheBackend, requests: int, concurrency: int):
+    db = FakeDatabase()
+    cache = RegistryCache(backend, ttl_seconds=60, stale_seconds=60, session_factory=db.session)
+    key = cache.agent_key("com.bench.finops.agent-1")
+
+    # Cold burst: every request misses at once
+    await asyncio.gather(*(cache.get_or_load("bench", key, db.load) for _ in range(concurrency)))
+    cold_queries = db.queries
+
+    latencies: List[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await cache.get_or_load("bench", key, db.load)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    # Expire the entry; readers get the stale value while one refresh runs
+    cache.ttl_seconds = 0
+    await cache.invalidate_agent("com.bench.finops.agent-1")
+    await cache.get_or_load("bench", key, db.load)
+    before = db.queries
+    start = time.perf_counter()
+    await asyncio.gather(*(cache.get_or_load("bench", key, db.load) for _ in range(concurrency)))
+    stale_ms = (time.perf_counter() - start) * 1000
+    await asyncio.sleep(DB_LATENCY_SECONDS * 2)
+
+    print(
+        f"{name:<8}{statistics.median(latencies) * 1e6:>10.1f}"
+        f"{latencies[int(len(latencies) * 0.99) - 1] * 1e6:>10.1f}"
+        f"{cold_queries:>14}{db.queries - before:>16}{stale_ms:>12.2f}"
+    )
+
+
+async def main(requests: int, concurrency: int) -> None:
+    print(
+        f"{'backend':<8}{'hit p50':>10}{'hit p99':>10}"
+        f"{'cold loads':>14}{'stale loads':>16}{'stale ms':>12}"
+    )
+    print(f"{'':<8}{'(us)':>10}{'(us)':>10}{f'({concurrency} reqs)':>14}{f'({concurrency} reqs)':>16}")
+    await bench_backend("memory", MemoryBackend(max_entries=1000), requests, concurrency)
+    await bench_backend("redis", RedisBackend(FakeRedis()), requests, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
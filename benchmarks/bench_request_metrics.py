@@ -0,0 +1,96 @@
+"""
+Request instrumentation benchmark.
+
+Replays a mix of API requests through two ways of recording the request
+counter and latency histogram:
+
+- naive: `labels(...)` resolved per request with the raw URL path
+- cached: `RequestMetrics.observe` with the route template
+
+Reports the cost per request and how many label sets each approach left
+in the registry, i.e. the series Prometheus would scrape.
+
+Usage:
+    python -m benchmarks.bench_request_metrics [--requests 200000]
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+from control_plane.observability import RequestMetrics
+
+# (method, template, status) weights loosely follow production traffic
+ROUTES = [
+    ("GET", "/api/v1/agents", 200, 30),
+    ("GET", "/api/v1/agents/{agent_id}", 200, 25),
+    ("POST", "/api/v1/agents/{agent_id}/runs/{run_id}/complete", 200, 20),
+    ("GET", "/api/v1/orgs/{org_id}/approvals", 200, 10),
+    ("POST", "/api/v1/orgs/{org_id}/metrics", 202, 10),
+    ("GET", "/api/v1/agents/{agent_id}", 404, 5),
+]
+
+
+def requests(count: int) -> List[Tuple[str, str, str, int, float]]:
+    rng = random.Random(7)
+    weights = [route[3] for route in ROUTES]
+    picked = rng.choices(ROUTES, weights, k=count)
+    out = []
+    for method, template, status_code, _ in picked:
+        path = (
+            template.replace("{agent_id}", f"agent-{rng.randrange(5000)}")
+            .replace("{run_id}", f"run-{rng.randrange(10 ** 9)}")
+            .replace("{org_id}", f"org-{rng.randrange(200)}")
+        )
+        out.append((method, template, path, status_code, rng.uniform(0.001, 0.2)))
+    return out
+
+
+def metrics() -> Tuple[CollectorRegistry, Counter, Histogram]:
+    registry = CollectorRegistry()
+    counter = Counter(
+        "bench_requests_total", "Requests", ["method", "endpoint", "status"], registry=registry
+    )
+    histogram = Histogram(
+        "bench_request_duration_seconds", "Duration", ["method", "endpoint"], registry=registry
+    )
+    return registry, counter, histogram
+
+
+def series(registry: CollectorRegistry) -> int:
+    return sum(
+        1
+        for family in registry.collect()
+        for sample in family.samples
+        if sample.name.endswith("_total")
+    )
+
+
+def main(count: int) -> None:
+    replay = requests(count)
+
+    registry, counter, histogram = metrics()
+    start = time.perf_counter()
+    for method, _, path, status_code, seconds in replay:
+        counter.labels(method=method, endpoint=path, status=str(status_code)).inc()
+        histogram.labels(method=method, endpoint=path).observe(seconds)
+    naive = time.perf_counter() - start
+    print(f"naive   {naive / count * 1e9:>7.0f} ns/request  {series(registry):>7} series")
+
+    registry, counter, histogram = metrics()
+    recorder = RequestMetrics(counter, histogram)
+    start = time.perf_counter()
+    for method, template, _, status_code, seconds in replay:
+        recorder.observe(template, method, status_code, seconds)
+    cached = time.perf_counter() - start
+    print(f"cached  {cached / count * 1e9:>7.0f} ns/request  {series(registry):>7} series")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.requests)
@@ -0,0 +1,93 @@
+"""
+Response encoding benchmark.
+
+Serves a cached catalog page to clients that re-download it, and
+compares for each available content coding:
+
+- identity: the page sent uncompressed, as `FastJSONResponse` alone does
+- dynamic: the page compressed on every response, as a compression
+  middleware would
+- cached: `cached_response`, which compresses the page once and reuses
+  the variant
+- 304: a client revalidating with If-None-Match
+
+Reports CPU time per response and bytes sent per response.
+
+Usage:
+    python -m benchmarks.bench_response_encoding [--items 100] [--seconds 1]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from pydantic_core import to_jsonable_python
+from starlette.requests import Request
+
+from benchmarks.bench_json_response import agent_rows
+from control_plane.config import settings
+from control_plane.responses import (
+    FastJSONResponse,
+    available_encodings,
+    cached_response,
+    compress,
+    row_dicts,
+)
+from control_plane.schemas import AgentResponse
+
+VERSION = "bench"
+
+
+def request(headers: List[Tuple[bytes, bytes]]) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/v1/agents", "headers": headers})
+
+
+async def measure(label: str, respond: Callable[[], Awaitable[object]], seconds: float) -> None:
+    calls = sent = 0
+    start = time.process_time()
+    while time.process_time() - start < seconds:
+        sent += len((await respond()).body)
+        calls += 1
+    cpu = time.process_time() - start
+    print(f"  {label:<9} {cpu / calls * 1e6:9.1f} us CPU/response  {sent // calls:>7} bytes/response")
+
+
+async def main(items: int, seconds: float) -> None:
+    page = to_jsonable_python(
+        {"items": row_dicts(AgentResponse, agent_rows(items)), "next_cursor": None}
+    )
+    print(f"catalog page of {items} agents")
+    print("identity")
+    plain = request([])
+
+    async def identity() -> FastJSONResponse:
+        return FastJSONResponse(page)
+
+    await measure("identity", identity, seconds)
+    await measure("cached", lambda: cached_response(plain, page, VERSION), seconds)
+
+    for encoding in available_encodings():
+        print(encoding)
+        accepting = request([(b"accept-encoding", encoding.encode())])
+        level = settings.RESPONSE_COMPRESSION_LEVELS[encoding]
+
+        async def dynamic() -> FastJSONResponse:
+            body = FastJSONResponse(page).body
+            return FastJSONResponse(compress(body, encoding, level))
+
+        await measure("dynamic", dynamic, seconds)
+        await measure("cached", lambda: cached_response(accepting, page, VERSION), seconds)
+
+    etag = (await cached_response(plain, page, VERSION)).headers["etag"]
+    revalidating = request([(b"if-none-match", etag.encode())])
+    print("If-None-Match")
+    await measure("304", lambda: cached_response(revalidating, page, VERSION), seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100, help="Agents on the page")
+    parser.add_argument("--seconds", type=float, default=1.0, help="CPU seconds per measurement")
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.seconds))
@@ -0,0 +1,114 @@
+"""
+Run completion ingestion benchmark.
+
+Seeds leased tasks on a SQLite stand-in (or any database URL), then
+records their completions one per transaction, as the per-run
+`/complete` endpoint does, and in batches through `parse_completions` and
+`record_completions`, as `POST /runs/complete` does. Reports completions
+per second for each mode.
+
+Usage:
+    python -m benchmarks.bench_run_ingest [--runs 5000] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from control_plane.database import Base
+from control_plane.models import Task
+from control_plane.schemas import TaskStatus
+from control_plane.services.run_service import parse_completions, record_completions
+
+BATCH_SIZES = [1, 100, 1000]
+
+
+def completion(run_id: str) -> dict:
+    """A typical short FinOps run result."""
+    return {
+        "run_id": run_id,
+        "status": "completed",
+        "outputs": {"summary": {"total_cost": 125000, "anomalies_detected": 3}},
+        "logs": [
+            {"level": "info", "step": step, "message": f"Step {step} complete"}
+            for step in range(1, 5)
+        ],
+        "metrics": {"records_processed": 15000},
+        "execution_time_ms": 1240,
+    }
+
+
+async def seed(session_maker, run_ids: List[str]) -> None:
+    now = datetime.utcnow()
+    async with session_maker() as session:
+        for start in range(0, len(run_ids), 1000):
+            await session.execute(
+                insert(Task),
+                [
+                    {
+                        "run_id": run_id,
+                        "org_id": f"org-{index % 20}",
+                        "agent_id": "com.bench.finops.agent",
+                        "payload": {},
+                        "status": TaskStatus.LEASED.value,
+                        "attempts": 1,
+                        "max_attempts": 3,
+                        "available_at": now,
+                        "lease_owner": "worker-1",
+                        "lease_expires_at": now,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for index, run_id in enumerate(run_ids[start:start + 1000], start)
+                ],
+            )
+        await session.commit()
+
+
+async def ingest(session_maker, run_ids: List[str], batch_size: int) -> float:
+    """Record completions for `run_ids` and return completions per second."""
+    bodies = [
+        json.dumps([completion(run_id) for run_id in run_ids[start:start + batch_size]]).encode()
+        for start in range(0, len(run_ids), batch_size)
+    ]
+    start = time.perf_counter()
+    async with session_maker() as session:
+        for body in bodies:
+            items, failures = parse_completions(body)
+            await record_completions(session, items, failures)
+    return len(run_ids) / (time.perf_counter() - start)
+
+
+async def main(runs: int, database_url: str) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"{'batch size':>10}{'completions/s':>16}")
+    for batch_size in BATCH_SIZES:
+        run_ids = [f"run-{batch_size}-{index}" for index in range(runs)]
+        await seed(session_maker, run_ids)
+        rate = await ingest(session_maker, run_ids, batch_size)
+        print(f"{batch_size:>10}{rate:>16.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    url = args.database_url or "sqlite+aiosqlite:///" + os.path.join(
+        tempfile.gettempdir(), "bench_run_ingest.db"
+    )
+    asyncio.run(main(args.runs, url))
@@ -0,0 +1,109 @@
+"""
+Agent search index benchmark.
+
+Indexes synthetic agents into the `SearchIndex` used by `/agents/search`
+and measures query latency for full terms, type-ahead prefixes and
+multi-term queries, plus the cost of incremental updates.
+
+Usage:
+    python -m benchmarks.bench_search [--agents 50000] [--queries 2000]
+"""
+
+import argparse
+import itertools
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from control_plane.services.search_index import SearchIndex
+
+CATEGORIES = ["finops", "security", "devops", "analytics", "support", "sales", "hr", "legal"]
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "category": 2.0, "tools": 1.5, "description": 1.0}
+
+QUERIES = {
+    "term": ["billing", "anomaly", "kubernetes", "invoice", "compliance"],
+    "prefix": ["bi", "bil", "anom", "kube", "comp"],
+    "multi": ["cost anomaly", "billing norm", "security scan", "invoice reconc"],
+}
+
+
+def vocabulary(rng: random.Random, size: int = 5000) -> List[str]:
+    """Build a vocabulary of real-looking domain words plus synthetic ones."""
+    words = [
+        "billing", "normalizer", "anomaly", "detection", "cost", "invoice",
+        "reconciliation", "kubernetes", "scan", "security", "compliance",
+        "report", "forecast", "ticket", "triage", "lead", "scoring", "contract",
+    ]
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    while len(words) < size:
+        words.append("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return words
+
+
+def zipf_weights(size: int, offset: int = 20) -> List[float]:
+    """Cumulative Zipf-like weights, so a few words are common and most are rare."""
+    return list(itertools.accumulate(1.0 / (rank + offset) for rank in range(size)))
+
+
+def agent_fields(
+    index: int, rng: random.Random, words: List[str], weights: List[float]
+) -> Dict[str, object]:
+    """Build the indexed fields of one synthetic agent."""
+    pick = lambda k: rng.choices(words, cum_weights=weights, k=k)
+    category = CATEGORIES[index % len(CATEGORIES)]
+    return {
+        "name": " ".join(pick(2)) + f" agent {index}",
+        "description": " ".join(pick(25)),
+        "tags": pick(4),
+        "category": category,
+        "tools": [f"{word}_tool" for word in pick(3)],
+    }
+
+
+def measure(index: SearchIndex, queries: List[str], repeats: int) -> Dict[str, float]:
+    """Run each query `repeats` times and summarize latency."""
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def main(agents: int, queries: int) -> None:
+    rng = random.Random(7)
+    words = vocabulary(rng)
+    weights = zipf_weights(len(words))
+    index = SearchIndex(FIELD_WEIGHTS)
+
+    start = time.perf_counter()
+    documents = [agent_fields(i, rng, words, weights) for i in range(agents)]
+    for i, fields in enumerate(documents):
+        index.upsert(i, fields, payload=i)
+    print(f"Indexed {agents} agents in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'kind':<8}{'p50 us':>10}{'p99 us':>10}")
+    for kind, kind_queries in QUERIES.items():
+        result = measure(index, kind_queries, max(1, queries // len(kind_queries)))
+        print(f"{kind:<8}{result['p50_us']:>10.1f}{result['p99_us']:>10.1f}")
+
+    # Incremental updates: re-index existing agents, as update_agent does
+    start = time.perf_counter()
+    updates = min(agents, 1000)
+    for i in rng.sample(range(agents), updates):
+        index.upsert(i, agent_fields(i, rng, words, weights), payload=i)
+    print(f"upsert  {(time.perf_counter() - start) / updates * 1e6:>10.1f} us/agent")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agents", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.agents, args.queries)
@@ -0,0 +1,156 @@
+"""
+Task queue load test.
+
+Runs 500 concurrent long-polling workers against `TaskQueue` on a SQLite
+stand-in (or any database URL) while a producer enqueues runs for a mix
+of large and small orgs. Some workers drop their tasks without acking so
+the lease sweeper has to redeliver them. Reports throughput, enqueue to
+lease latency, SQL statements per leased task, and how fairly small orgs
+were served while a large org had a backlog.
+
+SQLite ignores `FOR UPDATE SKIP LOCKED` and serializes writers, so on
+SQLite the numbers measure queue overhead rather than row-lock contention;
+pass a Postgres `--database-url` to exercise the locking path.
+
+Usage:
+    python -m benchmarks.bench_task_queue [--workers 500] [--tasks 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from control_plane.database import Base
+from control_plane.services.task_queue import LeaseLostError, TaskQueue
+
+BATCH_SIZE = 5
+WAIT_SECONDS = 2.0
+LEASE_SECONDS = 5.0
+DROP_RATE = 0.01
+# One large org plus many small ones
+ORG_WEIGHTS = {"org-big": 50, **{f"org-{i}": 1 for i in range(50)}}
+
+
+async def main(database_url: str, workers: int, tasks: int) -> None:
+    connect_args = {"timeout": 30} if database_url.startswith("sqlite") else {}
+    engine = create_async_engine(database_url, connect_args=connect_args)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    queue = TaskQueue(
+        lease_seconds=LEASE_SECONDS,
+        max_attempts=5,
+        recheck_seconds=WAIT_SECONDS,
+        session_factory=session_maker,
+    )
+    rng = random.Random(7)
+    orgs = list(ORG_WEIGHTS)
+    weights = list(ORG_WEIGHTS.values())
+
+    enqueued_at: Dict[int, float] = {}
+    latencies: List[float] = []
+    acked: Counter = Counter()
+    done = asyncio.Event()
+    empty_polls = 0
+    small_org_share: List[float] = []
+
+    async def producer():
+        async with session_maker() as session:
+            for _ in range(tasks):
+                org = rng.choices(orgs, weights)[0]
+                task = await queue.enqueue(session, org, "com.bench.agent", {"inputs": {}})
+                enqueued_at[task.id] = time.perf_counter()
+                # Yield now and then so workers drain while we produce
+                if task.id % 50 == 0:
+                    await asyncio.sleep(0)
+
+    async def worker(index: int):
+        nonlocal empty_polls
+        worker_id = f"worker-{index}"
+        worker_rng = random.Random(index)
+        while not done.is_set():
+            async with session_maker() as session:
+                leased = await queue.lease_next(
+                    session, worker_id, BATCH_SIZE, wait_seconds=WAIT_SECONDS
+                )
+                if not leased:
+                    empty_polls += 1
+                    continue
+                now = time.perf_counter()
+                batch_orgs = Counter(task.org_id for task in leased)
+                if len(leased) == BATCH_SIZE:
+                    small_org_share.append(1 - batch_orgs["org-big"] / len(leased))
+                for task in leased:
+                    if worker_rng.random() < DROP_RATE:
+                        continue  # Simulated crash: the sweeper redelivers it
+                    if task.id in enqueued_at:
+                        latencies.append(now - enqueued_at.pop(task.id))
+                    try:
+                        await queue.ack(session, task.id, worker_id)
+                    except LeaseLostError:
+                        continue  # Lease expired under load; it will be redelivered
+                    acked[task.org_id] += 1
+            if sum(acked.values()) >= tasks:
+                done.set()
+
+    async def sweeper():
+        while not done.is_set():
+            await asyncio.sleep(LEASE_SECONDS / 2)
+            async with session_maker() as session:
+                await queue.sweep(session)
+
+    start = time.perf_counter()
+    pollers = [asyncio.create_task(worker(i)) for i in range(workers)]
+    sweep_task = asyncio.create_task(sweeper())
+    await producer()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    for task in [*pollers, sweep_task]:
+        task.cancel()
+    await asyncio.gather(*pollers, sweep_task, return_exceptions=True)
+
+    latencies.sort()
+    completed = sum(acked.values())
+    print(f"workers            {workers}")
+    print(f"tasks completed    {completed} in {elapsed:.2f}s ({completed / elapsed:.0f}/s)")
+    print(f"lease latency p50  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"lease latency p99  {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"SQL per task       {statements / completed:.2f}")
+    print(f"empty polls        {empty_polls}")
+    small_weight = 1 - ORG_WEIGHTS["org-big"] / sum(weights)
+    if small_org_share:
+        print(
+            f"small-org share    {statistics.mean(small_org_share):.0%} of full batches "
+            f"(FIFO would give ~{small_weight:.0%})"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    url = args.database_url or "sqlite+aiosqlite:///" + os.path.join(
+        tempfile.gettempdir(), "bench_task_queue.db"
+    )
+    asyncio.run(main(url, args.workers, args.tasks))
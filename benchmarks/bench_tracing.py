@@ -0,0 +1,111 @@
+"""
+Trace sampling benchmark.
+
+Simulates requests of one server span and a few child spans, where a
+share of requests error or run slow, exported to a stand-in exporter that
+takes a fixed time per batch. Compares always-on sampling through the
+SDK's `BatchSpanProcessor` with `RouteSampler` plus tail sampling through
+`SpanPipeline`, reporting the tracing cost per request, spans exported and
+how many error/slow traces each kept.
+
+Usage:
+    python -m benchmarks.bench_tracing [--requests 20000] [--ratio 0.05]
+"""
+
+import argparse
+import random
+import time
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from opentelemetry.trace import Status, StatusCode
+
+from control_plane.tracing import RouteSampler, SpanPipeline, TailSamplingProcessor
+
+ERROR_SHARE = 0.01
+SLOW_SHARE = 0.01
+SLOW_SECONDS = 0.5
+CHILD_SPANS = 4
+
+
+class StubExporter(SpanExporter):
+    """Counts spans and sleeps per batch like a network exporter."""
+
+    def __init__(self, batch_seconds: float = 0.002):
+        self.batch_seconds = batch_seconds
+        self.spans = 0
+        self.interesting = set()
+
+    def export(self, spans):
+        time.sleep(self.batch_seconds)
+        self.spans += len(spans)
+        for span in spans:
+            if span.attributes.get("bench.kind") in ("error", "slow"):
+                self.interesting.add(span.context.trace_id)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def run(label: str, provider: TracerProvider, exporter: StubExporter, requests: int) -> None:
+    tracer = provider.get_tracer("bench")
+    rng = random.Random(3)
+    expected = 0
+    start = time.perf_counter()
+    for n in range(requests):
+        roll = rng.random()
+        kind = "error" if roll < ERROR_SHARE else "slow" if roll < ERROR_SHARE + SLOW_SHARE else "ok"
+        path = "/api/v1/health" if n % 10 == 0 else "/api/v1/agents"
+        # Health checks are never sampled, whatever happens in them
+        expected += kind != "ok" and path != "/api/v1/health"
+        # Slow requests are backdated rather than slept, to keep the run short
+        start_time = time.time_ns() - (int(SLOW_SECONDS * 1e9) if kind == "slow" else 0)
+        root = tracer.start_span(
+            "GET " + path, attributes={"http.target": path}, start_time=start_time
+        )
+        root.set_attribute("bench.kind", kind)
+        with trace.use_span(root, end_on_exit=True):
+            for child in range(CHILD_SPANS):
+                with tracer.start_as_current_span(f"db.query.{child}") as span:
+                    if kind == "error" and child == CHILD_SPANS - 1:
+                        span.set_status(Status(StatusCode.ERROR))
+    elapsed = time.perf_counter() - start
+    provider.shutdown()
+    print(
+        f"{label:<10} {elapsed / requests * 1e6:7.1f} us/request  "
+        f"{exporter.spans:>7} spans exported  "
+        f"{len(exporter.interesting)}/{expected} error+slow API traces kept"
+    )
+
+
+def main(requests: int, ratio: float) -> None:
+    exporter = StubExporter()
+    provider = TracerProvider(sampler=ALWAYS_ON)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    run("always-on", provider, exporter, requests)
+
+    exporter = StubExporter()
+    pipeline = SpanPipeline(
+        exporter, max_queue_size=4096, max_batch_size=512, schedule_delay_seconds=1.0
+    )
+    tail = TailSamplingProcessor(
+        pipeline,
+        keep_errors=True,
+        slow_seconds=SLOW_SECONDS,
+        max_traces=4096,
+        max_spans_per_trace=512,
+    )
+    provider = TracerProvider(sampler=RouteSampler(ratio, {"/api/v1/health": 0.0}, tail))
+    provider.add_span_processor(tail)
+    run("sampled", provider, exporter, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--ratio", type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.requests, args.ratio)
@@ -0,0 +1,85 @@
+"""
+Memory vector index benchmark.
+
+Builds `IVFIndex` and `FlatIndex` over clustered synthetic embeddings
+(the shape real task summaries take: many near-duplicates around a few
+hundred topics), inserting in batches as runs would, then compares
+recall@k and query latency against exact float32 brute force for a range
+of `nprobe` settings. Also reports on-disk size per vector.
+
+Usage:
+    python -m benchmarks.bench_vector_index [--vectors 100000] [--dim 1536]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from control_plane.services.vector_index import FlatIndex, IVFIndex, normalize
+
+TOPICS = 500
+QUERIES = 200
+K = 10
+BATCH = 1000
+
+
+def main(vectors: int, dim: int, nlist: int) -> None:
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(TOPICS, dim)).astype(np.float32)
+    data = centers[rng.integers(0, TOPICS, vectors)]
+    data += rng.normal(scale=0.8, size=data.shape).astype(np.float32)
+    queries = centers[rng.integers(0, TOPICS, QUERIES)]
+    queries += rng.normal(scale=0.8, size=queries.shape).astype(np.float32)
+    ids = [f"mem-{index}" for index in range(vectors)]
+
+    root = Path(tempfile.mkdtemp(prefix="bench_vector_index_"))
+    ivf = IVFIndex(root / "ivf", dim, nlist=nlist, nprobe=1, train_size=min(vectors, nlist * 64))
+    flat = FlatIndex(root / "flat", dim)
+    for name, index in (("ivf", ivf), ("flat", flat)):
+        start = time.perf_counter()
+        for offset in range(0, vectors, BATCH):
+            index.add(ids[offset:offset + BATCH], data[offset:offset + BATCH])
+        elapsed = time.perf_counter() - start
+        size = sum(path.stat().st_size for path in (root / name).iterdir())
+        print(f"{name:<5} build      {vectors / elapsed:,.0f} vectors/s, "
+              f"{size / vectors:,.0f} bytes/vector on disk (preallocated)")
+
+    exact_data = normalize(data)
+    truth = []
+    brute_ms = []
+    for query in normalize(queries):
+        start = time.perf_counter()
+        scores = exact_data @ query
+        truth.append(set(np.argpartition(-scores, K)[:K].tolist()))
+        brute_ms.append((time.perf_counter() - start) * 1000)
+    print(f"float32 brute force  p50 {statistics.median(brute_ms):.2f} ms")
+
+    def measure(index, label):
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            matches = index.search(query, K)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len({int(memory_id[4:]) for memory_id, _, _ in matches} & expected)
+        latencies.sort()
+        print(f"{label:<20} recall@{K} {hits / (K * len(queries)):.3f}  "
+              f"p50 {statistics.median(latencies):.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+
+    measure(flat, "flat float16")
+    for nprobe in (4, 8, 16, 32, 64):
+        ivf.nprobe = nprobe
+        measure(ivf, f"ivf int8 nprobe={nprobe}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--nlist", type=int, default=256)
+    args = parser.parse_args()
+    main(args.vectors, args.dim, args.nlist)
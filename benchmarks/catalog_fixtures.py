@@ -0,0 +1,63 @@
+"""
+Seeded SQLite stand-in for the agent catalog, shared by benchmarks.
+"""
+
+import random
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from control_plane.database import Base
+from control_plane.models import Agent
+from control_plane.schemas import AgentStatus
+
+CATEGORIES = ["finops", "security", "devops", "analytics", "support", "sales", "hr", "legal"]
+
+
+def agent_row(index: int, rng: random.Random) -> dict:
+    """Build one synthetic agent row."""
+    now = datetime.utcnow()
+    category = CATEGORIES[index % len(CATEGORIES)]
+    return {
+        "agent_id": f"com.bench.{category}.agent-{index}",
+        "name": f"{category.title()} Agent {index}",
+        "description": f"Synthetic {category} agent number {index}",
+        "version": "1.0.0",
+        "status": AgentStatus.PUBLISHED.value if index % 10 else AgentStatus.DRAFT.value,
+        "category": category,
+        "tags": [category, f"tag{index % 50}"],
+        "rating": round(rng.uniform(0, 5), 1),
+        "review_count": rng.randint(0, 500),
+        "price": float(rng.randint(0, 200)),
+        "risk_level": "low",
+        "developer_id": index % 1000,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def create_catalog(
+    url: str, rows: int, seed: int = 7
+) -> Tuple[AsyncEngine, async_sessionmaker]:
+    """Create the schema on `url` and seed it with `rows` synthetic agents."""
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    rng = random.Random(seed)
+    batch = 5000
+    async with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            await conn.execute(
+                insert(Agent),
+                [agent_row(i, rng) for i in range(start, min(start + batch, rows))],
+            )
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
@@ -0,0 +1,7 @@
+"""Agent Marketplace Platform - Control Plane."""
+
+from control_plane.startup_profile import import_timer
+
+# Installed first so the rest of the app's imports are timed
+if import_timer is not None:
+    import_timer.install()
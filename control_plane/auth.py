@@ -0,0 +1,210 @@
+"""
+Authentication helpers for Control Plane.
+JWT verification with a verified-claims cache and public route matching.
+"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import jwt
+from fastapi import HTTPException, Request, status
+
+from control_plane.config import settings
+from control_plane.observability import metrics_instance
+
+# Callback deciding whether verified claims have been revoked (e.g. by jti)
+RevocationHook = Callable[[Dict[str, Any]], bool]
+
+
+class InvalidTokenError(Exception):
+    """Raised when a bearer token fails verification."""
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified token claims.
+    Entries are keyed by the SHA-256 of the token and expire at the earlier
+    of the cache TTL and the token's own `exp` claim.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """Initialize an empty cache."""
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        """Return the cache key for a raw token."""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Return cached claims, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, key: bytes, claims: Dict[str, Any]) -> None:
+        """Cache verified claims, evicting the least recently used entry."""
+        expires_at = time.time() + self.ttl_seconds
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        self._entries[key] = (claims, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: bytes) -> None:
+        """Remove a single entry."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenVerifier:
+    """
+    Verifies bearer tokens with `settings.SECRET_KEY` / `settings.ALGORITHM`,
+    caching verified claims so repeated requests skip signature checks.
+    """
+
+    def __init__(
+        self,
+        cache: TokenCache,
+        is_revoked: Optional[RevocationHook] = None,
+    ):
+        """Initialize the verifier."""
+        self.cache = cache
+        self.is_revoked = is_revoked
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the claims of a valid token or raise InvalidTokenError."""
+        key = self.cache.key(token)
+        claims = self.cache.get(key)
+        if claims is not None:
+            metrics_instance.auth_token_cache_hits_total.inc()
+        else:
+            metrics_instance.auth_token_cache_misses_total.inc()
+            try:
+                claims = jwt.decode(
+                    token,
+                    settings.SECRET_KEY,
+                    algorithms=[settings.ALGORITHM],
+                )
+            except jwt.PyJWTError as exc:
+                raise InvalidTokenError(str(exc)) from exc
+            self.cache.put(key, claims)
+
+        # Revocation is checked on every call so revoking a token takes
+        # effect without waiting for its cache entry to expire.
+        if self.is_revoked is not None and self.is_revoked(claims):
+            self.cache.discard(key)
+            raise InvalidTokenError("Token has been revoked")
+        return claims
+
+    def revoke(self, token: str) -> None:
+        """Drop a token's cached claims."""
+        self.cache.discard(self.cache.key(token))
+
+
+class PublicPathMatcher:
+    """
+    Precompiled matcher for routes that don't require authentication.
+    Exact paths are looked up in a set; parameterized routes are folded
+    into a single anchored regex per HTTP method.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        method_patterns: Dict[str, Iterable[str]],
+    ):
+        """
+        Args:
+            paths: Exact paths that are public for every method.
+            method_patterns: Regex route patterns that are public only for
+                the given HTTP method.
+        """
+        self.paths = frozenset(paths)
+        self.method_patterns = {
+            method: re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+            for method, patterns in method_patterns.items()
+        }
+
+    def is_public(self, method: str, path: str) -> bool:
+        """Return True if the request doesn't require authentication."""
+        if method == "OPTIONS" or path in self.paths:
+            return True
+        pattern = self.method_patterns.get(method)
+        return pattern is not None and pattern.fullmatch(path) is not None
+
+
+def belongs_to_org(user: Optional[Dict[str, Any]], org_id: str) -> bool:
+    """Whether an authenticated user's token is scoped to `org_id`."""
+    if not user or user.get("org_id") is None:
+        return False
+    return str(user["org_id"]) == org_id
+
+
+def require_org_member(request: Request, org_id: str) -> Dict[str, Any]:
+    """Dependency for `/orgs/{org_id}/...` routes: the caller must belong to `org_id`."""
+    user = getattr(request.state, "user", None)
+    if not belongs_to_org(user, org_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this organization",
+        )
+    return user
+
+
+def require_admin(request: Request) -> Dict[str, Any]:
+    """Dependency for platform administration: the caller must hold `ADMIN_ROLE`."""
+    user = getattr(request.state, "user", None)
+    if not user or user.get("role") != settings.ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required",
+        )
+    return user
+
+
+# Public endpoints that don't require authentication
+public_paths = PublicPathMatcher(
+    paths=[
+        "/api/v1/health",
+        "/api/v1/health/ready",
+        "/api/v1/health/live",
+        "/health",
+        "/api/docs",
+        "/api/openapi.json",
+        # Scraped by Prometheus without credentials; keep it off the public edge
+        "/api/v1/metrics",
+    ],
+    method_patterns={
+        # Catalog reads are public: GET /agents, /agents/search, /agents/{id}
+        "GET": [r"/api/v1/agents(?:/[^/]+)?"],
+        "HEAD": [r"/api/v1/agents(?:/[^/]+)?"],
+    },
+)
+
+# Global verifier instance
+token_verifier = TokenVerifier(
+    TokenCache(
+        max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+        ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+    )
+)
@@ -1,50 +1,271 @@
 """
 Database configuration and session management for Control Plane.
 Uses SQLAlchemy with PostgreSQL for relational data.
+
+Writes go to the primary. Read-only dependencies (`get_read_session`) are
+routed to the read replicas in `DATABASE_REPLICA_URLS` while their
+replication lag is within `DATABASE_REPLICA_MAX_LAG_SECONDS`, and to the
+primary otherwise. Every engine's pool reports checkout wait, overflow
+use, pre-ping cost and query durations, labelled by engine name.
 """
 
-from typing import AsyncGenerator
+import asyncio
+import functools
+import itertools
+import logging
+import time
+from enum import Enum
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 
+from sqlalchemy import event, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     create_async_engine,
     async_sessionmaker,
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import ORMExecuteState, Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
 
 from control_plane.config import settings
+from control_plane.observability import metrics_instance
+
+logger = logging.getLogger(__name__)
+
+_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+# Zero while a standby has replayed everything it received, so an idle
+# primary doesn't read as lag
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that stamps each connection record with when the checkout
+    started and when a connection was obtained, for the `checkout` event
+    to turn into wait and pre-ping timings.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        record = super()._do_get()
+        # A recursive retry stamps first; the outermost call overwrites it
+        record.info["checkout_timing"] = (started, time.perf_counter(), record.fresh)
+        return record
+
+
+def _async_url(url: str) -> str:
+    return url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+def instrument_engine(db_engine: AsyncEngine, name: str) -> None:
+    """Record pool and query metrics for an engine under `name`."""
+    sync_engine = db_engine.sync_engine
+    active = metrics_instance.db_connections_active.labels(pool=name)
+    overflow = metrics_instance.db_pool_overflow.labels(pool=name)
+    wait = metrics_instance.db_pool_checkout_wait_seconds.labels(pool=name)
+    preping = metrics_instance.db_pool_preping_seconds.labels(pool=name)
+    queries = {
+        operation: metrics_instance.db_query_duration.labels(pool=name, operation=operation)
+        for operation in _OPERATIONS + ("OTHER",)
+    }
+
+    def update_gauges(returning: int = 0) -> None:
+        # Looked up each time, since `dispose` replaces the pool
+        pool = sync_engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            active.set(max(pool.checkedout() - returning, 0))
+            overflow.set(max(pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, record, proxy) -> None:
+        timing = record.info.pop("checkout_timing", None)
+        if timing is not None:
+            started, obtained, fresh = timing
+            wait.observe(obtained - started)
+            # Fresh connections skip the pre-ping
+            if sync_engine.pool._pre_ping and not fresh:
+                preping.observe(time.perf_counter() - obtained)
+        update_gauges()
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, record) -> None:
+        # Fires before the connection is back in the pool
+        update_gauges(returning=1)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, "query_started", None)
+        if started is None:
+            return
+        operation = statement.lstrip()[:6].upper()
+        queries.get(operation, queries["OTHER"]).observe(time.perf_counter() - started)
+
+
+def build_engine(
+    url: str,
+    name: str,
+    pool_size: int,
+    max_overflow: int,
+) -> AsyncEngine:
+    """Create an instrumented async engine."""
+    db_engine = create_async_engine(
+        _async_url(url),
+        echo=settings.DATABASE_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,  # Verify connections before using
+        pool_logging_name=name,
+    )
+    instrument_engine(db_engine, name)
+    return db_engine
+
 
 # Database URL for async operations
-DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+DATABASE_URL = _async_url(settings.DATABASE_URL)
 
 # Create async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=settings.DATABASE_ECHO,
+engine = build_engine(
+    settings.DATABASE_URL,
+    "primary",
     pool_size=settings.DATABASE_POOL_SIZE,
     max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    pool_pre_ping=True,  # Verify connections before using
 )
 
+# Options every session is created with
+SESSION_OPTIONS: Dict[str, Any] = {"expire_on_commit": False, "autoflush": False}
+
 # Create session factory
-async_session_maker = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False,
-)
+async_session_maker = async_sessionmaker(engine, class_=AsyncSession, **SESSION_OPTIONS)
 
 # Base class for ORM models
 Base = declarative_base()
 
 
+class Replica:
+    """A read replica engine and its last measured replication lag."""
+
+    __slots__ = ("name", "engine", "lag_seconds")
+
+    def __init__(self, name: str, db_engine: AsyncEngine):
+        self.name = name
+        self.engine = db_engine
+        # Unknown until the first check, so reads start on the primary
+        self.lag_seconds = float("inf")
+
+
+class SessionRouter:
+    """
+    Routes read-only sessions round robin over replicas whose lag is
+    within `max_lag_seconds`, falling back to the primary when none is.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: List[Replica],
+        max_lag_seconds: float,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self._next = itertools.count()
+
+    def pick(self) -> Optional[Replica]:
+        """A replica within the lag budget, or None for the primary."""
+        count = len(self.replicas)
+        start = next(self._next)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.lag_seconds <= self.max_lag_seconds:
+                return replica
+        return None
+
+    def read_engine(self) -> AsyncEngine:
+        """The engine the next read-only session should use."""
+        replica = self.pick()
+        target = replica.name if replica is not None else "primary"
+        metrics_instance.db_read_sessions_total.labels(target=target).inc()
+        return replica.engine if replica is not None else self.primary
+
+    def read_session(self) -> AsyncSession:
+        """Open a session for reads that tolerate replication lag."""
+        return AsyncSession(bind=self.read_engine(), **SESSION_OPTIONS)
+
+    async def check_lag(self) -> None:
+        """Measure every replica's lag; an unreachable replica counts as lagging."""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    if conn.dialect.name == "postgresql":
+                        lag = float((await conn.execute(_REPLICA_LAG_SQL)).scalar() or 0)
+                    else:
+                        lag = 0.0
+            except Exception:
+                logger.warning("Replica %s lag check failed", replica.name, exc_info=True)
+                lag = float("inf")
+            replica.lag_seconds = lag
+            metrics_instance.db_replica_lag_seconds.labels(replica=replica.name).set(lag)
+
+    async def run_lag_monitor(self, interval_seconds: float) -> None:
+        """Check replica lag every `interval_seconds`, until cancelled."""
+        while self.replicas:
+            await self.check_lag()
+            await asyncio.sleep(interval_seconds)
+
+
+def _create_replicas() -> List[Replica]:
+    replicas = []
+    for index, url in enumerate(settings.DATABASE_REPLICA_URLS):
+        name = f"replica-{index}"
+        db_engine = build_engine(
+            url,
+            name,
+            pool_size=settings.DATABASE_REPLICA_POOL_SIZE,
+            max_overflow=settings.DATABASE_REPLICA_MAX_OVERFLOW,
+        )
+        replicas.append(Replica(name, db_engine))
+    return replicas
+
+
+# Global session router over the configured replicas
+session_router = SessionRouter(
+    engine,
+    _create_replicas(),
+    max_lag_seconds=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+)
+
+
 async def init_db():
     """Initialize database (create tables if they don't exist)."""
+    from control_plane import models  # noqa: F401  (registers ORM models on Base)
+
     async with engine.begin() as conn:
         # In production, use Alembic migrations instead
         await conn.run_sync(Base.metadata.create_all)
 
 
+def upsert_insert(session: AsyncSession):
+    """Return the session dialect's INSERT construct with ON CONFLICT support."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency for getting database session.
@@ -60,6 +281,210 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read-only handlers that tolerate up to
+    `DATABASE_REPLICA_MAX_LAG_SECONDS` of replication lag.
+    Don't write through it; the session may be on a replica.
+    """
+    async with session_router.read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+class TransactionScope(str, Enum):
+    """How long a `LazySession` holds its connection."""
+
+    # Until the handler commits or releases the session
+    TRANSACTION = "transaction"
+    # A read-only transaction, until the handler releases the session
+    READ_ONLY = "read_only"
+    # Back to the pool after every statement; each statement commits itself
+    AUTOCOMMIT = "autocommit"
+
+
+_SCOPE_OPTIONS: Dict[TransactionScope, Dict[str, Any]] = {
+    TransactionScope.READ_ONLY: {"postgresql_readonly": True},
+    TransactionScope.AUTOCOMMIT: {"isolation_level": "AUTOCOMMIT"},
+}
+_scoped_binds: Dict[Tuple[int, TransactionScope], AsyncEngine] = {}
+
+
+def scoped_bind(db_engine: AsyncEngine, scope: TransactionScope) -> AsyncEngine:
+    """A view of `db_engine`, sharing its pool, whose connections begin in `scope`."""
+    options = _SCOPE_OPTIONS.get(scope)
+    if options is None:
+        return db_engine
+    key = (id(db_engine), scope)
+    bind = _scoped_binds.get(key)
+    if bind is None:
+        bind = _scoped_binds[key] = db_engine.execution_options(**options)
+    return bind
+
+
+class StatementStats:
+    """Statements run through one session, their time and connection hold time."""
+
+    __slots__ = ("statements", "seconds", "hold_seconds", "held_since")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.hold_seconds = 0.0
+        self.held_since: Optional[float] = None
+
+    def record(self, statement: Any, started: float) -> None:
+        # Time spent waiting for the connection isn't the statement's
+        if self.held_since is not None and self.held_since > started:
+            started = self.held_since
+        seconds = time.perf_counter() - started
+        self.statements += 1
+        self.seconds += seconds
+        if seconds >= settings.DATABASE_SLOW_STATEMENT_SECONDS:
+            logger.warning("Slow statement (%.3fs): %.500s", seconds, statement)
+
+    def publish(self, state: Any, scope: TransactionScope) -> None:
+        """Record the session in metrics and add it to the request's totals."""
+        if self.held_since is not None:
+            self.hold_seconds += time.perf_counter() - self.held_since
+            self.held_since = None
+        metrics_instance.db_session_hold_seconds.labels(scope=scope.value).observe(
+            self.hold_seconds
+        )
+        metrics_instance.db_session_statements.labels(scope=scope.value).observe(self.statements)
+        state.db_statements = getattr(state, "db_statements", 0) + self.statements
+        state.db_seconds = getattr(state, "db_seconds", 0.0) + self.seconds
+        state.db_hold_seconds = getattr(state, "db_hold_seconds", 0.0) + self.hold_seconds
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _time_statement(execute_state: ORMExecuteState):
+    stats = execute_state.session.info.get("statement_stats")
+    if stats is None:
+        return None
+    started = time.perf_counter()
+    try:
+        return execute_state.invoke_statement()
+    finally:
+        stats.record(execute_state.statement, started)
+
+
+@event.listens_for(Session, "after_begin")
+def _connection_held(session: Session, transaction, connection) -> None:
+    stats = session.info.get("statement_stats")
+    if stats is not None and stats.held_since is None:
+        stats.held_since = time.perf_counter()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _connection_released(session: Session, transaction) -> None:
+    stats = session.info.get("statement_stats")
+    if stats is not None and stats.held_since is not None and transaction.parent is None:
+        stats.hold_seconds += time.perf_counter() - stats.held_since
+        stats.held_since = None
+
+
+class LazySession:
+    """
+    Stands in for an `AsyncSession` that is created on first use, so a
+    request served from cache or rejected before touching the database
+    never builds a session or checks out a connection. Attributes not
+    defined here are those of the underlying session.
+
+    `release` returns the connection to the pool; handlers should call it
+    once they're done with the database rather than hold the connection
+    while the response is serialized and sent.
+    """
+
+    def __init__(self, bind: Callable[[], AsyncEngine], scope: TransactionScope):
+        """
+        Args:
+            bind: Picks the engine when the session is first used.
+            scope: Transaction scope the session's connections begin in.
+        """
+        self._bind = bind
+        self.scope = scope
+        self.stats = StatementStats()
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        """The underlying session, created on first access."""
+        if self._session is None:
+            bind = scoped_bind(self._bind(), self.scope)
+            self._session = AsyncSession(bind=bind, **SESSION_OPTIONS)
+            self._session.sync_session.info["statement_stats"] = self.stats
+        return self._session
+
+    @property
+    def used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def _statement(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        result = await getattr(self.session, method)(*args, **kwargs)
+        if self.scope is TransactionScope.AUTOCOMMIT:
+            # Nothing to commit; this only hands the connection back
+            await self.session.commit()
+        return result
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._statement("execute", *args, **kwargs)
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._statement("scalar", *args, **kwargs)
+
+    async def scalars(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._statement("scalars", *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._statement("get", *args, **kwargs)
+
+    async def release(self) -> None:
+        """Return the connection to the pool, discarding uncommitted changes."""
+        if self._session is not None:
+            await self._session.close()
+
+
+@functools.lru_cache(maxsize=None)
+def lazy_session(
+    scope: TransactionScope = TransactionScope.TRANSACTION,
+    replica: bool = False,
+) -> Callable[[Request], AsyncGenerator[LazySession, None]]:
+    """
+    Dependency factory for a `LazySession`.
+    Usage in FastAPI:
+        @app.get("/")
+        async def my_endpoint(
+            session: LazySession = Depends(lazy_session(TransactionScope.READ_ONLY)),
+        ):
+            ...
+
+    Args:
+        scope: Transaction scope of the session.
+        replica: Route the session like `get_read_session`; only for reads
+            that tolerate replication lag.
+    """
+    bind = session_router.read_engine if replica else lambda: engine
+
+    async def dependency(request: Request) -> AsyncGenerator[LazySession, None]:
+        session = LazySession(bind, scope)
+        try:
+            yield session
+        finally:
+            await session.release()
+            if session.used:
+                session.stats.publish(request.state, scope)
+
+    return dependency
+
+
 async def close_db():
     """Close database connections."""
     await engine.dispose()
+    for replica in session_router.replicas:
+        await replica.engine.dispose()
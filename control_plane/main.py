@@ -10,23 +10,18 @@ Architecture:
 - Communication: HTTPS only (outbound from Data Plane)
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import Optional
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
-from pydantic_settings import BaseSettings
 
 from control_plane.config import settings
-from control_plane.database import init_db, get_session
-from control_plane.middleware import (
-    AuthMiddleware,
-    ErrorHandlerMiddleware,
-    RequestLoggingMiddleware,
-)
+from control_plane.database import async_session_maker, close_db, init_db, session_router
+from control_plane.middleware import RateLimitMiddleware, RequestPipelineMiddleware
 from control_plane.routers import (
     agents,
     deployments,
@@ -34,8 +29,23 @@ from control_plane.routers import (
     approvals,
     telemetry,
     health,
+    tasks,
+    memory,
+    webhooks,
 )
-from control_plane.observability import setup_observability
+from control_plane.observability import setup_observability, shutdown_observability
+from control_plane.services import agent_service
+from control_plane.services.billing_service import usage_meter
+from control_plane.services.embedding_cache import embedding_cache
+from control_plane.services.health import data_plane_probe, loop_lag_monitor
+from control_plane.services.leader import background_leader
+from control_plane.services.log_store import log_store
+from control_plane.services.notifications import notification_dispatcher
+from control_plane.services.outbox import outbox_dispatcher
+from control_plane.services.rate_limit import rate_limiter
+from control_plane.services.retention import retention_engine
+from control_plane.services.task_queue import task_queue
+from control_plane.startup_profile import FirstRequestProbe, import_timer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -51,16 +61,57 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Control Plane...")
     await init_db()
-    setup_observability()
+    async with async_session_maker() as session:
+        indexed = await agent_service.rebuild_search_index(session)
+    logger.info(f"Indexed {indexed} published agents for search")
+    # The sweeper and retention elect one worker, through `background_leader`,
+    # for their shared work. The usage flusher and replica-lag monitor run in
+    # every worker: each flushes its own counters and routes its own reads.
+    task_sweeper = asyncio.create_task(
+        task_queue.run_sweeper(settings.TASK_QUEUE_SWEEP_INTERVAL_SECONDS)
+    )
+    log_flusher = asyncio.create_task(log_store.run_flusher())
+    usage_flusher = asyncio.create_task(
+        usage_meter.run_flusher(settings.USAGE_METER_FLUSH_SECONDS)
+    )
+    retention = asyncio.create_task(retention_engine.run_forever())
+    replica_lag = asyncio.create_task(
+        session_router.run_lag_monitor(settings.DATABASE_REPLICA_LAG_CHECK_SECONDS)
+    )
+    notification_dispatcher.start()
+    outbox_dispatcher.start()
+    loop_lag_monitor.start()
     logger.info("Control Plane started successfully")
+    if import_timer is not None:
+        import_timer.report()
 
     yield
 
     # Shutdown
     logger.info("Shutting down Control Plane...")
+    task_sweeper.cancel()
+    retention.cancel()
+    replica_lag.cancel()
+    log_flusher.cancel()
+    await asyncio.to_thread(log_store.flush)
+    usage_flusher.cancel()
+    async with async_session_maker() as session:
+        await usage_meter.flush(session)
+    await embedding_cache.close()
+    await notification_dispatcher.stop()
+    await outbox_dispatcher.stop()
+    await loop_lag_monitor.stop()
+    await data_plane_probe.close()
+    await rate_limiter.backend.close()
+    await close_db()
+    background_leader.release()
+    shutdown_observability()
     logger.info("Control Plane shutdown complete")
 
 
+# Instrumentation patches FastAPI, so it has to precede the app
+setup_observability()
+
 # Create FastAPI application
 app = FastAPI(
     title="Agent Marketplace Platform - Control Plane",
@@ -72,6 +123,9 @@ app = FastAPI(
 )
 
 # Add middleware (order matters - added in reverse order of execution)
+if settings.RATE_LIMIT_ENABLED:
+    # Innermost, so 429s carry CORS headers and the pipeline has authenticated
+    app.add_middleware(RateLimitMiddleware)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.ALLOWED_HOSTS)
 app.add_middleware(
     CORSMiddleware,
@@ -80,9 +134,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(ErrorHandlerMiddleware)
-app.add_middleware(AuthMiddleware)
+# Request ID, auth, error mapping, metrics and access logging in one ASGI layer
+app.add_middleware(RequestPipelineMiddleware)
+if import_timer is not None:
+    app.add_middleware(FirstRequestProbe, timer=import_timer)
 
 
 # Include routers
@@ -92,6 +147,9 @@ app.include_router(deployments.router, prefix="/api/v1", tags=["deployments"])
 app.include_router(billing.router, prefix="/api/v1", tags=["billing"])
 app.include_router(approvals.router, prefix="/api/v1", tags=["approvals"])
 app.include_router(telemetry.router, prefix="/api/v1", tags=["telemetry"])
+app.include_router(tasks.router, prefix="/api/v1", tags=["tasks"])
+app.include_router(memory.router, prefix="/api/v1", tags=["memory"])
+app.include_router(webhooks.router, prefix="/api/v1", tags=["webhooks"])
 
 
 # Root endpoint
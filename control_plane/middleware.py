@@ -1,20 +1,257 @@
 """
 Middleware for Control Plane FastAPI application.
 Handles authentication, error handling, and request logging.
+
+`RequestPipelineMiddleware` is the middleware installed by `main.py`. It is a
+raw ASGI middleware that performs request-ID assignment, authentication,
+error mapping, request metrics and access logging in a single pass.
+`RateLimitMiddleware` runs inside it, once the tenant is known. The `BaseHTTPMiddleware`
+classes below are the previous stack; they are kept for the middleware
+benchmark (`benchmarks/bench_middleware.py`).
 """
 
 import json
 import logging
 import time
 import uuid
-from typing import Callable
+from typing import Callable, Optional
 
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.websockets import WebSocketClose
+
+from control_plane.auth import InvalidTokenError, public_paths, token_verifier
+from control_plane.observability import UNMATCHED_ROUTE, request_metrics
+from control_plane.services.rate_limit import (
+    RateLimiter,
+    RouteClassifier,
+    rate_limiter,
+    retry_after_header,
+    route_classifier,
+)
 
 logger = logging.getLogger(__name__)
 
+def user_from_claims(claims: dict) -> dict:
+    """Build the `request.state.user` mapping from verified JWT claims."""
+    return {
+        "id": claims.get("sub"),
+        "org_id": claims.get("org_id"),
+        "role": claims.get("role", "user"),
+    }
+
+
+class RequestPipelineMiddleware:
+    """
+    Fused request pipeline implemented as a pure ASGI middleware.
+    Assigns request IDs, authenticates, maps unhandled errors to 500
+    responses, records request metrics and writes the access log without
+    spawning extra tasks or wrapping the response body stream.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "websocket":
+            await self.handle_websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = str(uuid.uuid4())
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        method = scope["method"]
+        path = scope["path"]
+        start_time = time.perf_counter()
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        response_started = False
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), request_id_header]
+            await send(message)
+
+        try:
+            error = None
+            if not public_paths.is_public(method, path):
+                error = self.authenticate(scope, state)
+            else:
+                # Public routes still identify callers that send a valid
+                # token, e.g. developers reading their unpublished agents
+                self.authenticate(scope, state)
+
+            if error is not None:
+                response = JSONResponse(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    content={"detail": error},
+                )
+                await response(scope, receive, send_with_request_id)
+            else:
+                await self.app(scope, receive, send_with_request_id)
+        except Exception as exc:
+            logger.error(
+                "[%s] Unhandled exception: %s",
+                request_id,
+                exc,
+                exc_info=True,
+                extra={"request_id": request_id, "path": path, "method": method},
+            )
+            if response_started:
+                # Headers are already on the wire; let the server abort the
+                # connection rather than emit a second response.
+                raise
+            response = JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={
+                    "detail": "Internal server error",
+                    "request_id": request_id,
+                },
+            )
+            await response(scope, receive, send_with_request_id)
+        finally:
+            duration = time.perf_counter() - start_time
+            # The router stores the matched route in the shared scope; its
+            # template keeps the endpoint label bounded
+            route = scope.get("route")
+            request_metrics.observe(
+                route.path_format if route is not None else UNMATCHED_ROUTE,
+                method,
+                status_code,
+                duration,
+            )
+            if logger.isEnabledFor(logging.INFO):
+                extra = {
+                    "request_id": request_id,
+                    "method": method,
+                    "path": path,
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status_code": status_code,
+                    "duration_seconds": duration,
+                }
+                # Set by `lazy_session` for requests that used the database
+                if "db_statements" in state:
+                    extra["db_statements"] = state["db_statements"]
+                    extra["db_seconds"] = state["db_seconds"]
+                    extra["db_hold_seconds"] = state["db_hold_seconds"]
+                logger.info(
+                    "[%s] %s %s - %s (%.2fs)",
+                    request_id,
+                    method,
+                    path,
+                    status_code,
+                    duration,
+                    extra=extra,
+                )
+
+    async def handle_websocket(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Authenticate a WebSocket handshake, rejecting it with 1008 on failure."""
+        state = scope.setdefault("state", {})
+        if not public_paths.is_public("GET", scope["path"]):
+            error = self.authenticate(scope, state)
+            if error is not None:
+                # Closing before accept makes the server refuse the handshake
+                await WebSocketClose(code=status.WS_1008_POLICY_VIOLATION, reason=error)(
+                    scope, receive, send
+                )
+                return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def authenticate(scope: Scope, state: dict) -> Optional[str]:
+        """
+        Validate the Authorization header of a protected request.
+        Stores the user on the request state and returns None on success,
+        otherwise returns the error detail for a 401 response.
+        """
+        auth_header = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth_header = value.decode("latin-1")
+                break
+
+        if not auth_header:
+            return "Missing authorization header"
+
+        try:
+            scheme, token = auth_header.split()
+        except ValueError:
+            return "Invalid authorization header"
+
+        if scheme.lower() != "bearer":
+            return "Invalid authorization scheme"
+
+        try:
+            claims = token_verifier.verify(token)
+        except InvalidTokenError:
+            return "Invalid or expired token"
+
+        state["user"] = user_from_claims(claims)
+        return None
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware applying per-tenant rate limits and in-flight
+    caps to authenticated requests and WebSocket handshakes, answering
+    the rest with 429 or closing the socket with 1013. The tenant is the
+    token's org; tokens without one are only limited per user. Anonymous
+    public reads are not limited here.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: RateLimiter = rate_limiter,
+        classifier: RouteClassifier = route_classifier,
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.classifier = classifier
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        scope_type = scope["type"]
+        user = scope.get("state", {}).get("user") if scope_type in ("http", "websocket") else None
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The token's org is trusted; an org in the path is not, since the
+        # caller may not belong to it
+        org_id = user.get("org_id")
+        if scope_type == "websocket":
+            route_class = "stream"
+        else:
+            route_class = self.classifier.classify(scope["method"], scope["path"])
+        rejection = await self.limiter.admit(org_id, user.get("id"), route_class)
+        if rejection is not None:
+            limit, wait_seconds = rejection
+            if scope_type == "websocket":
+                response = WebSocketClose(
+                    code=status.WS_1013_TRY_AGAIN_LATER, reason="Rate limit exceeded"
+                )
+            else:
+                response = JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "Rate limit exceeded", "limit": limit},
+                    headers={"Retry-After": retry_after_header(wait_seconds)},
+                )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(org_id, route_class)
+
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Log all incoming requests and responses."""
@@ -64,19 +301,10 @@ class AuthMiddleware(BaseHTTPMiddleware):
     Validates JWT tokens and extracts user information.
     """
 
-    # Public endpoints that don't require authentication
-    PUBLIC_PATHS = [
-        "/api/v1/health",
-        "/health",
-        "/api/docs",
-        "/api/openapi.json",
-        "/api/v1/agents",  # GET /agents is public
-    ]
-
     async def dispatch(self, request: Request, call_next: Callable):
         """Validate authentication for protected endpoints."""
         # Skip authentication for public endpoints
-        if request.url.path in self.PUBLIC_PATHS or request.method == "OPTIONS":
+        if public_paths.is_public(request.method, request.url.path):
             return await call_next(request)
 
         # Extract token from Authorization header
@@ -95,9 +323,14 @@ class AuthMiddleware(BaseHTTPMiddleware):
                     content={"detail": "Invalid authorization scheme"},
                 )
 
-            # TODO: Validate JWT token and extract user info
-            # For now, just pass through
-            request.state.user = {"id": "user-123", "role": "admin"}
+            claims = token_verifier.verify(token)
+            request.state.user = user_from_claims(claims)
+
+        except InvalidTokenError:
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"detail": "Invalid or expired token"},
+            )
 
         except ValueError:
             return JSONResponse(
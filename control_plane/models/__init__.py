@@ -0,0 +1,23 @@
+"""
+SQLAlchemy ORM models for Control Plane.
+All models are registered on `control_plane.database.Base`.
+"""
+
+from control_plane.models.agent import Agent
+from control_plane.models.approval import Approval
+from control_plane.models.retention import RetentionCheckpoint
+from control_plane.models.run import AgentRun
+from control_plane.models.task import Task
+from control_plane.models.usage import UsageHourly
+from control_plane.models.webhook import OutboxEvent, WebhookSubscription
+
+__all__ = [
+    "Agent",
+    "AgentRun",
+    "Approval",
+    "OutboxEvent",
+    "RetentionCheckpoint",
+    "Task",
+    "UsageHourly",
+    "WebhookSubscription",
+]
@@ -0,0 +1,51 @@
+"""
+Agent ORM models.
+Backs the marketplace catalog served by `routers/agents.py`.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Float, Index, Integer, String, Text
+
+from control_plane.database import Base
+from control_plane.schemas import AgentStatus
+
+
+class Agent(Base):
+    """A marketplace agent and its latest manifest."""
+
+    __tablename__ = "agents"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    agent_id = Column(String(255), nullable=False, unique=True)
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=False, default="")
+    version = Column(String(64), nullable=False)
+    status = Column(String(32), nullable=False, default=AgentStatus.DRAFT.value)
+    category = Column(String(64), nullable=False)
+    tags = Column(JSON, nullable=False, default=list)
+    manifest = Column(JSON, nullable=True)
+    container_image = Column(String(512), nullable=True)
+    helm_chart_url = Column(String(512), nullable=True)
+    rating = Column(Float, nullable=False, default=0.0)
+    review_count = Column(Integer, nullable=False, default=0)
+    price = Column(Float, nullable=False, default=0.0)
+    risk_level = Column(String(32), nullable=False, default="low")
+    developer_id = Column(Integer, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        # Catalog listing seeks on (status, category) and walks (rating, id)
+        # in keyset order, so both the category-filtered and the unfiltered
+        # listing are a single index range scan with no sort step.
+        Index(
+            "ix_agents_status_category_rating_id",
+            "status",
+            "category",
+            rating.desc(),
+            id.desc(),
+        ),
+    )
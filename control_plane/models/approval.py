@@ -0,0 +1,39 @@
+"""
+Approval ORM models.
+Human-in-the-loop approvals requested by agent runs before remediation.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String, Text
+
+from control_plane.database import Base
+from control_plane.schemas import ApprovalStatus
+
+
+class Approval(Base):
+    """An action waiting for, or decided by, an org's approvers."""
+
+    __tablename__ = "approvals"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    approval_id = Column(String(64), nullable=False, unique=True)
+    org_id = Column(String(64), nullable=False)
+    run_id = Column(String(64), nullable=True)
+    agent_id = Column(String(255), nullable=False)
+    action = Column(Text, nullable=False)
+    impact = Column(JSON, nullable=False, default=dict)
+    status = Column(String(16), nullable=False, default=ApprovalStatus.PENDING.value)
+    decided_by = Column(String(255), nullable=True)
+    decided_at = Column(DateTime, nullable=True)
+    comments = Column(Text, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        # The approval queue pages through one org's items of one status, oldest first
+        Index("ix_approvals_org_id_status_id", "org_id", "status", "id"),
+    )
@@ -0,0 +1,22 @@
+"""
+Retention ORM models.
+Checkpoints that let chunked retention deletes resume after a restart.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, String
+
+from control_plane.database import Base
+
+
+class RetentionCheckpoint(Base):
+    """The last primary key a retention job has scanned past."""
+
+    __tablename__ = "retention_checkpoints"
+
+    job = Column(String(64), primary_key=True)
+    position = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
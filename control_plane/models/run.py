@@ -0,0 +1,37 @@
+"""
+Agent run ORM models.
+Results reported by Data Plane workers when a run finishes.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String, Text
+
+from control_plane.database import Base
+
+
+class AgentRun(Base):
+    """The recorded outcome of one agent run (`agentExecutions` in the web app)."""
+
+    __tablename__ = "agent_runs"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    run_id = Column(String(64), nullable=False, unique=True)
+    org_id = Column(String(64), nullable=False)
+    agent_id = Column(String(255), nullable=False)
+    deployment_id = Column(String(64), nullable=True)
+    status = Column(String(16), nullable=False)
+    outputs = Column(JSON, nullable=True)
+    logs = Column(JSON, nullable=True)
+    metrics = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    execution_time_ms = Column(Integer, nullable=True)
+    completed_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        Index("ix_agent_runs_org_id_completed_at", "org_id", "completed_at"),
+    )
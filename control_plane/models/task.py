@@ -0,0 +1,41 @@
+"""
+Task queue ORM models.
+Agent runs waiting for, or leased by, Data Plane workers.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String
+
+from control_plane.database import Base
+from control_plane.schemas import TaskStatus
+
+
+class Task(Base):
+    """One queued agent run."""
+
+    __tablename__ = "tasks"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    run_id = Column(String(64), nullable=False, unique=True)
+    org_id = Column(String(64), nullable=False)
+    agent_id = Column(String(255), nullable=False)
+    deployment_id = Column(String(64), nullable=True)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(16), nullable=False, default=TaskStatus.QUEUED.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        # Leasing reads the oldest queued tasks of one org at a time
+        Index("ix_tasks_org_id_status_id", "org_id", "status", "id"),
+        # The lease sweeper scans expired leases
+        Index("ix_tasks_status_lease_expires_at", "status", "lease_expires_at"),
+    )
@@ -0,0 +1,28 @@
+"""
+Usage metering ORM models.
+Hourly usage rollups that invoices are priced from.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, UniqueConstraint
+
+from control_plane.database import Base
+
+
+class UsageHourly(Base):
+    """Usage of one agent by one org within one UTC hour."""
+
+    __tablename__ = "usage_hourly"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    org_id = Column(String(64), nullable=False)
+    agent_id = Column(String(255), nullable=False)
+    hour = Column(DateTime, nullable=False)
+    runs = Column(BigInteger, nullable=False, default=0)
+    records = Column(BigInteger, nullable=False, default=0)
+    cpu_ms = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        # Also serves one org's period scans
+        UniqueConstraint("org_id", "hour", "agent_id", name="uq_usage_hourly_org_hour_agent"),
+        Index("ix_usage_hourly_hour", "hour"),
+    )
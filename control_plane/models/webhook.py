@@ -0,0 +1,58 @@
+"""
+Webhook ORM models.
+Org webhook subscriptions, and the transactional outbox of events waiting
+to be delivered to them or to the Data Plane.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, Index, Integer, String, Text
+
+from control_plane.database import Base
+from control_plane.schemas import OutboxStatus
+
+
+class WebhookSubscription(Base):
+    """An org's endpoint for webhook events."""
+
+    __tablename__ = "webhook_subscriptions"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    webhook_id = Column(String(64), nullable=False, unique=True)
+    org_id = Column(String(64), nullable=False, index=True)
+    url = Column(String(2048), nullable=False)
+    # Event types to deliver; empty for all
+    events = Column(JSON, nullable=False, default=list)
+    secret = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class OutboxEvent(Base):
+    """
+    One event for one destination.
+    Written in the same transaction as the state change it reports, with
+    the request body already serialized and signed.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    event_id = Column(String(64), nullable=False)
+    org_id = Column(String(64), nullable=False)
+    event_type = Column(String(64), nullable=False)
+    destination = Column(String(2048), nullable=False)
+    # Staged for the Data Plane, an internal service, rather than a webhook
+    data_plane = Column(Boolean, nullable=False, default=False)
+    body = Column(Text, nullable=False)
+    headers = Column(JSON, nullable=False, default=dict)
+    status = Column(String(16), nullable=False, default=OutboxStatus.PENDING.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # The dispatcher claims the oldest due pending events
+        Index("ix_outbox_events_status_available_at_id", "status", "available_at", "id"),
+    )
@@ -1,27 +1,53 @@
 """
 Observability setup for Control Plane.
-Configures OpenTelemetry for tracing, metrics, and logging.
+Configures OpenTelemetry for tracing, metrics, and logging. Exporters and
+instrumentors are imported only for the configured backend, so cold starts
+with tracing off never load the OpenTelemetry SDK. The OpenTelemetry
+metrics SDK is set up on the first `get_meter` call, not at startup.
+
+Prometheus metrics are served as text exposition by `render_metrics`.
+When `PROMETHEUS_MULTIPROC_DIR` is set in the environment (it must be set
+before the workers start, to an empty directory), every uvicorn worker
+writes its samples there and a scrape of any worker returns the totals.
 """
 
 import logging
-from typing import Optional
-
-from opentelemetry import trace, metrics
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.exporter.prometheus import PrometheusMetricReader
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.gcp_trace import CloudTraceExporter
-from prometheus_client import Counter, Histogram, Gauge
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 
 from control_plane.config import settings
 
+if TYPE_CHECKING:
+    from opentelemetry.metrics import Meter
+    from opentelemetry.sdk.trace.export import SpanExporter
+    from opentelemetry.trace import Tracer
+
 logger = logging.getLogger(__name__)
 
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Label for requests that matched no route, so unknown paths add no series
+UNMATCHED_ROUTE = "<unmatched>"
+
+_HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Set by `setup_tracing`, shut down with the worker to flush queued spans
+_tracer_provider = None
+
+# Set by `setup_metrics` on the first `get_meter` call
+_meter_provider = None
+
 
 def setup_observability():
     """Initialize OpenTelemetry instrumentation."""
@@ -37,30 +63,11 @@ def setup_production_observability():
 
     # Configure tracing with Google Cloud Trace
     if settings.ENABLE_TRACING:
-        cloud_trace_exporter = CloudTraceExporter(
-            project_id=settings.GCP_PROJECT_ID
-        )
-        trace_provider = TracerProvider()
-        trace_provider.add_span_processor(
-            BatchSpanProcessor(cloud_trace_exporter)
-        )
-        trace.set_tracer_provider(trace_provider)
-
-        # Instrument FastAPI
-        FastAPIInstrumentor().instrument()
-
-        # Instrument SQLAlchemy
-        SQLAlchemyInstrumentor().instrument()
+        from opentelemetry.exporter.gcp_trace import CloudTraceExporter
 
+        setup_tracing(CloudTraceExporter(project_id=settings.GCP_PROJECT_ID))
         logger.info("Tracing configured with Google Cloud Trace")
 
-    # Configure metrics
-    if settings.ENABLE_METRICS:
-        prometheus_reader = PrometheusMetricReader()
-        meter_provider = MeterProvider(metric_readers=[prometheus_reader])
-        metrics.set_meter_provider(meter_provider)
-        logger.info("Metrics configured with Prometheus")
-
 
 def setup_development_observability():
     """Setup observability for development environment."""
@@ -68,32 +75,73 @@ def setup_development_observability():
 
     # Configure tracing with Jaeger (if enabled)
     if settings.JAEGER_ENABLED:
-        jaeger_exporter = JaegerExporter(
-            agent_host_name=settings.JAEGER_HOST,
-            agent_port=settings.JAEGER_PORT,
+        from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+
+        setup_tracing(
+            JaegerExporter(
+                agent_host_name=settings.JAEGER_HOST,
+                agent_port=settings.JAEGER_PORT,
+            )
+        )
+        logger.info(
+            f"Tracing configured with Jaeger at {settings.JAEGER_HOST}:{settings.JAEGER_PORT}"
         )
-        trace_provider = TracerProvider()
-        trace_provider.add_span_processor(
-            BatchSpanProcessor(jaeger_exporter)
+
+
+def setup_tracing(exporter: "SpanExporter") -> None:
+    """
+    Export sampled spans to `exporter` and instrument FastAPI and
+    SQLAlchemy. Must run before the FastAPI app is created.
+    """
+    # Imported here so a process without tracing never loads the SDK
+    from opentelemetry import trace
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+    from opentelemetry.sdk.trace import TracerProvider
+
+    from control_plane.tracing import RouteSampler, SpanPipeline, TailSamplingProcessor
+
+    pipeline = SpanPipeline(
+        exporter,
+        max_queue_size=settings.TRACE_QUEUE_SIZE,
+        max_batch_size=settings.TRACE_BATCH_SIZE,
+        schedule_delay_seconds=settings.TRACE_EXPORT_DELAY_SECONDS,
+    )
+    tail = None
+    if settings.TRACE_TAIL_KEEP_ERRORS or settings.TRACE_TAIL_SLOW_SECONDS > 0:
+        tail = TailSamplingProcessor(
+            pipeline,
+            keep_errors=settings.TRACE_TAIL_KEEP_ERRORS,
+            slow_seconds=settings.TRACE_TAIL_SLOW_SECONDS,
+            max_traces=settings.TRACE_TAIL_MAX_TRACES,
+            max_spans_per_trace=settings.TRACE_TAIL_MAX_SPANS_PER_TRACE,
         )
-        trace.set_tracer_provider(trace_provider)
+    trace_provider = TracerProvider(
+        sampler=RouteSampler(settings.TRACE_SAMPLE_RATIO, settings.TRACE_ROUTE_SAMPLE_RATIOS, tail)
+    )
+    trace_provider.add_span_processor(tail or pipeline)
+    trace.set_tracer_provider(trace_provider)
+    global _tracer_provider
+    _tracer_provider = trace_provider
 
-        # Instrument FastAPI
-        FastAPIInstrumentor().instrument()
+    # Instrument FastAPI
+    FastAPIInstrumentor().instrument()
 
-        # Instrument SQLAlchemy
-        SQLAlchemyInstrumentor().instrument()
+    # Instrument SQLAlchemy
+    SQLAlchemyInstrumentor().instrument()
 
-        logger.info(
-            f"Tracing configured with Jaeger at {settings.JAEGER_HOST}:{settings.JAEGER_PORT}"
-        )
 
-    # Configure metrics with Prometheus
-    if settings.ENABLE_METRICS:
-        prometheus_reader = PrometheusMetricReader()
-        meter_provider = MeterProvider(metric_readers=[prometheus_reader])
-        metrics.set_meter_provider(meter_provider)
-        logger.info("Metrics configured with Prometheus")
+def setup_metrics() -> None:
+    """Expose OpenTelemetry instrument metrics through the Prometheus registry."""
+    from opentelemetry import metrics
+    from opentelemetry.exporter.prometheus import PrometheusMetricReader
+    from opentelemetry.sdk.metrics import MeterProvider
+
+    global _meter_provider
+    prometheus_reader = PrometheusMetricReader()
+    _meter_provider = MeterProvider(metric_readers=[prometheus_reader])
+    metrics.set_meter_provider(_meter_provider)
+    logger.info("Metrics configured with Prometheus")
 
 
 # Custom metrics
@@ -115,6 +163,24 @@ class ControlPlaneMetrics:
             ["method", "endpoint"],
         )
 
+        # Auth metrics
+        self.auth_token_cache_hits_total = Counter(
+            "control_plane_auth_token_cache_hits_total",
+            "Verified-token cache hits",
+        )
+
+        self.auth_token_cache_misses_total = Counter(
+            "control_plane_auth_token_cache_misses_total",
+            "Verified-token cache misses",
+        )
+
+        # Registry cache metrics (hit ratio per route)
+        self.registry_cache_requests_total = Counter(
+            "control_plane_registry_cache_requests_total",
+            "Agent registry cache lookups",
+            ["route", "result"],
+        )
+
         # Agent metrics
         self.agent_runs_total = Counter(
             "control_plane_agent_runs_total",
@@ -128,6 +194,143 @@ class ControlPlaneMetrics:
             ["agent_id"],
         )
 
+        # Task queue metrics
+        self.tasks_enqueued_total = Counter(
+            "control_plane_tasks_enqueued_total",
+            "Tasks added to the queue",
+        )
+
+        self.tasks_leased_total = Counter(
+            "control_plane_tasks_leased_total",
+            "Tasks leased to Data Plane workers",
+        )
+
+        self.tasks_redelivered_total = Counter(
+            "control_plane_tasks_redelivered_total",
+            "Tasks requeued after their lease expired",
+        )
+
+        self.task_queue_waiters = Gauge(
+            "control_plane_task_queue_waiters",
+            "Workers long-polling for tasks",
+        )
+
+        # Live run event metrics
+        self.run_event_subscribers = Gauge(
+            "control_plane_run_event_subscribers",
+            "Open SSE and WebSocket run event subscriptions",
+        )
+
+        self.run_events_dropped_total = Counter(
+            "control_plane_run_events_dropped_total",
+            "Run events dropped from full subscriber queues",
+        )
+
+        # Embedding cache metrics (hit ratio: lru + disk over all results)
+        self.embedding_cache_requests_total = Counter(
+            "control_plane_embedding_cache_requests_total",
+            "Embedding cache lookups",
+            ["result"],
+        )
+
+        self.embedding_batch_size = Histogram(
+            "control_plane_embedding_batch_size",
+            "Texts per embedding provider call",
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+        )
+
+        # Notification metrics
+        self.notifications_total = Counter(
+            "control_plane_notifications_total",
+            "Notification deliveries by outcome (sent, retried, failed, dropped)",
+            ["channel", "result"],
+        )
+
+        self.notification_queue_depth = Gauge(
+            "control_plane_notification_queue_depth",
+            "Notifications waiting per channel",
+            ["channel"],
+        )
+
+        # Outbox metrics
+        self.outbox_deliveries_total = Counter(
+            "control_plane_outbox_deliveries_total",
+            "Outbox deliveries by outcome (delivered, retried, dead, deferred, refused)",
+            ["result"],
+        )
+
+        self.outbox_delivery_seconds = Histogram(
+            "control_plane_outbox_delivery_seconds",
+            "Webhook delivery latency",
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        )
+
+        self.outbox_breakers_open = Gauge(
+            "control_plane_outbox_breakers_open",
+            "Webhook destinations with an open circuit breaker",
+        )
+
+        # Retention metrics
+        self.retention_deleted_total = Counter(
+            "control_plane_retention_deleted_total",
+            "Rows or partitions deleted by retention",
+            ["job"],
+        )
+
+        self.retention_rows_per_second = Gauge(
+            "control_plane_retention_rows_per_second",
+            "Deletion rate of the last retention pass",
+            ["job"],
+        )
+
+        self.retention_lag_seconds = Gauge(
+            "control_plane_retention_lag_seconds",
+            "How long the oldest data had been expired when the last pass started",
+            ["job"],
+        )
+
+        # Tracing metrics
+        self.trace_spans_exported_total = Counter(
+            "control_plane_trace_spans_exported_total",
+            "Spans exported to the tracing backend",
+        )
+
+        self.trace_spans_dropped_total = Counter(
+            "control_plane_trace_spans_dropped_total",
+            "Sampled spans lost before export (queue_full, export_failed, tail_evicted, tail_overflow)",
+            ["reason"],
+        )
+
+        self.trace_queue_depth = Gauge(
+            "control_plane_trace_queue_depth",
+            "Spans waiting for export",
+        )
+
+        self.trace_tail_decisions_total = Counter(
+            "control_plane_trace_tail_decisions_total",
+            "Tail sampling decisions for traces the head sampler skipped (error, slow, discarded)",
+            ["decision"],
+        )
+
+        # Health check metrics
+        self.health_probe_up = Gauge(
+            "control_plane_health_probe_up",
+            "Whether the last dependency probe succeeded",
+            ["probe"],
+        )
+
+        self.health_probe_seconds = Histogram(
+            "control_plane_health_probe_seconds",
+            "Dependency probe latency",
+            ["probe"],
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+        )
+
+        self.event_loop_lag_seconds = Gauge(
+            "control_plane_event_loop_lag_seconds",
+            "How late the event loop woke from its last lag probe",
+        )
+
         # Deployment metrics
         self.deployments_active = Gauge(
             "control_plane_deployments_active",
@@ -156,25 +359,185 @@ class ControlPlaneMetrics:
         # Database metrics
         self.db_connections_active = Gauge(
             "control_plane_db_connections_active",
-            "Active database connections",
+            "Connections checked out of each pool",
+            ["pool"],
+        )
+
+        self.db_pool_overflow = Gauge(
+            "control_plane_db_pool_overflow",
+            "Connections open beyond each pool's pool_size",
+            ["pool"],
+        )
+
+        self.db_pool_checkout_wait_seconds = Histogram(
+            "control_plane_db_pool_checkout_wait_seconds",
+            "Time to get a connection from the pool, including opening new ones",
+            ["pool"],
+            buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+        )
+
+        self.db_pool_preping_seconds = Histogram(
+            "control_plane_db_pool_preping_seconds",
+            "Pre-ping round trip on checkout of a pooled connection",
+            ["pool"],
+            buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
         )
 
         self.db_query_duration = Histogram(
             "control_plane_db_query_duration_seconds",
             "Database query duration",
-            ["operation"],
+            ["pool", "operation"],
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+        )
+
+        self.db_session_hold_seconds = Histogram(
+            "control_plane_db_session_hold_seconds",
+            "Time a request's lazy session held a connection, by transaction scope",
+            ["scope"],
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+        )
+
+        self.db_session_statements = Histogram(
+            "control_plane_db_session_statements",
+            "Statements run through a request's lazy session, by transaction scope",
+            ["scope"],
+            buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+        )
+
+        self.db_replica_lag_seconds = Gauge(
+            "control_plane_db_replica_lag_seconds",
+            "Replication lag of each read replica at the last check",
+            ["replica"],
+        )
+
+        self.db_read_sessions_total = Counter(
+            "control_plane_db_read_sessions_total",
+            "Read-only sessions by the engine they were routed to",
+            ["target"],
+        )
+
+        # Rate limit metrics
+        self.rate_limit_rejected_total = Counter(
+            "control_plane_rate_limit_rejected_total",
+            "Requests shed with 429, by the limit they hit and their route class",
+            ["limit", "route_class"],
+        )
+
+        self.rate_limit_backend_errors_total = Counter(
+            "control_plane_rate_limit_backend_errors_total",
+            "Rate limit checks that failed open because the backend errored",
+        )
+
+        # Response encoding metrics
+        self.response_bytes_total = Counter(
+            "control_plane_response_bytes_total",
+            "Body bytes of negotiated responses, by content coding",
+            ["encoding"],
+        )
+
+        self.response_bytes_saved_total = Counter(
+            "control_plane_response_bytes_saved_total",
+            "Body bytes not sent thanks to compression or 304 responses",
+            ["reason"],
+        )
+
+        self.response_not_modified_total = Counter(
+            "control_plane_response_not_modified_total",
+            "Conditional requests answered with 304 Not Modified",
+            ["route"],
+        )
+
+        self.response_compressions_total = Counter(
+            "control_plane_response_compressions_total",
+            "Compressed responses, by coding and whether the variant was precompressed",
+            ["encoding", "source"],
+        )
+
+        self.response_compression_seconds = Histogram(
+            "control_plane_response_compression_seconds",
+            "Time spent compressing response bodies",
+            ["encoding"],
+            buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
         )
 
 
+class RequestMetrics:
+    """
+    Records API requests by route template.
+    Label children are bound on first use and cached in nested dicts keyed
+    by template, method and status, so a request costs three dict lookups,
+    an `inc` and an `observe`; no label tuples are built per request.
+    """
+
+    __slots__ = ("requests", "duration", "_children")
+
+    def __init__(self, requests: Counter, duration: Histogram):
+        self.requests = requests
+        self.duration = duration
+        self._children: Dict[str, Dict[str, Dict[int, Tuple[Any, Any]]]] = {}
+
+    def observe(self, route: str, method: str, status_code: int, seconds: float) -> None:
+        """Record one request; `route` is the matched template, e.g. `/api/v1/agents/{agent_id}`."""
+        if method not in _HTTP_METHODS:
+            method = "OTHER"
+        try:
+            counter, histogram = self._children[route][method][status_code]
+        except KeyError:
+            counter, histogram = self._bind(route, method, status_code)
+        counter.inc()
+        histogram.observe(seconds)
+
+    def _bind(self, route: str, method: str, status_code: int) -> Tuple[Any, Any]:
+        children = (
+            self.requests.labels(method=method, endpoint=route, status=str(status_code)),
+            self.duration.labels(method=method, endpoint=route),
+        )
+        self._children.setdefault(route, {}).setdefault(method, {})[status_code] = children
+        return children
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Text exposition of all metrics and its content type; blocking in multiprocess mode."""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def shutdown_observability() -> None:
+    """Flush queued spans and drop this worker's live gauges from multiprocess totals."""
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
 # Global metrics instance
 metrics_instance = ControlPlaneMetrics()
 
+# Request instrumentation used by `RequestPipelineMiddleware`
+request_metrics = RequestMetrics(
+    metrics_instance.api_requests_total, metrics_instance.api_request_duration
+)
 
-def get_tracer(name: str) -> trace.Tracer:
+
+def get_tracer(name: str) -> "Tracer":
     """Get a tracer instance."""
+    from opentelemetry import trace
+
     return trace.get_tracer(name)
 
 
-def get_meter(name: str) -> metrics.Meter:
-    """Get a meter instance."""
+def get_meter(name: str) -> "Meter":
+    """
+    Get a meter instance. The first call sets up the meter provider when
+    `ENABLE_METRICS` is on; the control plane's own metrics use
+    `prometheus_client` directly and never need it.
+    """
+    from opentelemetry import metrics
+
+    if _meter_provider is None and settings.ENABLE_METRICS:
+        setup_metrics()
     return metrics.get_meter(name)
@@ -0,0 +1,351 @@
+"""
+Fast JSON responses.
+A handler that returns a dict or model under a `response_model` pays for
+response validation, a `jsonable_encoder` pass and `json.dumps` on every
+call. For data the control plane produced itself that work is redundant:
+returning a `FastJSONResponse` makes FastAPI skip validation, and the
+content is encoded in one pass by pydantic-core. The route keeps its
+`response_model` for the OpenAPI schema.
+
+`negotiated_response` adds conditional GETs and compression on top: an
+`EncodedPayload` carries a strong ETag, answers a matching
+`If-None-Match` with 304, and is compressed with the best coding the
+client accepts. Each coding is a different representation, so compressed
+responses carry the ETag suffixed with their coding. Payloads of cached
+reads are kept in `payload_cache` together with their compressed
+variants, so a hot entry is encoded and compressed once per worker; large
+bodies are compressed in a thread so the event loop keeps serving.
+"""
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+
+from fastapi import Request
+from pydantic import BaseModel
+from pydantic_core import to_json
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from control_plane.config import settings
+from control_plane.observability import UNMATCHED_ROUTE, metrics_instance
+
+
+@functools.lru_cache(maxsize=None)
+def _field_names(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    return tuple(schema.model_fields)
+
+
+def row_dict(schema: Type[BaseModel], row: Any) -> Dict[str, Any]:
+    """
+    Read `schema`'s fields off an ORM row without validating them.
+    Only for rows whose column types already match the schema.
+    """
+    return {name: getattr(row, name) for name in _field_names(schema)}
+
+
+def row_dicts(schema: Type[BaseModel], rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """`row_dict` for each row."""
+    names = _field_names(schema)
+    return [{name: getattr(row, name) for name in names} for row in rows]
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded with pydantic-core.
+    Content may be dicts, lists, models, datetimes and other types
+    pydantic serializes, or bytes that are already JSON. Bodies larger
+    than `chunk_bytes` are sent in chunks so the server can apply flow
+    control instead of buffering a second copy of the body.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+        chunk_bytes: int = settings.FAST_JSON_CHUNK_BYTES,
+    ):
+        self.chunk_bytes = chunk_bytes
+        super().__init__(content, status_code, headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = self.body
+        if len(body) <= self.chunk_bytes:
+            await super().__call__(scope, receive, send)
+            return
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+        for offset in range(0, len(body), self.chunk_bytes):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": body[offset:offset + self.chunk_bytes],
+                    "more_body": True,
+                }
+            )
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+
+def content_version(body: bytes) -> str:
+    """Version of a serialized body, usable as a strong ETag's opaque tag."""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def compressor(encoding: str, level: int) -> Optional[Callable[[bytes], bytes]]:
+    """
+    Compression function for a content coding, or None when unsupported.
+    `br` and `zstd` need the optional `brotli` and `zstandard` packages.
+    """
+    if encoding == "gzip":
+        return functools.partial(gzip.compress, compresslevel=level, mtime=0)
+    if encoding == "br":
+        try:
+            import brotli
+        except ImportError:
+            return None
+        return functools.partial(brotli.compress, quality=level)
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            return None
+        return zstandard.ZstdCompressor(level=level).compress
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def available_encodings() -> Tuple[str, ...]:
+    """Configured content codings that can be produced, in preference order."""
+    return tuple(
+        encoding
+        for encoding in settings.RESPONSE_COMPRESSION_ENCODINGS
+        if compressor(encoding, settings.RESPONSE_COMPRESSION_LEVELS[encoding]) is not None
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """
+    The coding of `encodings` an Accept-Encoding header ranks highest,
+    ties going to the earlier one; None to send the body uncompressed.
+    """
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag of the `encoding` variant of a body tagged `etag`."""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag`, by weak comparison."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+class EncodedPayload:
+    """
+    A serialized JSON body with its strong ETag and the compressed
+    variants kept so far.
+    """
+
+    __slots__ = ("body", "etag", "variants", "size")
+
+    def __init__(self, body: bytes, version: Optional[str] = None):
+        """
+        Args:
+            body: The JSON body.
+            version: Version of the content, e.g. of the cache entry it
+                came from; hashed from `body` when omitted.
+        """
+        self.body = body
+        self.etag = f'"{version or content_version(body)}"'
+        self.variants: Dict[str, bytes] = {}
+        self.size = len(body)
+
+    @classmethod
+    def from_content(cls, content: Any, version: Optional[str] = None) -> "EncodedPayload":
+        return cls(to_json(content), version)
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    """Compress `body`, recording the time it took."""
+    started = time.perf_counter()
+    compressed = compressor(encoding, level)(body)
+    metrics_instance.response_compression_seconds.labels(encoding=encoding).observe(
+        time.perf_counter() - started
+    )
+    return compressed
+
+
+class PayloadCache:
+    """
+    In-process LRU of encoded payloads by ETag, bounded by the bytes of
+    their bodies and compressed variants. ETags are content versions, so
+    entries never go stale; changed content arrives under a new ETag and
+    old entries age out.
+    """
+
+    def __init__(self, max_bytes: int, thread_min_bytes: int):
+        """
+        Args:
+            max_bytes: Bytes of bodies and variants kept.
+            thread_min_bytes: Bodies at least this large are compressed
+                in a thread.
+        """
+        self.max_bytes = max_bytes
+        self.thread_min_bytes = thread_min_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, EncodedPayload]" = OrderedDict()
+        # Variants being compressed in a thread, shared by concurrent requests
+        self._compressing: Dict[Tuple[str, str], "asyncio.Future[bytes]"] = {}
+
+    def get_or_encode(self, version: str, content: Any) -> EncodedPayload:
+        """The payload of `content` at `version`, encoding it on a miss."""
+        etag = f'"{version}"'
+        payload = self._entries.get(etag)
+        if payload is not None:
+            self._entries.move_to_end(etag)
+            return payload
+        payload = EncodedPayload.from_content(content, version)
+        self._entries[etag] = payload
+        self._grow(payload.size)
+        return payload
+
+    async def variant(self, payload: EncodedPayload, encoding: str) -> bytes:
+        """
+        `payload` compressed with `encoding`. Variants of cached payloads
+        are compressed once, at the higher precompression level, and kept.
+        """
+        compressed = payload.variants.get(encoding)
+        if compressed is not None:
+            metrics_instance.response_compressions_total.labels(encoding, "precompressed").inc()
+            return compressed
+        metrics_instance.response_compressions_total.labels(encoding, "compressed").inc()
+        if self._entries.get(payload.etag) is not payload:
+            level = settings.RESPONSE_COMPRESSION_LEVELS[encoding]
+            if len(payload.body) < self.thread_min_bytes:
+                return compress(payload.body, encoding, level)
+            return await asyncio.to_thread(compress, payload.body, encoding, level)
+
+        level = settings.RESPONSE_PRECOMPRESSION_LEVELS[encoding]
+        if len(payload.body) < self.thread_min_bytes:
+            compressed = compress(payload.body, encoding, level)
+        else:
+            key = (payload.etag, encoding)
+            future = self._compressing.get(key)
+            if future is None:
+                future = self._compressing[key] = asyncio.ensure_future(
+                    asyncio.to_thread(compress, payload.body, encoding, level)
+                )
+                future.add_done_callback(lambda _: self._compressing.pop(key, None))
+            # Shielded so one request's cancellation doesn't fail the others
+            compressed = await asyncio.shield(future)
+            if encoding in payload.variants or self._entries.get(payload.etag) is not payload:
+                return compressed
+        payload.variants[encoding] = compressed
+        payload.size += len(compressed)
+        self._grow(len(compressed))
+        return compressed
+
+    def _grow(self, size: int) -> None:
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+async def negotiated_response(request: Request, payload: EncodedPayload) -> Response:
+    """
+    A 200 response for `payload`, compressed as the request allows, or a
+    304 when the request's If-None-Match already names the ETag of the
+    variant it would get.
+    """
+    encoding = None
+    if len(payload.body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(
+            request.headers.get("accept-encoding", ""), available_encodings()
+        )
+    etag = variant_etag(payload.etag, encoding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        route = request.scope.get("route")
+        metrics_instance.response_not_modified_total.labels(
+            route.path_format if route is not None else UNMATCHED_ROUTE
+        ).inc()
+        metrics_instance.response_bytes_saved_total.labels("not_modified").inc(
+            len(payload.variants.get(encoding) or payload.body)
+        )
+        return Response(status_code=304, headers=headers)
+
+    body = payload.body
+    if encoding is not None:
+        body = await payload_cache.variant(payload, encoding)
+        headers["Content-Encoding"] = encoding
+        metrics_instance.response_bytes_saved_total.labels("compression").inc(
+            len(payload.body) - len(body)
+        )
+    metrics_instance.response_bytes_total.labels(encoding or "identity").inc(len(body))
+    return FastJSONResponse(body, headers=headers)
+
+
+async def cached_response(request: Request, content: Any, version: Optional[str]) -> Response:
+    """
+    `negotiated_response` for a cached value at `version`, whose payload
+    and compressed variants are kept in `payload_cache`.
+    """
+    if version is None:
+        return await negotiated_response(request, EncodedPayload.from_content(content))
+    return await negotiated_response(request, payload_cache.get_or_encode(version, content))
+
+
+# Global payload cache instance
+payload_cache = PayloadCache(
+    max_bytes=settings.RESPONSE_PAYLOAD_CACHE_MAX_BYTES,
+    thread_min_bytes=settings.RESPONSE_COMPRESSION_THREAD_MIN_BYTES,
+)
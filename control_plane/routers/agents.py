@@ -3,11 +3,211 @@ Agent marketplace endpoints.
 Handles agent listing, details, creation, and management.
 """
 
-from typing import List, Optional
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic_core import to_jsonable_python
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from control_plane.database import get_session
+from control_plane.auth import require_admin
+from control_plane.database import LazySession, lazy_session
+from control_plane.models import Agent
+from control_plane.responses import FastJSONResponse, cached_response, row_dict, row_dicts
 from control_plane.schemas import (
-    AgentCreate,\n    AgentResponse,\n    AgentStatus,\n    AgentUpdate,\n)\n\nrouter = APIRouter()\n\n\n@router.get(\"/agents\", response_model=List[AgentResponse])\nasync def list_agents(\n    category: Optional[str] = Query(None),\n    search: Optional[str] = Query(None),\n    skip: int = Query(0, ge=0),\n    limit: int = Query(10, ge=1, le=100),\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    List all published agents in the marketplace.\n    Supports filtering by category and search.\n    \"\"\"\n    # TODO: Implement database query\n    # For now, return mock data\n    return [\n        AgentResponse(\n            id=1,\n            agent_id=\"com.aicloud.finops.billing-normalizer\",\n            name=\"Billing Normalizer\",\n            description=\"Normalize provider billing data\",\n            version=\"1.0.0\",\n            status=AgentStatus.PUBLISHED,\n            category=\"finops\",\n            tags=[\"billing\", \"normalization\"],\n            rating=4.8,\n            review_count=42,\n            price=99.0,\n            risk_level=\"low\",\n            developer_id=1,\n            created_at=\"2025-01-01T00:00:00\",\n            updated_at=\"2025-01-01T00:00:00\",\n        )\n    ]\n\n\n@router.get(\"/agents/{agent_id}\", response_model=AgentResponse)\nasync def get_agent(\n    agent_id: str,\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    Get detailed information about a specific agent.\n    \"\"\"\n    # TODO: Implement database query\n    return AgentResponse(\n        id=1,\n        agent_id=agent_id,\n        name=\"Billing Normalizer\",\n        description=\"Normalize provider billing data\",\n        version=\"1.0.0\",\n        status=AgentStatus.PUBLISHED,\n        category=\"finops\",\n        tags=[\"billing\", \"normalization\"],\n        rating=4.8,\n        review_count=42,\n        price=99.0,\n        risk_level=\"low\",\n        developer_id=1,\n        created_at=\"2025-01-01T00:00:00\",\n        updated_at=\"2025-01-01T00:00:00\",\n    )\n\n\n@router.post(\"/agents\", response_model=AgentResponse, status_code=status.HTTP_201_CREATED)\nasync def create_agent(\n    agent_create: AgentCreate,\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    Create a new agent (developer only).\n    Submits agent manifest for review.\n    \"\"\"\n    # TODO: Implement database insertion\n    # TODO: Validate manifest\n    # TODO: Scan container image\n    # TODO: Create approval workflow\n    return AgentResponse(\n        id=1,\n        agent_id=agent_create.manifest.agent_id,\n        name=agent_create.manifest.name,\n        description=agent_create.manifest.description,\n        version=agent_create.manifest.version,\n        status=AgentStatus.SUBMITTED,\n        category=agent_create.manifest.category,\n        tags=agent_create.manifest.tags,\n        rating=0.0,\n        review_count=0,\n        price=0.0,\n        risk_level=agent_create.manifest.risk_level,\n        developer_id=1,\n        created_at=\"2025-01-01T00:00:00\",\n        updated_at=\"2025-01-01T00:00:00\",\n    )\n\n\n@router.put(\"/agents/{agent_id}\", response_model=AgentResponse)\nasync def update_agent(\n    agent_id: str,\n    agent_update: AgentUpdate,\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    Update an existing agent (developer only).\n    \"\"\"\n    # TODO: Implement database update\n    # TODO: Validate permissions\n    return AgentResponse(\n        id=1,\n        agent_id=agent_id,\n        name=agent_update.name or \"Billing Normalizer\",\n        description=agent_update.description or \"Normalize provider billing data\",\n        version=\"1.0.1\",\n        status=AgentStatus.DRAFT,\n        category=\"finops\",\n        tags=agent_update.tags or [\"billing\"],\n        rating=4.8,\n        review_count=42,\n        price=99.0,\n        risk_level=\"low\",\n        developer_id=1,\n        created_at=\"2025-01-01T00:00:00\",\n        updated_at=\"2025-01-02T00:00:00\",\n    )\n\n\n@router.delete(\"/agents/{agent_id}\", status_code=status.HTTP_204_NO_CONTENT)\nasync def delete_agent(\n    agent_id: str,\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    Delete an agent (developer only).\n    \"\"\"\n    # TODO: Implement database deletion\n    # TODO: Validate permissions\n    # TODO: Handle existing deployments\n    return None\n\n\n@router.post(\"/agents/{agent_id}/publish\", response_model=AgentResponse)\nasync def publish_agent(\n    agent_id: str,\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    Publish an agent to the marketplace (admin only).\n    \"\"\"\n    # TODO: Implement publish logic\n    # TODO: Validate agent status\n    # TODO: Update agent status to PUBLISHED\n    return AgentResponse(\n        id=1,\n        agent_id=agent_id,\n        name=\"Billing Normalizer\",\n        description=\"Normalize provider billing data\",\n        version=\"1.0.0\",\n        status=AgentStatus.PUBLISHED,\n        category=\"finops\",\n        tags=[\"billing\"],\n        rating=0.0,\n        review_count=0,\n        price=99.0,\n        risk_level=\"low\",\n        developer_id=1,\n        created_at=\"2025-01-01T00:00:00\",\n        updated_at=\"2025-01-02T00:00:00\",\n    )\n\n\n@router.get(\"/agents/search\")\nasync def search_agents(\n    q: str = Query(..., min_length=1),\n    session: AsyncSession = Depends(get_session),\n):\n    \"\"\"\n    Full-text search for agents.\n    \"\"\"\n    # TODO: Implement full-text search\n    return {\"results\": [], \"total\": 0}\n"
+    AgentCreate,
+    AgentListResponse,
+    AgentResponse,
+    AgentSearchResponse,
+    AgentStatus,
+    AgentUpdate,
+)
+from control_plane.services import agent_service
+from control_plane.services.agent_service import InvalidCursorError
+from control_plane.services.registry_cache import registry_cache
+
+router = APIRouter()
+
+
+def get_developer_id(request: Request) -> int:
+    """Resolve the developer id of the authenticated user."""
+    user = getattr(request.state, "user", None) or {}
+    try:
+        return int(user.get("id"))
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Developer account required",
+        )
+
+
+def can_view(request: Request, agent: dict) -> bool:
+    """Whether the caller may see a cached agent: published, or their own."""
+    if agent["status"] == AgentStatus.PUBLISHED.value:
+        return True
+    user = getattr(request.state, "user", None) or {}
+    return user.get("id") is not None and str(user["id"]) == str(agent["developer_id"])
+
+
+async def get_agent_or_404(session: AsyncSession, agent_id: str) -> Agent:
+    """Load an agent or raise 404."""
+    agent = await agent_service.get_agent(session, agent_id)
+    if agent is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    return agent
+
+
+async def get_owned_agent_or_404(session: AsyncSession, agent_id: str, developer_id: int) -> Agent:
+    """Load an agent or raise 404, and raise 403 unless `developer_id` owns it."""
+    agent = await get_agent_or_404(session, agent_id)
+    if agent.developer_id != developer_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the agent's developer can change it",
+        )
+    return agent
+
+
+@router.get("/agents", response_model=AgentListResponse)
+async def list_agents(
+    request: Request,
+    category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    List all published agents in the marketplace.
+    Supports filtering by category, with keyset pagination: pass
+    `next_cursor` from the previous page as `cursor`. Use
+    `/agents/search` for full-text search. Responses carry an ETag and
+    honour If-None-Match.
+    """
+
+    async def load(session: AsyncSession) -> dict:
+        agents, next_cursor = await agent_service.list_published_agents(
+            session, category=category, cursor=cursor, limit=limit
+        )
+        # Rows are trusted, so they're read into the cached page unvalidated
+        return to_jsonable_python(
+            {"items": row_dicts(AgentResponse, agents), "next_cursor": next_cursor}
+        )
+
+    key = await registry_cache.listing_key(category=category, cursor=cursor, limit=limit)
+    try:
+        page, version = await registry_cache.get_or_load_versioned("list_agents", key, load)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return await cached_response(request, page, version)
+
+
+@router.get("/agents/search", response_model=AgentSearchResponse)
+async def search_agents(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Full-text search for published agents.
+    Served from the in-process index, reloaded first if any worker has
+    changed the catalog since; the last term matches as a prefix.
+    """
+    await agent_service.refresh_search_index()
+    results, total = agent_service.search_agents(q, limit=limit)
+    return FastJSONResponse({"results": results, "total": total})
+
+
+@router.get("/agents/{agent_id}", response_model=AgentResponse)
+async def get_agent(
+    request: Request,
+    agent_id: str,
+):
+    """
+    Get detailed information about a specific agent.
+    Agents that aren't published are only visible to their developer.
+    Responses carry an ETag and honour If-None-Match.
+    """
+
+    async def load(session: AsyncSession) -> Optional[dict]:
+        agent = await agent_service.get_agent(session, agent_id)
+        if agent is None:
+            return None
+        return to_jsonable_python(row_dict(AgentResponse, agent))
+
+    key = registry_cache.agent_key(agent_id)
+    agent, version = await registry_cache.get_or_load_versioned("get_agent", key, load)
+    if agent is None or not can_view(request, agent):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    return await cached_response(request, agent, version)
+
+
+@router.post("/agents", response_model=AgentResponse, status_code=status.HTTP_201_CREATED)
+async def create_agent(
+    agent_create: AgentCreate,
+    developer_id: int = Depends(get_developer_id),
+    session: LazySession = Depends(lazy_session()),
+):
+    """
+    Create a new agent (developer only).
+    Submits agent manifest for review.
+    """
+    # TODO: Validate manifest
+    # TODO: Scan container image
+    # TODO: Create approval workflow
+    if await agent_service.get_agent(session, agent_create.manifest.agent_id) is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Agent already exists")
+    agent = await agent_service.create_agent(session, agent_create, developer_id)
+    await registry_cache.invalidate_agent(agent.agent_id)
+    return FastJSONResponse(row_dict(AgentResponse, agent), status_code=status.HTTP_201_CREATED)
+
+
+@router.put("/agents/{agent_id}", response_model=AgentResponse)
+async def update_agent(
+    agent_id: str,
+    agent_update: AgentUpdate,
+    developer_id: int = Depends(get_developer_id),
+    session: LazySession = Depends(lazy_session()),
+):
+    """
+    Update an existing agent (its developer only).
+    """
+    agent = await get_owned_agent_or_404(session, agent_id, developer_id)
+    agent = await agent_service.update_agent(session, agent, agent_update)
+    await registry_cache.invalidate_agent(agent_id)
+    return FastJSONResponse(row_dict(AgentResponse, agent))
+
+
+@router.delete("/agents/{agent_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_agent(
+    agent_id: str,
+    developer_id: int = Depends(get_developer_id),
+    session: LazySession = Depends(lazy_session()),
+):
+    """
+    Delete an agent (its developer only).
+    """
+    # TODO: Handle existing deployments
+    agent = await get_owned_agent_or_404(session, agent_id, developer_id)
+    await agent_service.delete_agent(session, agent)
+    await registry_cache.invalidate_agent(agent_id)
+    return None
+
+
+@router.post(
+    "/agents/{agent_id}/publish",
+    response_model=AgentResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def publish_agent(
+    agent_id: str,
+    session: LazySession = Depends(lazy_session()),
+):
+    """
+    Publish an agent to the marketplace (admin only).
+    """
+    agent = await get_agent_or_404(session, agent_id)
+    if agent.status not in agent_service.PUBLISHABLE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Agent in status '{agent.status}' cannot be published",
+        )
+    agent = await agent_service.publish_agent(session, agent)
+    await registry_cache.invalidate_agent(agent_id)
+    return FastJSONResponse(row_dict(AgentResponse, agent))
@@ -1 +1,136 @@
-"""Approval workflow endpoints."""\n\nfrom fastapi import APIRouter\n\nrouter = APIRouter()\n\n\n@router.get(\"/orgs/{org_id}/approvals\")\nasync def list_approvals(org_id: str):\n    \"\"\"List pending approvals for an organization.\"\"\"\n    return {\"approvals\": []}\n\n\n@router.post(\"/orgs/{org_id}/approve\")\nasync def approve_action(org_id: str):\n    \"\"\"Approve a pending action.\"\"\"\n    return {\"status\": \"approved\"}\n\n\n@router.post(\"/orgs/{org_id}/reject\")\nasync def reject_action(org_id: str):\n    \"\"\"Reject a pending action.\"\"\"\n    return {\"status\": \"rejected\"}\n"
+"""
+Approval workflow endpoints.
+Runs queue actions that need a human decision; an org's approvers page
+through the queue and approve or reject items one at a time or in bulk.
+Notifications go out through the background dispatcher.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.auth import require_org_member
+from control_plane.config import settings
+from control_plane.database import get_session
+from control_plane.responses import FastJSONResponse, row_dicts
+from control_plane.schemas import (
+    ApprovalBulkDecision,
+    ApprovalBulkDecisionResponse,
+    ApprovalCreate,
+    ApprovalDecision,
+    ApprovalDecisionOutcome,
+    ApprovalListResponse,
+    ApprovalResponse,
+    ApprovalStatus,
+)
+from control_plane.services import approval_service
+
+router = APIRouter(dependencies=[Depends(require_org_member)])
+
+
+def get_user_id(request: Request) -> Optional[str]:
+    """Resolve the authenticated caller, if any."""
+    user = getattr(request.state, "user", None) or {}
+    user_id = user.get("id")
+    return str(user_id) if user_id is not None else None
+
+
+@router.post(
+    "/orgs/{org_id}/approvals",
+    response_model=ApprovalResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_approval(
+    org_id: str,
+    approval_create: ApprovalCreate,
+    session: AsyncSession = Depends(get_session),
+):
+    """Queue an action for approval and notify the org's approvers."""
+    return await approval_service.create_approval(session, org_id, approval_create)
+
+
+@router.get("/orgs/{org_id}/approvals", response_model=ApprovalListResponse)
+async def list_approvals(
+    org_id: str,
+    approval_status: ApprovalStatus = Query(ApprovalStatus.PENDING, alias="status"),
+    limit: int = Query(20, ge=1, le=settings.APPROVAL_LIST_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session),
+):
+    """List an organization's approvals, pending ones by default, oldest first."""
+    approvals, total = await approval_service.list_approvals(
+        session, org_id, approval_status, limit, offset
+    )
+    return FastJSONResponse(
+        {
+            "approvals": row_dicts(ApprovalResponse, approvals),
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+        }
+    )
+
+
+@router.post("/orgs/{org_id}/approvals/decisions", response_model=ApprovalBulkDecisionResponse)
+async def decide_approvals(
+    org_id: str,
+    decision: ApprovalBulkDecision,
+    user_id: Optional[str] = Depends(get_user_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Approve or reject up to 500 pending approvals in one transaction."""
+    results = await approval_service.decide(
+        session, org_id, decision.approval_ids, decision.approved, user_id, decision.comments
+    )
+    return ApprovalBulkDecisionResponse(
+        decided=sum(result.outcome == ApprovalDecisionOutcome.DECIDED for result in results),
+        results=results,
+    )
+
+
+async def _decide_one(
+    session: AsyncSession,
+    org_id: str,
+    approval_id: str,
+    approved: bool,
+    user_id: Optional[str],
+    decision: Optional[ApprovalDecision],
+) -> ApprovalResponse:
+    comments = decision.comments if decision else None
+    (result,) = await approval_service.decide(
+        session, org_id, [approval_id], approved, user_id, comments
+    )
+    if result.outcome == ApprovalDecisionOutcome.NOT_FOUND:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Approval not found")
+    if result.outcome != ApprovalDecisionOutcome.DECIDED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Approval is {result.outcome.value.replace('_', ' ')}",
+        )
+    approval = await approval_service.get_approval(session, org_id, approval_id)
+    return ApprovalResponse.model_validate(approval)
+
+
+@router.post("/orgs/{org_id}/approvals/{approval_id}/approve", response_model=ApprovalResponse)
+async def approve_action(
+    org_id: str,
+    approval_id: str,
+    decision: Optional[ApprovalDecision] = None,
+    user_id: Optional[str] = Depends(get_user_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Approve a pending action."""
+    return await _decide_one(session, org_id, approval_id, True, user_id, decision)
+
+
+@router.post("/orgs/{org_id}/approvals/{approval_id}/reject", response_model=ApprovalResponse)
+async def reject_action(
+    org_id: str,
+    approval_id: str,
+    decision: Optional[ApprovalDecision] = None,
+    user_id: Optional[str] = Depends(get_user_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Reject a pending action."""
+    return await _decide_one(session, org_id, approval_id, False, user_id, decision)
@@ -1 +1,51 @@
-"""Billing and subscription endpoints."""\n\nfrom fastapi import APIRouter\n\nrouter = APIRouter()\n\n\n@router.post(\"/orgs/{org_id}/subscriptions\")\nasync def create_subscription(org_id: str):\n    \"\"\"Create a new subscription.\"\"\"\n    return {\"subscription_id\": \"sub-123\", \"status\": \"active\"}\n\n\n@router.get(\"/orgs/{org_id}/subscriptions\")\nasync def list_subscriptions(org_id: str):\n    \"\"\"List subscriptions for an organization.\"\"\"\n    return {\"subscriptions\": []}\n\n\n@router.get(\"/orgs/{org_id}/billing\")\nasync def get_billing_info(org_id: str):\n    \"\"\"Get billing information for an organization.\"\"\"\n    return {\"total_spent\": 0, \"current_plan\": \"starter\"}\n"
+"""Billing and subscription endpoints."""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.auth import require_org_member
+from control_plane.database import get_read_session
+from control_plane.responses import EncodedPayload, negotiated_response
+from control_plane.schemas import BillingInfoResponse, Invoice
+from control_plane.services import billing_service
+
+router = APIRouter(dependencies=[Depends(require_org_member)])
+
+
+@router.post("/orgs/{org_id}/subscriptions")
+async def create_subscription(org_id: str):
+    """Create a new subscription."""
+    return {"subscription_id": "sub-123", "status": "active"}
+
+
+@router.get("/orgs/{org_id}/subscriptions")
+async def list_subscriptions(org_id: str):
+    """List subscriptions for an organization."""
+    return {"subscriptions": []}
+
+
+@router.get("/orgs/{org_id}/billing", response_model=BillingInfoResponse)
+async def get_billing_info(
+    request: Request,
+    org_id: str,
+    at: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Get billing information for an organization.
+    Prices the billing period containing `at` (default: now) from metered
+    usage, with one line per agent. Workers flush metered usage every
+    `USAGE_METER_FLUSH_SECONDS` and it is read from a replica, so totals
+    may be a few seconds behind. Responses carry an ETag of their content
+    and honour If-None-Match.
+    """
+    period_start, period_end = billing_service.billing_period(at or datetime.utcnow())
+    invoices = await billing_service.price_period(session, period_start, period_end, [org_id])
+    invoice = invoices.get(org_id) or Invoice(
+        org_id=org_id, period_start=period_start, period_end=period_end
+    )
+    summary = BillingInfoResponse(**invoice.model_dump(), current_plan="starter")
+    return await negotiated_response(request, EncodedPayload.from_content(summary))
@@ -1 +1,23 @@
-"""Deployment management endpoints."""\n\nfrom fastapi import APIRouter\n\nrouter = APIRouter()\n\n\n@router.post(\"/orgs/{org_id}/install\")\nasync def start_installation(org_id: str):\n    \"\"\"Start agent installation for an organization.\"\"\"\n    return {\"status\": \"pending\", \"deployment_id\": \"deploy-123\"}\n\n\n@router.get(\"/orgs/{org_id}/deployments\")\nasync def list_deployments(org_id: str):\n    \"\"\"List all deployments for an organization.\"\"\"\n    return {\"deployments\": []}\n\n\n@router.get(\"/deployments/{deployment_id}\")\nasync def get_deployment(deployment_id: str):\n    \"\"\"Get deployment details.\"\"\"\n    return {\"id\": deployment_id, \"status\": \"running\"}\n"
+"""Deployment management endpoints."""
+
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.post("/orgs/{org_id}/install")
+async def start_installation(org_id: str):
+    """Start agent installation for an organization."""
+    return {"status": "pending", "deployment_id": "deploy-123"}
+
+
+@router.get("/orgs/{org_id}/deployments")
+async def list_deployments(org_id: str):
+    """List all deployments for an organization."""
+    return {"deployments": []}
+
+
+@router.get("/deployments/{deployment_id}")
+async def get_deployment(deployment_id: str):
+    """Get deployment details."""
+    return {"id": deployment_id, "status": "running"}
@@ -5,10 +5,11 @@ Used for monitoring and load balancer health checks.
 
 from datetime import datetime
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
 
 from control_plane.config import settings
-from control_plane.schemas import HealthResponse
+from control_plane.schemas import DependencyCheck, HealthResponse, ReadinessResponse
+from control_plane.services.health import health_checker, loop_lag_monitor, pool_saturation
 
 router = APIRouter()
 
@@ -17,28 +18,43 @@ router = APIRouter()
 async def health_check():
     """
     Health check endpoint.
-    Returns the status of the Control Plane and its dependencies.
+    Returns the status of the Control Plane and its dependencies, probed
+    at most once per `HEALTH_CACHE_SECONDS`.
     """
+    results = await health_checker.check()
     return HealthResponse(
-        status="healthy",
+        status="healthy" if all(result.ok for result in results.values()) else "degraded",
         service="control-plane",
         version=settings.APP_VERSION,
         timestamp=datetime.utcnow(),
-        dependencies={
-            "database": "connected",
-            "firestore": "connected",
-            "cache": "connected",
+        dependencies={name: result.status for name, result in results.items()},
+        checks={
+            name: DependencyCheck(
+                status=result.status,
+                latency_ms=round(result.latency_seconds * 1000, 3),
+            )
+            for name, result in results.items()
         },
     )
 
 
-@router.get("/health/ready")
-async def readiness_check():
+@router.get("/health/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response):
     """
     Readiness check endpoint.
-    Returns 200 if the service is ready to receive traffic.
+    Returns 200 if the service is ready to receive traffic, and 503 when a
+    critical dependency is down, the database pool is saturated or the
+    event loop is lagging.
     """
-    return {"status": "ready"}
+    reasons = await health_checker.readiness(settings.HEALTH_READINESS_PROBES)
+    if reasons:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(
+        status="not_ready" if reasons else "ready",
+        reasons=reasons,
+        pool_saturation=pool_saturation(health_checker.db_engine),
+        loop_lag_seconds=loop_lag_monitor.lag_seconds,
+    )
 
 
 @router.get("/health/live")
@@ -0,0 +1,106 @@
+"""
+Agent memory endpoints.
+Embedded task summaries, episodes and knowledge are indexed per org and
+namespace, optionally scoped to one agent, and searched semantically.
+Memories and queries sent as text are embedded through the embedding cache.
+"""
+
+import asyncio
+from typing import List, Optional, Sequence
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from control_plane.auth import require_org_member
+from control_plane.config import settings
+from control_plane.schemas import (
+    MemoryMatch,
+    MemorySearchRequest,
+    MemorySearchResponse,
+    MemoryUpsert,
+    MemoryVector,
+)
+from control_plane.services.embedding_cache import EmbeddingError, embedding_cache
+from control_plane.services.vector_index import VectorIndexError, memory_indexes
+
+router = APIRouter(dependencies=[Depends(require_org_member)])
+
+
+async def _embed(texts: Sequence[str]) -> np.ndarray:
+    try:
+        return await embedding_cache.embed(texts)
+    except EmbeddingError as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+
+
+async def _item_vectors(items: List[MemoryVector]) -> List[List[float]]:
+    """Vectors of `items`, embedding those given as text in one batch."""
+    if any((item.vector is None) == (item.text is None) for item in items):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each memory needs exactly one of vector or text",
+        )
+    vectors = [item.vector for item in items]
+    pending = [row for row, vector in enumerate(vectors) if vector is None]
+    if pending:
+        embedded = await _embed([items[row].text for row in pending])
+        for row, vector in zip(pending, embedded):
+            vectors[row] = vector
+    return vectors
+
+
+@router.post("/orgs/{org_id}/memory/{namespace}", status_code=status.HTTP_202_ACCEPTED)
+async def add_memories(
+    org_id: str,
+    namespace: str,
+    upsert: MemoryUpsert,
+    agent_id: Optional[str] = None,
+):
+    """Index memories; an id that already exists is replaced."""
+    vectors = await _item_vectors(upsert.items)
+    try:
+        index = memory_indexes.get(org_id, namespace, agent_id)
+        await asyncio.to_thread(
+            index.add,
+            [item.id for item in upsert.items],
+            vectors,
+            [item.metadata for item in upsert.items],
+        )
+    except VectorIndexError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return {"accepted": len(upsert.items), "size": len(index)}
+
+
+@router.post("/orgs/{org_id}/memory/{namespace}/search", response_model=MemorySearchResponse)
+async def search_memories(
+    org_id: str,
+    namespace: str,
+    search: MemorySearchRequest,
+    agent_id: Optional[str] = None,
+):
+    """
+    Return the `top_k` most similar memories at or above `threshold`
+    (default `VECTOR_DB_SIMILARITY_THRESHOLD`).
+    """
+    if (search.vector is None) == (search.text is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search needs exactly one of vector or text",
+        )
+    query = search.vector
+    if query is None:
+        query = (await _embed([search.text]))[0]
+    threshold = search.threshold
+    if threshold is None:
+        threshold = settings.VECTOR_DB_SIMILARITY_THRESHOLD
+    try:
+        index = memory_indexes.get(org_id, namespace, agent_id)
+        matches = await asyncio.to_thread(index.search, query, search.top_k, threshold)
+    except VectorIndexError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return MemorySearchResponse(
+        matches=[
+            MemoryMatch(id=memory_id, score=score, metadata=metadata)
+            for memory_id, score, metadata in matches
+        ]
+    )
@@ -0,0 +1,215 @@
+"""
+Task queue endpoints.
+Agent runs are enqueued here, leased by Data Plane workers, and reported
+back as completed, one at a time or in batches.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.database import get_session
+from control_plane.responses import FastJSONResponse, row_dicts
+from control_plane.schemas import (
+    CompletionItemStatus,
+    RunCompletion,
+    RunCompletionBatchResponse,
+    RunCompletionResult,
+    RunCreate,
+    RunResponse,
+    RunResult,
+    TaskLeaseResponse,
+    TaskLeaseUpdate,
+    TaskResponse,
+    TaskStatus,
+)
+from control_plane.services import run_service
+from control_plane.services.run_service import MalformedBatchError
+from control_plane.services.task_queue import LeaseLostError, task_queue
+
+router = APIRouter()
+
+
+def get_org_id(request: Request) -> Optional[str]:
+    """Resolve the organization of the authenticated caller, if any."""
+    user = getattr(request.state, "user", None) or {}
+    org_id = user.get("org_id")
+    return str(org_id) if org_id is not None else None
+
+
+def get_worker_org_id(request: Request) -> Optional[str]:
+    """
+    Resolve the org a Data Plane worker serves. Tokens with an org only
+    serve that org; org-less tokens must carry the shared worker role,
+    and serve every org.
+    """
+    user = getattr(request.state, "user", None) or {}
+    org_id = user.get("org_id")
+    if org_id is not None:
+        return str(org_id)
+    if user.get("role") != settings.TASK_QUEUE_SHARED_WORKER_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Organization membership or shared worker role required",
+        )
+    return None
+
+
+@router.post(
+    "/agents/{agent_id}/runs",
+    response_model=RunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_run(
+    agent_id: str,
+    run_create: RunCreate,
+    org_id: Optional[str] = Depends(get_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Start an agent run.
+    Enqueues a task for the organization's Data Plane.
+    """
+    if org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Organization membership required",
+        )
+    task = await task_queue.enqueue(
+        session,
+        org_id=org_id,
+        agent_id=agent_id,
+        payload={"inputs": run_create.inputs},
+        deployment_id=run_create.deployment_id,
+    )
+    return RunResponse(run_id=task.run_id, task_id=task.id, status=TaskStatus.QUEUED)
+
+
+@router.get("/tasks/next", response_model=TaskLeaseResponse)
+async def lease_tasks(
+    worker_id: str = Query(..., min_length=1),
+    max_tasks: int = Query(1, ge=1, le=settings.TASK_QUEUE_MAX_BATCH),
+    wait_seconds: float = Query(0, ge=0, le=settings.TASK_QUEUE_LONG_POLL_SECONDS),
+    org_id: Optional[str] = Depends(get_worker_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Lease up to `max_tasks` tasks for a Data Plane worker.
+    Waits up to `wait_seconds` when the queue is empty. Workers whose token
+    carries an org only receive that org's tasks; shared workers receive
+    every org's.
+    """
+    tasks = await task_queue.lease_next(
+        session,
+        worker_id=worker_id,
+        limit=max_tasks,
+        org_id=org_id,
+        wait_seconds=wait_seconds,
+    )
+    return FastJSONResponse({"tasks": row_dicts(TaskResponse, tasks)})
+
+
+@router.post("/tasks/{task_id}/heartbeat", response_model=TaskResponse)
+async def heartbeat_task(
+    task_id: int,
+    lease_update: TaskLeaseUpdate,
+    org_id: Optional[str] = Depends(get_worker_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Extend the lease on a task."""
+    try:
+        return await task_queue.heartbeat(session, task_id, lease_update.worker_id, org_id)
+    except LeaseLostError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+
+@router.post("/tasks/{task_id}/ack", status_code=status.HTTP_204_NO_CONTENT)
+async def ack_task(
+    task_id: int,
+    lease_update: TaskLeaseUpdate,
+    org_id: Optional[str] = Depends(get_worker_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Mark a leased task as done."""
+    try:
+        await task_queue.ack(session, task_id, lease_update.worker_id, org_id)
+    except LeaseLostError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    return None
+
+
+@router.post("/tasks/{task_id}/nack", status_code=status.HTTP_204_NO_CONTENT)
+async def nack_task(
+    task_id: int,
+    lease_update: TaskLeaseUpdate,
+    org_id: Optional[str] = Depends(get_worker_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Release a leased task for redelivery after `retry_delay_seconds`."""
+    try:
+        await task_queue.nack(
+            session,
+            task_id,
+            lease_update.worker_id,
+            org_id,
+            retry_delay_seconds=lease_update.retry_delay_seconds,
+        )
+    except LeaseLostError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    return None
+
+
+@router.post(
+    "/agents/{agent_id}/runs/{run_id}/complete",
+    response_model=RunCompletionResult,
+)
+async def complete_run(
+    agent_id: str,
+    run_id: str,
+    run_result: RunResult,
+    org_id: Optional[str] = Depends(get_worker_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Record the result of a single run."""
+    item = RunCompletion(run_id=run_id, **run_result.model_dump())
+    [result] = await run_service.record_completions(session, [item], {}, org_id)
+    if result.status == CompletionItemStatus.UNKNOWN_RUN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result.detail)
+    if result.status == CompletionItemStatus.FORBIDDEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=result.detail)
+    return result
+
+
+@router.post("/runs/complete", response_model=RunCompletionBatchResponse)
+async def complete_runs(
+    request: Request,
+    org_id: Optional[str] = Depends(get_worker_org_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Record a batch of run results in one transaction.
+    The body is a JSON array of completions, or one completion per line
+    with `Content-Type: application/x-ndjson`. Each item gets its own
+    status; invalid items don't reject the rest of the batch.
+    """
+    content_type = request.headers.get("content-type", "")
+    ndjson = content_type.startswith(("application/x-ndjson", "application/jsonlines"))
+    try:
+        items, failures = run_service.parse_completions(await request.body(), ndjson)
+    except MalformedBatchError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if len(items) > settings.RUN_COMPLETION_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batches are limited to {settings.RUN_COMPLETION_MAX_BATCH} items",
+        )
+
+    results = await run_service.record_completions(session, items, failures, org_id)
+    accepted = sum(result.status == CompletionItemStatus.ACCEPTED for result in results)
+    return RunCompletionBatchResponse(
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        results=results,
+    )
@@ -1 +1,224 @@
-"""Telemetry, metrics, and logging endpoints."""\n\nfrom fastapi import APIRouter\n\nrouter = APIRouter()\n\n\n@router.get(\"/orgs/{org_id}/telemetry\")\nasync def get_telemetry(org_id: str):\n    \"\"\"Get telemetry data for an organization.\"\"\"\n    return {\"metrics\": {}, \"logs\": []}\n\n\n@router.get(\"/orgs/{org_id}/metrics\")\nasync def get_metrics(org_id: str):\n    \"\"\"Get metrics for an organization.\"\"\"\n    return {\"metrics\": []}\n\n\n@router.get(\"/orgs/{org_id}/logs\")\nasync def get_logs(org_id: str):\n    \"\"\"Get logs for an organization.\"\"\"\n    return {\"logs\": []}\n\n\n@router.get(\"/metrics\")\nasync def get_prometheus_metrics():\n    \"\"\"Get Prometheus metrics.\"\"\"\n    return {\"status\": \"ok\"}\n"
+"""Telemetry, metrics, and logging endpoints."""
+
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+
+from control_plane.auth import belongs_to_org, require_org_member
+from control_plane.config import settings
+from control_plane.observability import render_metrics
+from control_plane.responses import FastJSONResponse
+from control_plane.schemas import (
+    LogEntry,
+    LogsIngestResponse,
+    MetricsIngest,
+    MetricsIngestResponse,
+)
+from control_plane.services.log_store import LogQueryError, log_store
+from control_plane.services.run_events import run_events
+from control_plane.services.timeseries import InvalidQueryError, now_ms, timeseries_store
+
+router = APIRouter()
+
+# Default query window when `start` is omitted
+DEFAULT_WINDOW_MS = 3600 * 1000
+
+
+@router.get("/orgs/{org_id}/telemetry")
+async def get_telemetry(org_id: str):
+    """Get telemetry data for an organization."""
+    return {"metrics": {}, "logs": []}
+
+
+@router.get("/orgs/{org_id}/metrics", dependencies=[Depends(require_org_member)])
+async def get_metrics(
+    org_id: str,
+    metric: Optional[str] = None,
+    start: Optional[int] = Query(None, description="Epoch milliseconds"),
+    end: Optional[int] = Query(None, description="Epoch milliseconds"),
+    step_seconds: Optional[int] = Query(None, ge=1),
+    agg: List[str] = Query(["avg"]),
+    label: List[str] = Query([], description="Label matchers as name:value"),
+):
+    """
+    Get metrics for an organization.
+    Without `metric`, lists the recorded metric names. Otherwise returns
+    the series of that metric between `start` and `end` (the last hour by
+    default), raw or downsampled into `step_seconds` buckets with the `agg`
+    aggregations (min, max, avg, sum, count, p95).
+    """
+    if metric is None:
+        return {"metrics": timeseries_store.metric_names(org_id)}
+
+    matchers = {}
+    for matcher in label:
+        name, separator, value = matcher.partition(":")
+        if not separator:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid label matcher: {matcher}",
+            )
+        matchers[name] = value
+
+    end = now_ms() if end is None else end
+    start = end - DEFAULT_WINDOW_MS if start is None else start
+    try:
+        body = timeseries_store.query_json(
+            org_id,
+            metric,
+            start,
+            end,
+            step=step_seconds * 1000 if step_seconds else None,
+            aggregations=agg,
+            matchers=matchers,
+        )
+    except InvalidQueryError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    # Serialized straight from the columns, bypassing response models
+    return FastJSONResponse(body)
+
+
+@router.post(
+    "/orgs/{org_id}/metrics",
+    response_model=MetricsIngestResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_org_member)],
+)
+async def ingest_metrics(org_id: str, batch: MetricsIngest):
+    """
+    Record samples for one series of an organization.
+    Samples older than the retention window are dropped.
+    """
+    try:
+        accepted = timeseries_store.append(
+            org_id, batch.metric_name, batch.timestamps, batch.values, batch.labels
+        )
+    except InvalidQueryError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return MetricsIngestResponse(accepted=accepted)
+
+
+@router.get("/orgs/{org_id}/logs", dependencies=[Depends(require_org_member)])
+async def get_logs(
+    org_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    level: Optional[str] = Query(None, description="Minimum level"),
+    q: Optional[str] = Query(None, description="Text the message must contain"),
+    trace_id: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=settings.LOG_QUERY_MAX_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Get logs for an organization.
+    Streams matching entries as NDJSON, oldest day first. The last line is
+    `{"next_cursor": ...}`; pass it back as `cursor` to continue.
+    """
+    try:
+        lines = log_store.query(
+            org_id,
+            start=start,
+            end=end,
+            level=level,
+            text=q,
+            trace_id=trace_id,
+            limit=limit,
+            cursor=cursor,
+        )
+    except LogQueryError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.post(
+    "/orgs/{org_id}/logs",
+    response_model=LogsIngestResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_org_member)],
+)
+async def ingest_logs(org_id: str, entries: List[LogEntry]):
+    """
+    Append log entries for an organization.
+    Entries carrying a `run_id` field are also pushed to live subscribers.
+    """
+    try:
+        accepted = await asyncio.to_thread(log_store.append, org_id, entries)
+    except LogQueryError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if run_events.has_subscribers(org_id):
+        for entry in entries:
+            run_events.publish(
+                org_id, entry.fields.get("run_id"), "log", entry.model_dump(mode="json")
+            )
+    return LogsIngestResponse(accepted=accepted)
+
+
+@router.get("/orgs/{org_id}/runs/events", dependencies=[Depends(require_org_member)])
+async def stream_run_events(org_id: str, run_id: Optional[str] = None):
+    """
+    Stream run status changes and log lines as Server-Sent Events.
+    Covers every run of the organization, or only `run_id` when given.
+    """
+    return StreamingResponse(
+        run_events.sse_stream(org_id, run_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/orgs/{org_id}/runs/events/ws")
+async def run_events_socket(websocket: WebSocket, org_id: str, run_id: Optional[str] = None):
+    """
+    Stream run status changes and log lines over a WebSocket.
+    The handshake is refused with 1008 unless the token belongs to `org_id`.
+    """
+    if not belongs_to_org(websocket.scope.get("state", {}).get("user"), org_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    subscription = run_events.subscribe(org_id, run_id)
+    # Reading concurrently is how a client disconnect is noticed promptly
+    receiving = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            batch_ready = asyncio.ensure_future(
+                subscription.next_batch(run_events.keepalive_seconds)
+            )
+            await asyncio.wait({receiving, batch_ready}, return_when=asyncio.FIRST_COMPLETED)
+            if not batch_ready.done():
+                batch_ready.cancel()
+            elif batch_ready.result() is None:
+                await websocket.send_text('{"type":"keepalive"}')
+            else:
+                for _, payload in batch_ready.result():
+                    await websocket.send_text(payload)
+            if receiving.done():
+                if receiving.result()["type"] == "websocket.disconnect":
+                    break
+                # Messages from the client are ignored
+                receiving = asyncio.ensure_future(websocket.receive())
+    except (WebSocketDisconnect, OSError):
+        # Newer uvicorn raises ClientDisconnected, an OSError, from send
+        pass
+    finally:
+        receiving.cancel()
+        run_events.unsubscribe(subscription)
+
+
+@router.get("/metrics")
+async def get_prometheus_metrics():
+    """Prometheus text exposition, summed across workers in multiprocess mode."""
+    body, content_type = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,60 @@
+"""
+Webhook subscription endpoints.
+Events are delivered from the transactional outbox, signed with the
+subscription's secret in `X-Webhook-Signature`.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.auth import require_org_member
+from control_plane.database import get_session
+from control_plane.responses import FastJSONResponse, row_dicts
+from control_plane.schemas import (
+    WebhookCreate,
+    WebhookCreated,
+    WebhookListResponse,
+    WebhookResponse,
+)
+from control_plane.services import webhook_service
+from control_plane.services.outbox import DestinationNotAllowedError
+
+router = APIRouter(dependencies=[Depends(require_org_member)])
+
+
+@router.post(
+    "/orgs/{org_id}/webhooks",
+    response_model=WebhookCreated,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_webhook(
+    org_id: str,
+    webhook_create: WebhookCreate,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Subscribe an endpoint to events; the signing secret is only returned here.
+    The endpoint must resolve to public addresses.
+    """
+    try:
+        return await webhook_service.create_webhook(session, org_id, webhook_create)
+    except DestinationNotAllowedError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get("/orgs/{org_id}/webhooks", response_model=WebhookListResponse)
+async def list_webhooks(org_id: str, session: AsyncSession = Depends(get_session)):
+    """List an organization's webhook subscriptions."""
+    webhooks = await webhook_service.list_webhooks(session, org_id)
+    return FastJSONResponse({"webhooks": row_dicts(WebhookResponse, webhooks)})
+
+
+@router.delete("/orgs/{org_id}/webhooks/{webhook_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook(
+    org_id: str,
+    webhook_id: str,
+    session: AsyncSession = Depends(get_session),
+):
+    """Remove a webhook subscription."""
+    if not await webhook_service.delete_webhook(session, org_id, webhook_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found")
@@ -42,6 +42,29 @@ class BillingModel(str, Enum):
     PER_AGENT = "per_agent"
 
 
+class TaskStatus(str, Enum):
+    """Task queue status values."""
+    QUEUED = "queued"
+    LEASED = "leased"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class RunStatus(str, Enum):
+    """Final agent run status values."""
+    COMPLETED = "completed"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+
+
+class CompletionItemStatus(str, Enum):
+    """Outcome of one item in a batch of run completions."""
+    ACCEPTED = "accepted"
+    INVALID = "invalid"
+    UNKNOWN_RUN = "unknown_run"
+    FORBIDDEN = "forbidden"
+
+
 class ApprovalStatus(str, Enum):
     """Approval status values."""
     PENDING = "pending"
@@ -49,6 +72,21 @@ class ApprovalStatus(str, Enum):
     REJECTED = "rejected"
 
 
+class OutboxStatus(str, Enum):
+    """Delivery status of an outbox event."""
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    DEAD = "dead"
+
+
+class ApprovalDecisionOutcome(str, Enum):
+    """Outcome of one item in a bulk decision."""
+    DECIDED = "decided"
+    NOT_FOUND = "not_found"
+    ALREADY_DECIDED = "already_decided"
+    EXPIRED = "expired"
+
+
 # Agent Models
 class AgentToolInput(BaseModel):
     """Input specification for an agent tool."""
@@ -134,6 +172,18 @@ class AgentResponse(BaseModel):
         from_attributes = True
 
 
+class AgentListResponse(BaseModel):
+    """One page of the agent catalog."""
+    items: List[AgentResponse]
+    next_cursor: Optional[str] = None
+
+
+class AgentSearchResponse(BaseModel):
+    """Ranked full-text search results."""
+    results: List[AgentResponse]
+    total: int
+
+
 # Deployment Models
 class DeploymentCreate(BaseModel):
     """Request to create a new deployment."""
@@ -168,27 +218,168 @@ class DeploymentResponse(BaseModel):
         from_attributes = True
 
 
+# Task Queue Models
+class RunCreate(BaseModel):
+    """Request to start an agent run."""
+    deployment_id: Optional[str] = None
+    inputs: Dict[str, Any] = {}
+
+
+class RunResponse(BaseModel):
+    """A queued agent run."""
+    run_id: str
+    task_id: int
+    status: TaskStatus
+
+
+class TaskResponse(BaseModel):
+    """A task leased to a Data Plane worker."""
+    id: int
+    run_id: str
+    org_id: str
+    agent_id: str
+    deployment_id: Optional[str]
+    payload: Dict[str, Any]
+    attempts: int
+    lease_expires_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TaskLeaseResponse(BaseModel):
+    """Tasks leased by one `GET /tasks/next` call."""
+    tasks: List[TaskResponse]
+
+
+class TaskLeaseUpdate(BaseModel):
+    """Heartbeat, acknowledgement or release of a leased task."""
+    worker_id: str
+    retry_delay_seconds: int = Field(0, ge=0)
+
+
+class RunResult(BaseModel):
+    """Result reported by the Data Plane when a run finishes."""
+    status: RunStatus
+    outputs: Dict[str, Any] = {}
+    logs: List[Dict[str, Any]] = []
+    metrics: Dict[str, Any] = {}
+    error: Optional[str] = None
+    execution_time_ms: Optional[int] = Field(None, ge=0)
+    completed_at: Optional[datetime] = None
+
+
+class RunCompletion(RunResult):
+    """One item of a batch completion."""
+    run_id: str
+
+
+class RunCompletionResult(BaseModel):
+    """Per-item status of a batch completion."""
+    index: int
+    run_id: Optional[str] = None
+    status: CompletionItemStatus
+    detail: Optional[str] = None
+
+
+class RunCompletionBatchResponse(BaseModel):
+    """Response to a batch completion."""
+    accepted: int
+    rejected: int
+    results: List[RunCompletionResult]
+
+
 # Approval Models
 class ApprovalCreate(BaseModel):
-    """Request to create an approval."""
-    agent_id: int
-    approval_type: str
-    description: str
+    """Request for human approval of an action."""
+    agent_id: str = Field(..., min_length=1, max_length=255)
+    run_id: Optional[str] = Field(None, max_length=64)
+    action: str = Field(..., min_length=1)
+    impact: Dict[str, Any] = {}
+    expires_in_seconds: Optional[int] = Field(None, gt=0)
 
 
 class ApprovalResponse(BaseModel):
     """Approval response model."""
-    id: int
-    agent_id: int
-    approval_type: str
+    approval_id: str
+    org_id: str
+    run_id: Optional[str]
+    agent_id: str
+    action: str
+    impact: Dict[str, Any]
     status: ApprovalStatus
+    decided_by: Optional[str] = None
+    decided_at: Optional[datetime] = None
+    comments: Optional[str] = None
     created_at: datetime
-    updated_at: datetime
+    expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class ApprovalListResponse(BaseModel):
+    """One page of an org's approval queue."""
+    approvals: List[ApprovalResponse]
+    total: int
+    limit: int
+    offset: int
+
+
+class ApprovalDecision(BaseModel):
+    """Approve or reject one approval."""
+    comments: Optional[str] = None
+
+
+class ApprovalBulkDecision(BaseModel):
+    """Approve or reject many approvals at once."""
+    approval_ids: List[str] = Field(..., min_length=1, max_length=500)
+    approved: bool
+    comments: Optional[str] = None
+
+
+class ApprovalDecisionResult(BaseModel):
+    """Result for one approval in a bulk decision."""
+    approval_id: str
+    outcome: ApprovalDecisionOutcome
+    status: Optional[ApprovalStatus] = None
+
+
+class ApprovalBulkDecisionResponse(BaseModel):
+    """Response to a bulk decision."""
+    decided: int
+    results: List[ApprovalDecisionResult]
+
+
+# Webhook Models
+class WebhookCreate(BaseModel):
+    """Subscribe an endpoint to webhook events."""
+    url: HttpUrl
+    events: List[str] = Field([], description="Event types to deliver; empty for all")
+    secret: Optional[str] = Field(None, min_length=16, max_length=255)
+
+
+class WebhookResponse(BaseModel):
+    """A webhook subscription."""
+    webhook_id: str
+    url: str
+    events: List[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WebhookCreated(WebhookResponse):
+    """A new webhook subscription, with its signing secret."""
+    secret: str
+
+
+class WebhookListResponse(BaseModel):
+    """An org's webhook subscriptions."""
+    webhooks: List[WebhookResponse]
+
+
 # Billing Models
 class SubscriptionCreate(BaseModel):
     """Request to create a subscription."""
@@ -213,6 +404,36 @@ class SubscriptionResponse(BaseModel):
         from_attributes = True
 
 
+class InvoiceLine(BaseModel):
+    """Usage and charges for one agent in a billing period."""
+    agent_id: str
+    runs: int
+    records: int
+    cpu_ms: int
+    base_cents: int
+    records_cents: int
+    compute_cents: int
+    total_cents: int
+    developer_cents: int
+    platform_cents: int
+
+
+class Invoice(BaseModel):
+    """Usage charges for one org in a billing period."""
+    org_id: str
+    period_start: datetime
+    period_end: datetime
+    total_cents: int = 0
+    developer_cents: int = 0
+    platform_cents: int = 0
+    lines: List[InvoiceLine] = []
+
+
+class BillingInfoResponse(Invoice):
+    """Charges so far in an org's current billing period."""
+    current_plan: str
+
+
 # Telemetry Models
 class MetricPoint(BaseModel):
     """Single metric data point."""
@@ -227,6 +448,19 @@ class MetricsResponse(BaseModel):
     points: List[MetricPoint]
 
 
+class MetricsIngest(BaseModel):
+    """Columnar batch of samples for one series."""
+    metric_name: str = Field(..., min_length=1, max_length=200)
+    labels: Dict[str, str] = {}
+    timestamps: List[int]  # Epoch milliseconds
+    values: List[float]
+
+
+class MetricsIngestResponse(BaseModel):
+    """Metrics ingestion result."""
+    accepted: int
+
+
 class LogEntry(BaseModel):
     """Log entry model."""
     timestamp: datetime
@@ -242,6 +476,45 @@ class LogsResponse(BaseModel):
     total_count: int
 
 
+class LogsIngestResponse(BaseModel):
+    """Log ingestion result."""
+    accepted: int
+
+
+# Memory Models
+class MemoryVector(BaseModel):
+    """A memory to index, given as a vector or as text to embed."""
+    id: str = Field(..., min_length=1, max_length=255)
+    vector: Optional[List[float]] = None
+    text: Optional[str] = Field(None, min_length=1)
+    metadata: Dict[str, Any] = {}
+
+
+class MemoryUpsert(BaseModel):
+    """Memories to add to a namespace."""
+    items: List[MemoryVector] = Field(..., min_length=1, max_length=1000)
+
+
+class MemorySearchRequest(BaseModel):
+    """Semantic search within a namespace, by vector or by text."""
+    vector: Optional[List[float]] = None
+    text: Optional[str] = Field(None, min_length=1)
+    top_k: int = Field(5, ge=1, le=100)
+    threshold: Optional[float] = Field(None, ge=-1, le=1)
+
+
+class MemoryMatch(BaseModel):
+    """One search hit."""
+    id: str
+    score: float
+    metadata: Dict[str, Any]
+
+
+class MemorySearchResponse(BaseModel):
+    """Search hits, most similar first."""
+    matches: List[MemoryMatch]
+
+
 # Error Models
 class ErrorResponse(BaseModel):
     """Error response model."""
@@ -251,6 +524,12 @@ class ErrorResponse(BaseModel):
 
 
 # Health Models
+class DependencyCheck(BaseModel):
+    """Outcome of one dependency probe; failure details are only logged."""
+    status: str  # "ok", "timeout" or "error"
+    latency_ms: float
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
@@ -258,3 +537,12 @@ class HealthResponse(BaseModel):
     version: str
     timestamp: datetime
     dependencies: Dict[str, str] = {}
+    checks: Dict[str, DependencyCheck] = {}
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response; `reasons` lists what made it not ready."""
+    status: str
+    reasons: List[str] = []
+    pool_saturation: Optional[float] = None
+    loop_lag_seconds: float
@@ -0,0 +1,261 @@
+"""
+Agent catalog service.
+Database access for the marketplace catalog, including keyset pagination,
+and the in-process search index kept in sync with committed changes.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.database import async_session_maker
+from control_plane.models import Agent
+from control_plane.schemas import AgentCreate, AgentResponse, AgentStatus, AgentUpdate
+from control_plane.services.registry_cache import registry_cache
+from control_plane.services.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Statuses from which an agent can be published
+PUBLISHABLE_STATUSES = {AgentStatus.SUBMITTED.value, AgentStatus.APPROVED.value}
+
+# Relative weight of a term hit in each indexed agent field
+SEARCH_FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "category": 2.0,
+    "tools": 1.5,
+    "description": 1.0,
+}
+
+# Published agents, keyed by primary key
+search_index = SearchIndex(SEARCH_FIELD_WEIGHTS)
+
+# Registry cache listings version the search index was loaded at
+_indexed_version: Optional[int] = None
+_index_reload: Optional["asyncio.Task[None]"] = None
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(agent: Agent) -> str:
+    """Encode the keyset position of an agent as an opaque cursor."""
+    position = json.dumps([agent.category, agent.rating, agent.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(position.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, float, int]:
+    """Decode a cursor produced by `encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        category, rating, agent_pk = json.loads(base64.urlsafe_b64decode(padded))
+        return str(category), float(rating), int(agent_pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+
+async def list_published_agents(
+    session: AsyncSession,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+) -> Tuple[Sequence[Agent], Optional[str]]:
+    """
+    List published agents ordered by (category, rating desc, id desc).
+    Returns one page of agents and the cursor of the next page, if any.
+    """
+    published = select(Agent).where(Agent.status == AgentStatus.PUBLISHED.value)
+    order = (Agent.category, Agent.rating.desc(), Agent.id.desc())
+
+    async def fetch(stmt, count: int) -> List[Agent]:
+        result = await session.execute(stmt.order_by(*order).limit(count))
+        return list(result.scalars().all())
+
+    # Fetch one extra row to learn whether another page exists
+    wanted = limit + 1
+    if cursor is None:
+        stmt = published
+        if category is not None:
+            stmt = stmt.where(Agent.category == category)
+        agents = await fetch(stmt, wanted)
+    else:
+        after_category, after_rating, after_id = decode_cursor(cursor)
+        if category is not None and after_category != category:
+            raise InvalidCursorError("Cursor does not match category filter")
+
+        # Row-value comparison lets the planner seek the (rating, id) index
+        # suffix directly instead of filtering an OR expression.
+        agents = await fetch(
+            published.where(
+                Agent.category == after_category,
+                tuple_(Agent.rating, Agent.id) < (after_rating, after_id),
+            ),
+            wanted,
+        )
+        # Unfiltered listings continue into the following categories as a
+        # second range scan rather than one OR-ed predicate.
+        if category is None and len(agents) < wanted:
+            agents += await fetch(
+                published.where(Agent.category > after_category),
+                wanted - len(agents),
+            )
+
+    next_cursor = None
+    if len(agents) > limit:
+        agents = agents[:limit]
+        next_cursor = encode_cursor(agents[-1])
+    return agents, next_cursor
+
+
+def index_agent(agent: Agent) -> None:
+    """Add a published agent to the search index, or drop any other agent."""
+    if agent.status != AgentStatus.PUBLISHED.value:
+        search_index.remove(agent.id)
+        return
+    tools = (agent.manifest or {}).get("tools") or []
+    search_index.upsert(
+        agent.id,
+        {
+            "name": agent.name,
+            "description": agent.description,
+            "tags": agent.tags or [],
+            "category": agent.category,
+            "tools": [tool.get("name", "") for tool in tools],
+        },
+        payload=AgentResponse.model_validate(agent),
+    )
+
+
+async def rebuild_search_index(session: AsyncSession) -> int:
+    """Load every published agent into the search index."""
+    global _indexed_version
+    # Read before loading, so a write landing meanwhile triggers another load
+    version = await registry_cache.backend.counter(registry_cache.LISTINGS_VERSION_KEY)
+    result = await session.execute(
+        select(Agent).where(Agent.status == AgentStatus.PUBLISHED.value)
+    )
+    search_index.clear()
+    for agent in result.scalars():
+        index_agent(agent)
+    _indexed_version = version
+    return len(search_index)
+
+
+async def refresh_search_index() -> None:
+    """
+    Reload the search index if the catalog changed since it was loaded.
+    Every catalog write bumps the registry cache's listings version, so
+    writes handled by other workers are picked up too; like the cache,
+    that needs the Redis backend when there are several workers.
+    Concurrent callers share one reload.
+    """
+    global _index_reload
+    version = await registry_cache.backend.counter(registry_cache.LISTINGS_VERSION_KEY)
+    if version == _indexed_version:
+        return
+    if _index_reload is None:
+        _index_reload = asyncio.ensure_future(_reload_search_index())
+    await asyncio.shield(_index_reload)
+
+
+async def _reload_search_index() -> None:
+    """Rebuild the search index from the primary, keeping it on failure."""
+    global _index_reload
+    try:
+        async with async_session_maker() as session:
+            await rebuild_search_index(session)
+    except Exception:
+        # Keep serving the loaded index; the next search retries
+        logger.warning("Search index reload failed", exc_info=True)
+    finally:
+        _index_reload = None
+
+
+def search_agents(query: str, limit: int = 10) -> Tuple[List[AgentResponse], int]:
+    """Rank published agents for a query; returns one page and the match count."""
+    hits, total = search_index.search(query, limit=limit)
+    return [agent for agent, _ in hits], total
+
+
+async def get_agent(session: AsyncSession, agent_id: str) -> Optional[Agent]:
+    """Get an agent by its public agent_id."""
+    result = await session.execute(select(Agent).where(Agent.agent_id == agent_id))
+    return result.scalar_one_or_none()
+
+
+async def create_agent(
+    session: AsyncSession,
+    agent_create: AgentCreate,
+    developer_id: int,
+) -> Agent:
+    """Insert a submitted agent from its manifest."""
+    manifest = agent_create.manifest
+    agent = Agent(
+        agent_id=manifest.agent_id,
+        name=manifest.name,
+        description=manifest.description,
+        version=manifest.version,
+        status=AgentStatus.SUBMITTED.value,
+        category=manifest.category,
+        tags=list(manifest.tags),
+        manifest=manifest.model_dump(mode="json"),
+        container_image=agent_create.container_image,
+        helm_chart_url=agent_create.helm_chart_url,
+        risk_level=manifest.risk_level,
+        developer_id=developer_id,
+    )
+    session.add(agent)
+    await session.commit()
+    index_agent(agent)
+    return agent
+
+
+async def update_agent(
+    session: AsyncSession,
+    agent: Agent,
+    agent_update: AgentUpdate,
+) -> Agent:
+    """Apply an update; a new manifest returns the agent to draft."""
+    if agent_update.manifest is not None:
+        manifest = agent_update.manifest
+        agent.manifest = manifest.model_dump(mode="json")
+        agent.name = manifest.name
+        agent.description = manifest.description
+        agent.version = manifest.version
+        agent.category = manifest.category
+        agent.tags = list(manifest.tags)
+        agent.risk_level = manifest.risk_level
+        agent.status = AgentStatus.DRAFT.value
+    if agent_update.name is not None:
+        agent.name = agent_update.name
+    if agent_update.description is not None:
+        agent.description = agent_update.description
+    if agent_update.tags is not None:
+        agent.tags = list(agent_update.tags)
+    await session.commit()
+    index_agent(agent)
+    return agent
+
+
+async def delete_agent(session: AsyncSession, agent: Agent) -> None:
+    """Delete an agent."""
+    agent_pk = agent.id
+    await session.delete(agent)
+    await session.commit()
+    search_index.remove(agent_pk)
+
+
+async def publish_agent(session: AsyncSession, agent: Agent) -> Agent:
+    """Mark an agent as published."""
+    agent.status = AgentStatus.PUBLISHED.value
+    await session.commit()
+    index_agent(agent)
+    return agent
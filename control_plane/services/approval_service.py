@@ -0,0 +1,170 @@
+"""
+Approval queue service.
+Approvals are rows in `approvals`, paged per org and status through the
+`(org_id, status, id)` index. Decisions, single or bulk, are one
+conditional `UPDATE ... RETURNING`, so concurrent approvers can't both
+decide an item. Webhook events, and decisions for the Data Plane, are
+staged in the outbox in the same transaction; notifications are handed to
+the dispatcher after commit and never delay the response.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.models import Approval
+from control_plane.schemas import (
+    ApprovalCreate,
+    ApprovalDecisionOutcome,
+    ApprovalDecisionResult,
+    ApprovalStatus,
+)
+from control_plane.services.notifications import Notification, notification_dispatcher
+from control_plane.services.outbox import add_events, outbox_dispatcher
+
+
+def _payload(approval: Approval) -> Dict[str, object]:
+    return {
+        "approval_id": approval.approval_id,
+        "run_id": approval.run_id,
+        "agent_id": approval.agent_id,
+        "action": approval.action,
+        "status": approval.status,
+        "decided_by": approval.decided_by,
+        "decided_at": approval.decided_at.isoformat() + "Z" if approval.decided_at else None,
+        "comments": approval.comments,
+    }
+
+
+def _notify(event: str, approval: Approval) -> None:
+    notification_dispatcher.submit(
+        Notification(event, approval.org_id, _payload(approval), run_id=approval.run_id)
+    )
+
+
+async def create_approval(session: AsyncSession, org_id: str, request: ApprovalCreate) -> Approval:
+    """Queue an approval and notify the org's approvers."""
+    now = datetime.utcnow()
+    ttl = request.expires_in_seconds or settings.APPROVAL_DEFAULT_TTL_SECONDS
+    approval = Approval(
+        approval_id=f"app-{uuid.uuid4().hex}",
+        org_id=org_id,
+        run_id=request.run_id,
+        agent_id=request.agent_id,
+        action=request.action,
+        impact=request.impact,
+        status=ApprovalStatus.PENDING.value,
+        created_at=now,
+        expires_at=now + timedelta(seconds=ttl),
+    )
+    session.add(approval)
+    await add_events(session, [(org_id, "approval.requested", _payload(approval))])
+    await session.commit()
+    outbox_dispatcher.wake()
+    _notify("approval.requested", approval)
+    return approval
+
+
+async def list_approvals(
+    session: AsyncSession,
+    org_id: str,
+    status: ApprovalStatus = ApprovalStatus.PENDING,
+    limit: int = 20,
+    offset: int = 0,
+) -> Tuple[List[Approval], int]:
+    """One page of an org's approvals with a status, oldest first, and the total."""
+    conditions = [Approval.org_id == org_id, Approval.status == status.value]
+    if status == ApprovalStatus.PENDING:
+        conditions.append(or_(Approval.expires_at.is_(None), Approval.expires_at > datetime.utcnow()))
+    result = await session.execute(
+        select(Approval).where(*conditions).order_by(Approval.id).limit(limit).offset(offset)
+    )
+    total = await session.scalar(select(func.count()).select_from(Approval).where(*conditions))
+    return list(result.scalars().all()), total or 0
+
+
+async def get_approval(session: AsyncSession, org_id: str, approval_id: str) -> Optional[Approval]:
+    """Get one of an org's approvals."""
+    return await session.scalar(
+        select(Approval).where(Approval.org_id == org_id, Approval.approval_id == approval_id)
+    )
+
+
+async def decide(
+    session: AsyncSession,
+    org_id: str,
+    approval_ids: Sequence[str],
+    approved: bool,
+    decided_by: Optional[str],
+    comments: Optional[str] = None,
+) -> List[ApprovalDecisionResult]:
+    """
+    Approve or reject pending, unexpired approvals in one statement.
+    Returns a result per requested id, in request order.
+    """
+    now = datetime.utcnow()
+    status = ApprovalStatus.APPROVED if approved else ApprovalStatus.REJECTED
+    ids = list(dict.fromkeys(approval_ids))
+    result = await session.execute(
+        update(Approval)
+        .where(
+            Approval.org_id == org_id,
+            Approval.approval_id.in_(ids),
+            Approval.status == ApprovalStatus.PENDING.value,
+            or_(Approval.expires_at.is_(None), Approval.expires_at > now),
+        )
+        .values(
+            status=status.value,
+            decided_by=decided_by,
+            decided_at=now,
+            comments=comments,
+            updated_at=now,
+        )
+        .returning(Approval)
+        .execution_options(synchronize_session=False)
+    )
+    decided = {approval.approval_id: approval for approval in result.scalars().all()}
+
+    # Explain the rest with one more read
+    outcomes: Dict[str, ApprovalDecisionResult] = {}
+    missing = [approval_id for approval_id in ids if approval_id not in decided]
+    if missing:
+        rows = await session.execute(
+            select(Approval.approval_id, Approval.status).where(
+                Approval.org_id == org_id, Approval.approval_id.in_(missing)
+            )
+        )
+        for approval_id, current in rows.all():
+            outcome = (
+                ApprovalDecisionOutcome.EXPIRED
+                if current == ApprovalStatus.PENDING.value
+                else ApprovalDecisionOutcome.ALREADY_DECIDED
+            )
+            outcomes[approval_id] = ApprovalDecisionResult(
+                approval_id=approval_id, outcome=outcome, status=ApprovalStatus(current)
+            )
+    event = "approval.approved" if approved else "approval.rejected"
+    # The Data Plane resumes or cancels the waiting run on this event
+    staged = await add_events(
+        session,
+        [(org_id, event, _payload(approval)) for approval in decided.values()],
+        data_plane=True,
+    )
+    await session.commit()
+    if staged:
+        outbox_dispatcher.wake()
+
+    for approval in decided.values():
+        _notify(event, approval)
+        outcomes[approval.approval_id] = ApprovalDecisionResult(
+            approval_id=approval.approval_id, outcome=ApprovalDecisionOutcome.DECIDED, status=status
+        )
+    return [
+        outcomes.get(approval_id)
+        or ApprovalDecisionResult(approval_id=approval_id, outcome=ApprovalDecisionOutcome.NOT_FOUND)
+        for approval_id in ids
+    ]
@@ -0,0 +1,268 @@
+"""
+Usage metering and invoicing.
+Run completions are metered into per org, agent and hour counters that are
+flushed to `usage_hourly` with additive upserts. Invoices are priced from
+those rollups in one vectorized pass over NumPy int64 columns, in integer
+micro-dollars rounded once per charge to whole cents, so a month never
+needs a scan of raw runs and no float rounding creeps into totals.
+
+Charges per the billing flow: base price per run (the agent's `price`),
+per-record and per-CPU-hour rates, split between developer and platform.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.database import async_session_maker, upsert_insert
+from control_plane.models import Agent, UsageHourly
+from control_plane.schemas import Invoice, InvoiceLine
+
+logger = logging.getLogger(__name__)
+
+MICROS_PER_DOLLAR = 1_000_000
+MICROS_PER_CENT = 10_000
+MS_PER_HOUR = 3_600_000
+
+# Rows per INSERT statement; keeps bind parameters well under driver limits
+UPSERT_CHUNK_SIZE = 500
+
+UsageKey = Tuple[str, str, datetime]
+
+
+def billing_period(
+    at: datetime, cycle_day: int = settings.BILLING_CYCLE_DAY
+) -> Tuple[datetime, datetime]:
+    """Return the [start, end) billing period containing `at`, in naive UTC."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    # Cycles start on a day every month has
+    start = at.replace(day=min(cycle_day, 28), hour=0, minute=0, second=0, microsecond=0)
+    if at < start:
+        start = _add_months(start, -1)
+    return start, _add_months(start, 1)
+
+
+def _add_months(at: datetime, months: int) -> datetime:
+    month = at.month - 1 + months
+    return at.replace(year=at.year + month // 12, month=month % 12 + 1)
+
+
+class UsageMeter:
+    """
+    Incremental usage aggregator.
+    Events are added to in-memory per org, agent and hour counters, and
+    `flush` adds the counters to `usage_hourly`, so the table grows with
+    hours of activity rather than with runs.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = async_session_maker):
+        """
+        Args:
+            session_factory: Opens sessions for the background flusher.
+        """
+        self.session_factory = session_factory
+        self._pending: Dict[UsageKey, List[int]] = {}
+
+    def record(
+        self,
+        org_id: str,
+        agent_id: str,
+        at: datetime,
+        runs: int = 1,
+        records: int = 0,
+        cpu_ms: int = 0,
+    ) -> None:
+        """Add one usage event to its hourly counter."""
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        hour = at.replace(minute=0, second=0, microsecond=0)
+        counters = self._pending.get((org_id, agent_id, hour))
+        if counters is None:
+            self._pending[(org_id, agent_id, hour)] = [runs, records, cpu_ms]
+        else:
+            counters[0] += runs
+            counters[1] += records
+            counters[2] += cpu_ms
+
+    async def flush(self, session: AsyncSession) -> int:
+        """Add pending counters to `usage_hourly`; returns rows written."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        rows = [
+            {
+                "org_id": org_id,
+                "agent_id": agent_id,
+                "hour": hour,
+                "runs": runs,
+                "records": records,
+                "cpu_ms": cpu_ms,
+            }
+            for (org_id, agent_id, hour), (runs, records, cpu_ms) in pending.items()
+        ]
+        insert = upsert_insert(session)
+        try:
+            for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                stmt = insert(UsageHourly).values(rows[start:start + UPSERT_CHUNK_SIZE])
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[UsageHourly.org_id, UsageHourly.hour, UsageHourly.agent_id],
+                        set_={
+                            column: getattr(UsageHourly, column) + stmt.excluded[column]
+                            for column in ("runs", "records", "cpu_ms")
+                        },
+                    )
+                )
+            await session.commit()
+        except BaseException:
+            # Includes cancellation mid-flush at shutdown
+            await session.rollback()
+            # Keep the counters for the next flush, merged with newer events
+            for (org_id, agent_id, hour), (runs, records, cpu_ms) in pending.items():
+                self.record(org_id, agent_id, hour, runs, records, cpu_ms)
+            raise
+        return len(rows)
+
+    async def run_flusher(self, interval_seconds: float) -> None:
+        """Flush pending usage forever; cancel the task to stop."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                async with self.session_factory() as session:
+                    await self.flush(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Usage flush failed", exc_info=True)
+
+
+def group_sums(keys: np.ndarray, *columns: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Sum int64 `columns` per distinct key.
+    Returns the sorted distinct keys followed by one sum array per column;
+    sort plus `reduceat` stays exact where float-weighted `bincount` would
+    not.
+    """
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    if not len(keys):
+        return (keys, *(np.zeros(0, dtype=np.int64) for _ in columns))
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return (
+        keys[starts],
+        *(np.add.reduceat(column[order].astype(np.int64), starts) for column in columns),
+    )
+
+
+def _micros_to_cents(micros: np.ndarray) -> np.ndarray:
+    """Round micro-dollars half up to whole cents."""
+    return (micros + MICROS_PER_CENT // 2) // MICROS_PER_CENT
+
+
+def price_usage(
+    runs: np.ndarray,
+    records: np.ndarray,
+    cpu_ms: np.ndarray,
+    base_micros: np.ndarray,
+    per_record_micros: int = settings.BILLING_PER_RECORD_MICROS,
+    cpu_hour_micros: int = settings.BILLING_CPU_HOUR_MICROS,
+    developer_percent: int = settings.BILLING_DEVELOPER_SHARE_PERCENT,
+) -> Dict[str, np.ndarray]:
+    """
+    Price usage lines in integer cents.
+    Each charge is rounded once, and the developer share is rounded down
+    with the platform taking the remainder, so the parts always add up to
+    the total.
+    """
+    charges = {
+        "base_cents": _micros_to_cents(runs * base_micros),
+        "records_cents": _micros_to_cents(records * per_record_micros),
+        "compute_cents": _micros_to_cents(cpu_ms * cpu_hour_micros // MS_PER_HOUR),
+    }
+    total = charges["base_cents"] + charges["records_cents"] + charges["compute_cents"]
+    developer = total * developer_percent // 100
+    return {
+        **charges,
+        "total_cents": total,
+        "developer_cents": developer,
+        "platform_cents": total - developer,
+    }
+
+
+async def price_period(
+    session: AsyncSession,
+    period_start: datetime,
+    period_end: datetime,
+    org_ids: Optional[Iterable[str]] = None,
+) -> Dict[str, Invoice]:
+    """
+    Price one billing period for every org with usage, or only `org_ids`.
+    Returns an invoice per org with one line per agent.
+    """
+    stmt = select(
+        UsageHourly.org_id,
+        UsageHourly.agent_id,
+        UsageHourly.runs,
+        UsageHourly.records,
+        UsageHourly.cpu_ms,
+    ).where(UsageHourly.hour >= period_start, UsageHourly.hour < period_end)
+    if org_ids is not None:
+        stmt = stmt.where(UsageHourly.org_id.in_(list(org_ids)))
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return {}
+
+    org_column, agent_column, runs, records, cpu_ms = zip(*rows)
+    orgs, org_codes = np.unique(np.array(org_column, dtype=object), return_inverse=True)
+    agents, agent_codes = np.unique(np.array(agent_column, dtype=object), return_inverse=True)
+    keys, runs, records, cpu_ms = group_sums(
+        org_codes.astype(np.int64) * len(agents) + agent_codes,
+        np.array(runs, dtype=np.int64),
+        np.array(records, dtype=np.int64),
+        np.array(cpu_ms, dtype=np.int64),
+    )
+    line_orgs, line_agents = np.divmod(keys, len(agents))
+
+    result = await session.execute(
+        select(Agent.agent_id, Agent.price).where(Agent.agent_id.in_(agents.tolist()))
+    )
+    prices = dict(result.all())
+    agent_base = np.array(
+        [round(prices.get(agent_id, 0.0) * MICROS_PER_DOLLAR) for agent_id in agents.tolist()],
+        dtype=np.int64,
+    )
+    charges = price_usage(runs, records, cpu_ms, agent_base[line_agents])
+
+    invoices: Dict[str, Invoice] = {}
+    columns = {name: values.tolist() for name, values in charges.items()}
+    usage = runs.tolist(), records.tolist(), cpu_ms.tolist()
+    for index, (org_code, agent_code) in enumerate(zip(line_orgs.tolist(), line_agents.tolist())):
+        org_id = orgs[org_code]
+        invoice = invoices.get(org_id)
+        if invoice is None:
+            invoice = invoices[org_id] = Invoice(
+                org_id=org_id, period_start=period_start, period_end=period_end
+            )
+        line = InvoiceLine(
+            agent_id=agents[agent_code],
+            runs=usage[0][index],
+            records=usage[1][index],
+            cpu_ms=usage[2][index],
+            **{name: values[index] for name, values in columns.items()},
+        )
+        invoice.lines.append(line)
+        invoice.total_cents += line.total_cents
+        invoice.developer_cents += line.developer_cents
+        invoice.platform_cents += line.platform_cents
+    return invoices
+
+
+# Global meter instance
+usage_meter = UsageMeter()
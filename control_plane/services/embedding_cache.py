@@ -0,0 +1,433 @@
+"""
+Embedding cache for agent memory.
+Texts are keyed by a hash of the model name and the normalized text, so
+repeated task inputs from scheduled agents are embedded once. Vectors are
+kept as unit-length float16, both in an in-process LRU and in a
+memory-mapped store on disk that survives restarts. Concurrent misses are
+micro-batched into single provider calls, and concurrent requests for the
+same text share one result.
+
+Workers may share the disk store. Writes hold an exclusive `flock` on its
+`lock` file, so there is one writer at a time, and a worker picks up
+vectors the others stored when it writes or misses. As with the memory
+indexes, `EMBEDDING_CACHE_PATH` must be on a local filesystem.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from control_plane.config import settings
+from control_plane.observability import metrics_instance
+from control_plane.services.vector_index import MappedArray, file_lock, normalize
+
+logger = logging.getLogger(__name__)
+
+DIGEST_BYTES = 16
+_WHITESPACE = re.compile(r"\s+")
+
+
+class EmbeddingError(ValueError):
+    """Raised when a provider call fails or returns unusable embeddings."""
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a text: NFKC with runs of whitespace collapsed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def content_digest(model: str, text: str) -> bytes:
+    """Cache key of `text` as embedded by `model`."""
+    hasher = hashlib.blake2b(digest_size=DIGEST_BYTES)
+    hasher.update(model.encode())
+    hasher.update(b"\0")
+    hasher.update(normalize_text(text).encode())
+    return hasher.digest()
+
+
+class Embedder:
+    """An embedding provider; each `embed` call is one provider request."""
+
+    def __init__(self, model: str, dim: int):
+        self.model = model
+        self.dim = dim
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Return a (len(texts), dim) array of embeddings."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release provider connections."""
+
+
+class FakeEmbedder(Embedder):
+    """
+    Deterministic local embedder for development and tests.
+    Each text maps to a pseudo-random unit vector seeded by its hash, so
+    equal texts get equal vectors but similarity carries no meaning. Batch
+    sizes are recorded in `batches`.
+    """
+
+    def __init__(self, dim: int, model: str = "fake"):
+        super().__init__(model, dim)
+        self.batches: List[int] = []
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        self.batches.append(len(texts))
+        rows = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(content_digest(self.model, text)[:8], "little")
+            rows[row] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        return normalize(rows)
+
+
+class HTTPEmbedder(Embedder):
+    """Embedder for OpenAI-compatible `/embeddings` endpoints."""
+
+    def __init__(self, url: str, model: str, dim: int, api_key: str = "", timeout: float = 30.0):
+        super().__init__(model, dim)
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client = None
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        if self._client is None:
+            import httpx
+
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(timeout=self.timeout, headers=headers)
+        try:
+            response = await self._client.post(
+                self.url, json={"model": self.model, "input": texts}
+            )
+            response.raise_for_status()
+            data = sorted(response.json()["data"], key=lambda item: item["index"])
+        except Exception as exc:
+            raise EmbeddingError(f"Embedding provider request failed: {exc}") from exc
+        return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class EmbeddingStore:
+    """
+    Digest to float16 vector map in memory-mapped files.
+    `keys.bin` holds one digest per row of `vectors.f16` and is written
+    after the vectors, so its length is the number of complete rows after a
+    crash, and also the number other workers may read during a write.
+    """
+
+    def __init__(self, path: Path, dim: int):
+        """Open or create the store in directory `path`."""
+        path.mkdir(parents=True, exist_ok=True)
+        self._keys_path = path / "keys.bin"
+        self._lock_path = path / "lock"
+        self._rows: Dict[bytes, int] = {}
+        self._count = 0
+        with file_lock(self._lock_path):
+            meta_path = path / "meta.json"
+            if meta_path.exists():
+                stored_dim = json.loads(meta_path.read_text())["dim"]
+                if stored_dim != dim:
+                    raise ValueError(
+                        f"Embedding cache at {path} holds {stored_dim}-dim vectors, not {dim}"
+                    )
+            else:
+                meta_path.write_text(json.dumps({"dim": dim}))
+            self._read_keys()
+            self._keys = self._keys_path.open("ab")
+            # Drop a torn trailing digest
+            self._keys.truncate(self._count * DIGEST_BYTES)
+            self.vectors = MappedArray(path / "vectors.f16", np.float16, dim, self._count)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        """Return a copy of a stored vector, or None."""
+        row = self._rows.get(digest)
+        if row is None and self._stale():
+            with self._lock, file_lock(self._lock_path, shared=True):
+                self._sync()
+            row = self._rows.get(digest)
+        if row is None:
+            return None
+        with self._lock:
+            return np.array(self.vectors.array[row])
+
+    def put(self, digests: Sequence[bytes], vectors: np.ndarray) -> None:
+        """Store float16 vectors; digests already present are skipped."""
+        with self._lock, file_lock(self._lock_path):
+            self._sync()
+            new = [row for row, digest in enumerate(digests) if digest not in self._rows]
+            if not new:
+                return
+            start = self._count
+            self.vectors.append(vectors[new])
+            self.vectors.flush()
+            self._keys.truncate(start * DIGEST_BYTES)
+            self._keys.write(b"".join(digests[row] for row in new))
+            self._keys.flush()
+            for offset, row in enumerate(new):
+                self._rows[digests[row]] = start + offset
+            self._count += len(new)
+
+    def _read_keys(self) -> None:
+        """Index the digests appended since the last read."""
+        if not self._keys_path.exists():
+            return
+        with self._keys_path.open("rb") as keys:
+            keys.seek(self._count * DIGEST_BYTES)
+            data = keys.read()
+        for row in range(len(data) // DIGEST_BYTES):
+            self._rows[data[row * DIGEST_BYTES:(row + 1) * DIGEST_BYTES]] = self._count + row
+        self._count += len(data) // DIGEST_BYTES
+
+    def _stale(self) -> bool:
+        """Whether another worker has stored vectors since the last read."""
+        try:
+            return self._keys_path.stat().st_size >= (self._count + 1) * DIGEST_BYTES
+        except FileNotFoundError:
+            return False
+
+    def _sync(self) -> None:
+        """Pick up vectors other workers stored; call with the file lock held."""
+        self._read_keys()
+        self.vectors.sync(self._count)
+
+
+class EmbeddingCache:
+    """
+    Read-through embedding cache in front of an `Embedder`.
+    Lookups go to the LRU, then the disk store. Misses are queued and sent
+    to the provider when `max_batch` texts are waiting or `batch_window_seconds`
+    after the first one, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        path: Optional[str],
+        lru_size: int,
+        batch_window_seconds: float,
+        max_batch: int,
+    ):
+        """
+        Args:
+            embedder: Provider for cache misses.
+            path: Directory of the disk store, or None for memory only.
+            lru_size: Vectors kept in process.
+            batch_window_seconds: How long a miss waits for others to batch with.
+            max_batch: Texts per provider call.
+        """
+        self.embedder = embedder
+        self.path = Path(path) if path else None
+        self.lru_size = lru_size
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch = max_batch
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._store: Optional[EmbeddingStore] = None
+        self._store_lock = threading.Lock()
+        # LRU misses waiting for the disk store, read in batches by one task
+        self._disk_pending: Dict[bytes, "asyncio.Future[Optional[np.ndarray]]"] = {}
+        self._disk_reader: Optional["asyncio.Task[None]"] = None
+        self._queue: List[Tuple[bytes, str]] = []
+        self._inflight: Dict[bytes, "asyncio.Future[np.ndarray]"] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def dim(self) -> int:
+        return self.embedder.dim
+
+    @property
+    def store(self) -> Optional[EmbeddingStore]:
+        """The disk store, opened on first use; blocks, so open it off the loop."""
+        if self._store is None and self.path is not None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = EmbeddingStore(self.path, self.dim)
+        return self._store
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return unit-length float32 embeddings, one row per text."""
+        result = np.empty((len(texts), self.dim), dtype=np.float32)
+        missed: List[Tuple[int, bytes, str]] = []
+        for row, text in enumerate(texts):
+            digest = content_digest(self.embedder.model, text)
+            vector = self._lru.get(digest)
+            if vector is not None:
+                self._lru.move_to_end(digest)
+                metrics_instance.embedding_cache_requests_total.labels(result="lru").inc()
+                result[row] = vector
+            else:
+                missed.append((row, digest, text))
+
+        stored: List[Optional[np.ndarray]] = [None] * len(missed)
+        if missed and self.path is not None:
+            stored = await asyncio.gather(
+                *(asyncio.shield(self._read_disk(digest)) for _, digest, _ in missed)
+            )
+        waiting: List[Tuple[int, "asyncio.Future[np.ndarray]"]] = []
+        for (row, digest, text), vector in zip(missed, stored):
+            if vector is not None:
+                metrics_instance.embedding_cache_requests_total.labels(result="disk").inc()
+                self._remember(digest, vector)
+                result[row] = vector
+            else:
+                metrics_instance.embedding_cache_requests_total.labels(result="miss").inc()
+                waiting.append((row, self._request(digest, text)))
+        if waiting:
+            # Shielded so one caller's cancellation does not fail the
+            # others waiting on the same texts
+            vectors = await asyncio.gather(*(asyncio.shield(future) for _, future in waiting))
+            for (row, _), vector in zip(waiting, vectors):
+                result[row] = vector
+        return result
+
+    def _read_disk(self, digest: bytes) -> "asyncio.Future[Optional[np.ndarray]]":
+        """Queue a disk store lookup, shared by concurrent requests for `digest`."""
+        future = self._disk_pending.get(digest)
+        if future is None:
+            future = self._disk_pending[digest] = asyncio.get_running_loop().create_future()
+            if self._disk_reader is None:
+                self._disk_reader = asyncio.ensure_future(self._read_disk_batches())
+        return future
+
+    async def _read_disk_batches(self) -> None:
+        """
+        Look up queued digests in the disk store until none are left. The
+        store takes a file lock shared with other workers, so reads run in
+        a thread, a batch at a time, rather than on the event loop.
+        """
+        try:
+            while self._disk_pending:
+                batch, self._disk_pending = self._disk_pending, {}
+                try:
+                    vectors = await asyncio.to_thread(self._read_store, list(batch))
+                except OSError:
+                    logger.warning("Embedding cache read failed", exc_info=True)
+                    vectors = [None] * len(batch)
+                for future, vector in zip(batch.values(), vectors):
+                    if not future.done():
+                        future.set_result(vector)
+        finally:
+            self._disk_reader = None
+
+    def _read_store(self, digests: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Stored vectors of `digests`, None where absent; runs in a thread."""
+        store = self.store
+        return [store.get(digest) for digest in digests]
+
+    def _write_store(self, digests: List[bytes], vectors: np.ndarray) -> None:
+        """Store a batch's vectors; runs in a thread."""
+        self.store.put(digests, vectors)
+
+    def _remember(self, digest: bytes, vector: np.ndarray) -> None:
+        self._lru[digest] = vector
+        self._lru.move_to_end(digest)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _request(self, digest: bytes, text: str) -> "asyncio.Future[np.ndarray]":
+        future = self._inflight.get(digest)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._inflight[digest] = loop.create_future()
+        self._queue.append((digest, text))
+        if len(self._queue) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_window_seconds, self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        """Send every queued text to the provider."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queue, self._queue = self._queue, []
+        for start in range(0, len(queue), self.max_batch):
+            task = asyncio.ensure_future(self._run_batch(queue[start:start + self.max_batch]))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[bytes, str]]) -> None:
+        digests = [digest for digest, _ in batch]
+        metrics_instance.embedding_batch_size.observe(len(batch))
+        try:
+            vectors = np.asarray(
+                await self.embedder.embed([text for _, text in batch]), dtype=np.float32
+            )
+            if vectors.shape != (len(batch), self.dim):
+                raise EmbeddingError(
+                    f"Expected {len(batch)} embeddings of dimension {self.dim}, "
+                    f"got shape {vectors.shape}"
+                )
+        except asyncio.CancelledError:
+            for digest in digests:
+                self._inflight.pop(digest).cancel()
+            raise
+        except Exception as exc:
+            for digest in digests:
+                self._inflight.pop(digest).set_exception(exc)
+            return
+
+        stored = normalize(vectors).astype(np.float16)
+        for digest, vector in zip(digests, stored):
+            self._remember(digest, vector)
+            self._inflight.pop(digest).set_result(vector)
+        if self.path is not None:
+            try:
+                await asyncio.to_thread(self._write_store, digests, stored)
+            except OSError:
+                logger.warning("Embedding cache write failed", exc_info=True)
+
+    async def close(self) -> None:
+        """Wait for in-flight batches and close the provider."""
+        if self._disk_reader is not None:
+            await asyncio.gather(self._disk_reader, return_exceptions=True)
+        if self._queue:
+            self._dispatch()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        await self.embedder.close()
+
+
+def create_embedder(provider: str) -> Embedder:
+    """Build the configured embedding provider."""
+    if provider == "fake":
+        return FakeEmbedder(settings.MEMORY_EMBEDDING_DIM)
+    if provider == "http":
+        return HTTPEmbedder(
+            settings.EMBEDDING_API_URL,
+            settings.EMBEDDING_MODEL,
+            settings.MEMORY_EMBEDDING_DIM,
+            api_key=settings.EMBEDDING_API_KEY,
+        )
+    raise ValueError(f"Unknown embedding provider: {provider}")
+
+
+# Global cache instance
+embedding_cache = EmbeddingCache(
+    embedder=create_embedder(settings.EMBEDDING_PROVIDER),
+    path=settings.EMBEDDING_CACHE_PATH,
+    lru_size=settings.EMBEDDING_CACHE_LRU_SIZE,
+    batch_window_seconds=settings.EMBEDDING_BATCH_WINDOW_SECONDS,
+    max_batch=settings.EMBEDDING_MAX_BATCH,
+)
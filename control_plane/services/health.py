@@ -0,0 +1,227 @@
+"""
+Dependency health probes.
+Probes for the database, the registry cache and the Data Plane run
+concurrently, each bounded by its own timeout. Results are cached for a
+short interval, and concurrent checks share one in-flight run, so
+frequent load balancer probes cost at most one round of queries per
+interval per worker. Readiness also folds in connection pool saturation
+and event loop lag, which are read locally without any I/O.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from control_plane.config import settings
+from control_plane.database import engine
+from control_plane.observability import metrics_instance
+from control_plane.services.registry_cache import registry_cache
+
+logger = logging.getLogger(__name__)
+
+Probe = Callable[[], Awaitable[None]]
+
+
+class ProbeResult:
+    """
+    Outcome of one probe: `ok`, `timeout` or `error`. Results are served on
+    the public health endpoint, so the exception behind an error is only
+    logged.
+    """
+
+    __slots__ = ("status", "latency_seconds")
+
+    def __init__(self, status: str, latency_seconds: float):
+        self.status = status
+        self.latency_seconds = latency_seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag as how late a periodic sleep wakes up.
+    A loop blocked by CPU-bound work or synchronous I/O wakes late, and
+    so serves every request on the worker late.
+    """
+
+    def __init__(self, interval_seconds: float, window: int = 8):
+        """
+        Args:
+            interval_seconds: Time between lag samples.
+            window: Samples the reported lag is the maximum of, so a stall
+                is still visible for a few intervals after it ends.
+        """
+        self.interval_seconds = interval_seconds
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def lag_seconds(self) -> float:
+        return max(self._samples, default=0.0)
+
+    async def run_forever(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            lag = max(0.0, time.monotonic() - expected)
+            self._samples.append(lag)
+            metrics_instance.event_loop_lag_seconds.set(lag)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def pool_saturation(db_engine: AsyncEngine) -> Optional[float]:
+    """Share of the pool's connections checked out, or None for unbounded pools."""
+    pool = db_engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return None
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    if capacity <= 0:
+        return None
+    return pool.checkedout() / capacity
+
+
+class HealthChecker:
+    """
+    Runs registered probes concurrently with a per-probe timeout and
+    caches the combined result for `cache_seconds`.
+    """
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        timeout_seconds: float,
+        cache_seconds: float,
+        loop_monitor: LoopLagMonitor,
+        db_engine: AsyncEngine = engine,
+    ):
+        """
+        Args:
+            probes: Probe coroutines by dependency name; each raises on failure.
+            timeout_seconds: Longest any one probe may take.
+            cache_seconds: How long a round of results is reused.
+            loop_monitor: Source of the event loop lag reading.
+            db_engine: Engine whose pool saturation readiness checks.
+        """
+        self.probes = probes
+        self.timeout_seconds = timeout_seconds
+        self.cache_seconds = cache_seconds
+        self.loop_monitor = loop_monitor
+        self.db_engine = db_engine
+        self._results: Dict[str, ProbeResult] = {}
+        self._checked_at = float("-inf")
+        self._inflight: Optional["asyncio.Task[Dict[str, ProbeResult]]"] = None
+
+    async def check(self) -> Dict[str, ProbeResult]:
+        """Probe results, from cache while they are fresh."""
+        if time.monotonic() - self._checked_at < self.cache_seconds:
+            return self._results
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._run_all())
+        # Shielded so a caller that gives up doesn't cancel the shared run
+        return await asyncio.shield(self._inflight)
+
+    async def readiness(self, critical: List[str]) -> List[str]:
+        """
+        Reasons this worker shouldn't receive traffic; empty when ready.
+        Only probes named in `critical` count against readiness.
+        """
+        results = await self.check()
+        reasons = [
+            f"{name} {results[name].status}"
+            for name in critical
+            if name in results and not results[name].ok
+        ]
+        saturation = pool_saturation(self.db_engine)
+        if saturation is not None and saturation >= settings.HEALTH_POOL_SATURATION_MAX:
+            reasons.append(f"database pool {saturation:.0%} checked out")
+        lag = self.loop_monitor.lag_seconds
+        if lag > settings.HEALTH_LOOP_LAG_MAX_SECONDS:
+            reasons.append(f"event loop lag {lag:.3f}s")
+        return reasons
+
+    async def _run_all(self) -> Dict[str, ProbeResult]:
+        try:
+            names = list(self.probes)
+            outcomes = await asyncio.gather(*(self._run(name) for name in names))
+            self._results = dict(zip(names, outcomes))
+            self._checked_at = time.monotonic()
+            return self._results
+        finally:
+            self._inflight = None
+
+    async def _run(self, name: str) -> ProbeResult:
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self.probes[name](), self.timeout_seconds)
+            result = ProbeResult("ok", time.monotonic() - start)
+        except asyncio.TimeoutError:
+            result = ProbeResult("timeout", time.monotonic() - start)
+        except Exception as exc:
+            logger.warning("Health probe %s failed: %r", name, exc)
+            result = ProbeResult("error", time.monotonic() - start)
+        metrics_instance.health_probe_up.labels(probe=name).set(1 if result.ok else 0)
+        metrics_instance.health_probe_seconds.labels(probe=name).observe(result.latency_seconds)
+        return result
+
+
+async def probe_database() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def probe_cache() -> None:
+    await registry_cache.backend.ping()
+
+
+class DataPlaneProbe:
+    """GETs the Data Plane's health endpoint over a small keep-alive client."""
+
+    def __init__(self):
+        self._client = None
+
+    async def __call__(self) -> None:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=2, max_keepalive_connections=2)
+            )
+        url = settings.DATA_PLANE_URL.rstrip("/") + settings.DATA_PLANE_HEALTH_PATH
+        response = await self._client.get(url, timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global monitor, probe and checker instances
+loop_lag_monitor = LoopLagMonitor(settings.HEALTH_LOOP_LAG_INTERVAL_SECONDS)
+data_plane_probe = DataPlaneProbe()
+health_checker = HealthChecker(
+    {"database": probe_database, "cache": probe_cache, "data_plane": data_plane_probe},
+    timeout_seconds=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+    cache_seconds=settings.HEALTH_CACHE_SECONDS,
+    loop_monitor=loop_lag_monitor,
+)
@@ -0,0 +1,53 @@
+"""
+Background job leader election.
+Workers sharing a data directory elect one of them to run jobs that act on
+shared state (expired leases, retention deletes), so the others don't
+repeat the same work against the database.
+"""
+
+import fcntl
+import logging
+from pathlib import Path
+from typing import IO, Optional
+
+from control_plane.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """
+    Leadership held as an exclusive `flock` on a file, for the life of the
+    process. The kernel drops the lock when the leader exits, and another
+    worker takes over on its next `is_leader()` call.
+    """
+
+    def __init__(self, path: Path):
+        """Elect through the lock file at `path`."""
+        self.path = path
+        self._file: Optional[IO[str]] = None
+
+    def is_leader(self) -> bool:
+        """Whether this worker leads, trying to take over if it doesn't."""
+        if self._file is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = self.path.open("a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return False
+        self._file = handle
+        logger.info("This worker now runs the shared background jobs")
+        return True
+
+    def release(self) -> None:
+        """Give up leadership, if held."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Global leader lock
+background_leader = LeaderLock(Path(settings.BACKGROUND_JOBS_LOCK_PATH))
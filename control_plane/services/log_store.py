@@ -0,0 +1,499 @@
+"""
+Segment-based log store for org logs.
+Backs `/orgs/{org_id}/logs`. Entries are appended to one segment file per
+org, UTC day and writer as zlib-compressed blocks of NDJSON lines. A
+sidecar index keeps a sparse entry per block (offset, timestamp range,
+level range, trace ids), so queries skip blocks that can't match and
+decompress one block at a time, keeping memory flat whatever the result
+size.
+
+Each process writes its own segment files, named after a writer id that
+is unique to the process, so workers sharing the directory never append
+to, or repair, a file another one is writing. Queries read every
+writer's segments, up to the last block in each index.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from control_plane.config import settings
+from control_plane.schemas import LogEntry
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+
+# Block header: compressed payload length
+_HEADER = struct.Struct(">I")
+_ORG_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class LogQueryError(ValueError):
+    """Raised for an invalid org id, filter or cursor."""
+
+
+def level_number(level: str) -> int:
+    """Severity of a level name; unknown levels rank as info."""
+    return LEVELS.get(level.lower(), LEVELS["info"])
+
+
+def _epoch_ms(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() * 1000)
+
+
+def encode_cursor(day: str, writer: str, offset: int, position: int) -> str:
+    """Encode a position in the log as an opaque cursor."""
+    raw = json.dumps([day, writer, offset, position], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int, int]:
+    """Decode a cursor from `encode_cursor`."""
+    try:
+        day, writer, offset, position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date.fromisoformat(day)
+        return day, str(writer), int(offset), int(position)
+    except (binascii.Error, ValueError, TypeError):
+        raise LogQueryError("Invalid cursor")
+
+
+def _segment_day(path: Path) -> str:
+    """The day of a `{day}_{writer}.seg` segment file."""
+    return path.stem.partition("_")[0]
+
+
+def _segment_writer(path: Path) -> str:
+    return path.stem.partition("_")[2]
+
+
+def _read_index(index_path: Path) -> List["BlockIndex"]:
+    """Blocks listed in an index file, up to the first torn line."""
+    blocks: List[BlockIndex] = []
+    try:
+        with index_path.open() as index_file:
+            for line in index_file:
+                try:
+                    blocks.append(BlockIndex.from_json(line))
+                except (ValueError, TypeError):
+                    break  # Torn write: the block after it is discarded too
+    except FileNotFoundError:
+        pass
+    return blocks
+
+
+class BlockIndex:
+    """Sparse index entry for one block."""
+
+    __slots__ = (
+        "offset",
+        "length",
+        "count",
+        "min_ts",
+        "max_ts",
+        "min_level",
+        "max_level",
+        "trace_ids",
+    )
+
+    def __init__(
+        self,
+        offset: int,
+        length: int,
+        count: int,
+        min_ts: int,
+        max_ts: int,
+        min_level: int,
+        max_level: int,
+        trace_ids: Iterable[str],
+    ):
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self.min_level = min_level
+        self.max_level = max_level
+        self.trace_ids = set(trace_ids)
+
+    def to_json(self) -> str:
+        """Serialize as one index file line."""
+        return json.dumps(
+            [
+                self.offset,
+                self.length,
+                self.count,
+                self.min_ts,
+                self.max_ts,
+                self.min_level,
+                self.max_level,
+                sorted(self.trace_ids),
+            ],
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "BlockIndex":
+        """Parse an index file line."""
+        return cls(*json.loads(line))
+
+
+class _Segment:
+    """
+    One org, day and writer this process owns: the segment file, its
+    index and the open block.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index_path = path.with_suffix(".idx")
+        self.blocks = _read_index(self.index_path)
+        self.size = 0
+        if self.blocks:
+            last = self.blocks[-1]
+            self.size = last.offset + _HEADER.size + last.length
+        if self.path.exists() and self.path.stat().st_size != self.size:
+            # A failed write between the segment and index leaves an
+            # unindexed tail; drop it so offsets stay consistent. Only this
+            # process writes under its writer id, so the file is its own
+            with self.path.open("r+b") as segment_file:
+                segment_file.truncate(self.size)
+            with self.index_path.open("w") as index_file:
+                index_file.writelines(block.to_json() + "\n" for block in self.blocks)
+        self._reset_buffer()
+
+    def _reset_buffer(self) -> None:
+        self.buffer: List[bytes] = []
+        self.buffer_bytes = 0
+        self.buffer_meta: Optional[BlockIndex] = None
+        self.opened_at = time.monotonic()
+
+    def add(self, line: bytes, timestamp: int, level: int, trace_id: Optional[str]) -> None:
+        meta = self.buffer_meta
+        if meta is None:
+            meta = self.buffer_meta = BlockIndex(
+                self.size, 0, 0, timestamp, timestamp, level, level, ()
+            )
+        meta.count += 1
+        meta.min_ts = min(meta.min_ts, timestamp)
+        meta.max_ts = max(meta.max_ts, timestamp)
+        meta.min_level = min(meta.min_level, level)
+        meta.max_level = max(meta.max_level, level)
+        if trace_id:
+            meta.trace_ids.add(trace_id)
+        self.buffer.append(line)
+        self.buffer_bytes += len(line)
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        payload = zlib.compress(b"".join(self.buffer), 6)
+        meta = self.buffer_meta
+        meta.length = len(payload)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as segment_file:
+            segment_file.write(_HEADER.pack(len(payload)) + payload)
+        with self.index_path.open("a") as index_file:
+            index_file.write(meta.to_json() + "\n")
+        self.blocks.append(meta)
+        self.size += _HEADER.size + len(payload)
+        self._reset_buffer()
+
+    def snapshot(self) -> Tuple[List[BlockIndex], Optional[BlockIndex], List[bytes]]:
+        """Flushed blocks plus a copy of the open block, for a reader."""
+        return list(self.blocks), self.buffer_meta, list(self.buffer)
+
+
+class LogStore:
+    """
+    Append-only, per org, day and writer log store.
+    Appends are buffered into an open block per segment, which is written
+    once it reaches `block_bytes` or is older than `flush_seconds`. Open
+    blocks are visible to this process's queries at the offset they will
+    be written at, so cursors stay valid across flushes; other workers'
+    entries show up once flushed.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        block_bytes: int,
+        flush_seconds: float,
+        writer_id: Optional[str] = None,
+    ):
+        """
+        Args:
+            root: Directory holding one subdirectory per org.
+            block_bytes: Uncompressed size at which a block is written.
+            flush_seconds: Maximum age of an unwritten block.
+            writer_id: Names this process's segment files; must be unique
+                among processes sharing `root`. Defaults to the pid plus
+                a random suffix, so a restart never reopens a file.
+        """
+        self.root = Path(root)
+        self.block_bytes = block_bytes
+        self.flush_seconds = flush_seconds
+        self.writer_id = writer_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._segments: Dict[Tuple[str, str], _Segment] = {}
+        # Appends, flushes and queries run on threadpool workers
+        self._lock = threading.Lock()
+
+    def _org_dir(self, org_id: str) -> Path:
+        if not _ORG_ID.match(org_id):
+            raise LogQueryError(f"Invalid org id: {org_id}")
+        return self.root / org_id
+
+    def _segment(self, org_id: str, day: str) -> _Segment:
+        segment = self._segments.get((org_id, day))
+        if segment is None:
+            segment = _Segment(self._org_dir(org_id) / f"{day}_{self.writer_id}.seg")
+            self._segments[(org_id, day)] = segment
+        return segment
+
+    def append(self, org_id: str, entries: Iterable[LogEntry]) -> int:
+        """Append entries to their days' segments."""
+        self._org_dir(org_id)
+        count = 0
+        with self._lock:
+            touched: Set[_Segment] = set()
+            for entry in entries:
+                timestamp = _epoch_ms(entry.timestamp)
+                day = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).date().isoformat()
+                segment = self._segment(org_id, day)
+                line = entry.model_dump_json().encode() + b"\n"
+                segment.add(line, timestamp, level_number(entry.level), entry.trace_id)
+                touched.add(segment)
+                count += 1
+            for segment in touched:
+                if segment.buffer_bytes >= self.block_bytes:
+                    segment.flush()
+        return count
+
+    def flush(self, max_age_seconds: float = 0.0) -> None:
+        """Write open blocks older than `max_age_seconds`."""
+        deadline = time.monotonic() - max_age_seconds
+        with self._lock:
+            for segment in self._segments.values():
+                if segment.buffer and segment.opened_at <= deadline:
+                    segment.flush()
+
+    async def run_flusher(self) -> None:
+        """Write aged open blocks forever; cancel the task to stop."""
+        while True:
+            try:
+                await asyncio.to_thread(self.flush, self.flush_seconds)
+            except OSError:
+                logger.warning("Log block flush failed", exc_info=True)
+            await asyncio.sleep(self.flush_seconds / 2)
+
+    def days(self, org_id: str) -> List[str]:
+        """Days with a segment for an org, oldest first."""
+        org_dir = self._org_dir(org_id)
+        days = {_segment_day(path) for path in org_dir.glob("*.seg")} if org_dir.exists() else set()
+        with self._lock:
+            days.update(day for (org, day) in self._segments if org == org_id)
+        return sorted(days)
+
+    def drop_before(self, day: str) -> int:
+        """
+        Delete every org's segments for days before `day` (ISO date);
+        returns how many were deleted. Whole files go, so retention never
+        rewrites a segment.
+        """
+        dropped = 0
+        with self._lock:
+            for key in [key for key in self._segments if key[1] < day]:
+                del self._segments[key]
+            if not self.root.exists():
+                return 0
+            for segment_path in self.root.glob("*/*.seg"):
+                if _segment_day(segment_path) < day:
+                    segment_path.with_suffix(".idx").unlink(missing_ok=True)
+                    segment_path.unlink(missing_ok=True)
+                    dropped += 1
+        return dropped
+
+    def oldest_day(self) -> Optional[str]:
+        """The oldest day with a segment in any org, or None."""
+        days = [_segment_day(path) for path in self.root.glob("*/*.seg")] if self.root.exists() else []
+        return min(days, default=None)
+
+    def query(
+        self,
+        org_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        level: Optional[str] = None,
+        text: Optional[str] = None,
+        trace_id: Optional[str] = None,
+        limit: int = 1000,
+        cursor: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        """
+        Stream matching entries as NDJSON, in append order per day and
+        writer.
+
+        Yields one chunk per block, then a final `{"next_cursor": ...}`
+        line; the cursor is null once the log is exhausted.
+        """
+        start_ms = _epoch_ms(start) if start else None
+        end_ms = _epoch_ms(end) if end else None
+        min_level = level_number(level) if level else None
+        if level and level.lower() not in LEVELS:
+            raise LogQueryError(f"Unknown level: {level}")
+        # Lines are compared in their serialized form first, so most
+        # non-matching lines are never parsed
+        needle = json.dumps(text, ensure_ascii=False)[1:-1].encode() if text else None
+        position = decode_cursor(cursor) if cursor else None
+
+        days = self.days(org_id)
+        if start is not None:
+            days = [day for day in days if day >= _day(start_ms)]
+        if end is not None:
+            days = [day for day in days if day <= _day(end_ms)]
+        if position is not None:
+            days = [day for day in days if day >= position[0]]
+        return self._scan(
+            org_id, days, start_ms, end_ms, min_level, text, needle, trace_id, limit, position
+        )
+
+    def _scan(
+        self,
+        org_id: str,
+        days: List[str],
+        start_ms: Optional[int],
+        end_ms: Optional[int],
+        min_level: Optional[int],
+        text: Optional[str],
+        needle: Optional[bytes],
+        trace_id: Optional[str],
+        limit: int,
+        position: Optional[Tuple[str, str, int, int]],
+    ) -> Iterator[bytes]:
+        remaining = limit
+        for day, writer, blocks, open_block, open_lines in self._segments_of(org_id, days):
+            resuming = position is not None and position[:2] == (day, writer)
+            if position is not None and (day, writer) < position[:2]:
+                continue
+            if open_block is not None:
+                blocks.append(open_block)
+            segment_file = None
+            try:
+                for block in blocks:
+                    skip = 0
+                    if resuming:
+                        if block.offset < position[2]:
+                            continue
+                        if block.offset == position[2]:
+                            skip = position[3]
+                    if (
+                        (start_ms is not None and block.max_ts < start_ms)
+                        or (end_ms is not None and block.min_ts > end_ms)
+                        or (min_level is not None and block.max_level < min_level)
+                        or (trace_id is not None and trace_id not in block.trace_ids)
+                    ):
+                        continue
+
+                    if block is open_block:
+                        lines = open_lines
+                    else:
+                        if segment_file is None:
+                            segment_file = (self._org_dir(org_id) / f"{day}_{writer}.seg").open("rb")
+                        segment_file.seek(block.offset + _HEADER.size)
+                        lines = zlib.decompress(segment_file.read(block.length)).splitlines(True)
+
+                    check_time = (start_ms is not None and block.min_ts < start_ms) or (
+                        end_ms is not None and block.max_ts > end_ms
+                    )
+                    check_level = min_level is not None and block.min_level < min_level
+                    matched: List[bytes] = []
+                    for index in range(skip, len(lines)):
+                        line = lines[index]
+                        if needle is not None and needle not in line:
+                            continue
+                        if check_time or check_level or text or trace_id:
+                            record = json.loads(line)
+                            if check_time:
+                                timestamp = _parse_ms(record["timestamp"])
+                                if (start_ms is not None and timestamp < start_ms) or (
+                                    end_ms is not None and timestamp > end_ms
+                                ):
+                                    continue
+                            if check_level and level_number(record["level"]) < min_level:
+                                continue
+                            if text and text not in record["message"]:
+                                continue
+                            if trace_id and record.get("trace_id") != trace_id:
+                                continue
+                        matched.append(line)
+                        remaining -= 1
+                        if not remaining:
+                            yield b"".join(matched)
+                            next_cursor = encode_cursor(day, writer, block.offset, index + 1)
+                            yield _cursor_line(next_cursor)
+                            return
+                    if matched:
+                        yield b"".join(matched)
+            finally:
+                if segment_file is not None:
+                    segment_file.close()
+        yield _cursor_line(None)
+
+    def _segments_of(
+        self, org_id: str, days: List[str]
+    ) -> Iterator[Tuple[str, str, List[BlockIndex], Optional[BlockIndex], List[bytes]]]:
+        """
+        Each day's segments by writer id: `(day, writer, blocks, open
+        block, open lines)`. Only this process's segments have an open
+        block; other writers' are read from their index as of now.
+        """
+        org_dir = self._org_dir(org_id)
+        for day in days:
+            writers = {_segment_writer(path) for path in org_dir.glob(f"{day}_*.seg")}
+            with self._lock:
+                own = self._segments.get((org_id, day))
+                snapshot = own.snapshot() if own is not None else None
+            if snapshot is not None:
+                writers.add(self.writer_id)
+            for writer in sorted(writers):
+                if writer == self.writer_id and snapshot is not None:
+                    yield (day, writer, *snapshot)
+                else:
+                    yield day, writer, _read_index(org_dir / f"{day}_{writer}.idx"), None, []
+
+
+def _parse_ms(timestamp: str) -> int:
+    # Pydantic writes UTC as "Z", which fromisoformat only accepts from 3.11
+    if timestamp.endswith("Z"):
+        timestamp = timestamp[:-1] + "+00:00"
+    return _epoch_ms(datetime.fromisoformat(timestamp))
+
+
+def _day(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).date().isoformat()
+
+
+def _cursor_line(cursor: Optional[str]) -> bytes:
+    return json.dumps({"next_cursor": cursor}).encode() + b"\n"
+
+
+# Global store instance
+log_store = LogStore(
+    root=settings.LOG_STORE_PATH,
+    block_bytes=settings.LOG_STORE_BLOCK_BYTES,
+    flush_seconds=settings.LOG_STORE_FLUSH_SECONDS,
+)
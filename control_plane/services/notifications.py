@@ -0,0 +1,334 @@
+"""
+Notification dispatcher.
+Approval events are fanned out to email, Slack and in-app channels off the
+request path. Each channel has its own bounded queue and a fixed number of
+workers, so its concurrency is capped and a slow channel never holds up the
+others. Failed deliveries are retried with exponential backoff and full
+jitter, without occupying a worker while they wait.
+
+Org events go only to that org's own Slack webhook and recipients; the
+global ones receive platform-level notifications, which have no org.
+"""
+
+import asyncio
+import logging
+import random
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from control_plane.config import settings
+from control_plane.observability import metrics_instance
+from control_plane.services.run_events import run_events
+
+if TYPE_CHECKING:
+    from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+
+class Notification:
+    """One event to deliver on every channel; platform-level events have no org."""
+
+    __slots__ = ("event", "org_id", "data", "run_id")
+
+    def __init__(
+        self,
+        event: str,
+        org_id: Optional[str],
+        data: Dict[str, Any],
+        run_id: Optional[str] = None,
+    ):
+        self.event = event
+        self.org_id = org_id
+        self.data = data
+        self.run_id = run_id
+
+
+class Sink:
+    """A delivery channel; `send` raises to have the delivery retried."""
+
+    def accepts(self, notification: Notification) -> bool:
+        """Whether the channel has somewhere to deliver `notification`."""
+        return True
+
+    async def send(self, notification: Notification) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class InAppSink(Sink):
+    """Publishes to the live run event stream shown in the dashboard."""
+
+    def accepts(self, notification: Notification) -> bool:
+        return notification.org_id is not None
+
+    async def send(self, notification: Notification) -> None:
+        run_events.publish(
+            notification.org_id, notification.run_id, notification.event, notification.data
+        )
+
+
+class SlackWebhookSink(Sink):
+    """
+    Posts a message to the Slack incoming webhook of the notification's
+    org, or to `platform_url` for platform-level notifications.
+    """
+
+    def __init__(self, org_urls: Dict[str, str], platform_url: str = "", timeout: float = 10.0):
+        self.org_urls = org_urls
+        self.platform_url = platform_url
+        self.timeout = timeout
+        self._client = None
+
+    def _url(self, notification: Notification) -> str:
+        if notification.org_id is None:
+            return self.platform_url
+        return self.org_urls.get(notification.org_id, "")
+
+    def accepts(self, notification: Notification) -> bool:
+        return bool(self._url(notification))
+
+    async def send(self, notification: Notification) -> None:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        text = f"*{notification.event}*"
+        if notification.org_id is not None:
+            text += f" ({notification.org_id})"
+        action = notification.data.get("action")
+        if action:
+            text += f": {action}"
+        response = await self._client.post(self._url(notification), json={"text": text})
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class EmailSink(Sink):
+    """
+    Sends mail over SMTP from a worker thread, to the notification's org's
+    recipients, or to `platform_recipients` for platform-level ones.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        org_recipients: Dict[str, List[str]],
+        platform_recipients: List[str],
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.org_recipients = org_recipients
+        self.platform_recipients = platform_recipients
+
+    def _recipients(self, notification: Notification) -> List[str]:
+        if notification.org_id is None:
+            return self.platform_recipients
+        return self.org_recipients.get(notification.org_id, [])
+
+    def accepts(self, notification: Notification) -> bool:
+        return bool(self._recipients(notification))
+
+    async def send(self, notification: Notification) -> None:
+        from email.message import EmailMessage
+
+        message = EmailMessage()
+        if notification.org_id is None:
+            message["Subject"] = notification.event
+        else:
+            message["Subject"] = f"[{notification.org_id}] {notification.event}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self._recipients(notification))
+        message.set_content(
+            "\n".join(f"{key}: {value}" for key, value in notification.data.items())
+        )
+        await asyncio.to_thread(self._deliver, message)
+
+    def _deliver(self, message: "EmailMessage") -> None:
+        import smtplib
+
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            smtp.starttls()
+            smtp.send_message(message)
+
+
+class StubSink(Sink):
+    """
+    Local sink for development and tests.
+    Records delivered notifications in `delivered`, after an optional
+    delay, and fails a `fail_rate` share of attempts.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.delivered: List[Notification] = []
+        self.attempts = 0
+
+    async def send(self, notification: Notification) -> None:
+        self.attempts += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            raise ConnectionError("Stub delivery failure")
+        self.delivered.append(notification)
+
+
+class _Channel:
+    __slots__ = ("sink", "queue", "workers")
+
+    def __init__(self, sink: Sink, queue_size: int):
+        self.sink = sink
+        self.queue: "asyncio.Queue[Tuple[Notification, int]]" = asyncio.Queue(queue_size)
+        self.workers: List["asyncio.Task[None]"] = []
+
+
+class NotificationDispatcher:
+    """
+    Fans notifications out to every configured channel that accepts them.
+    `submit` never waits: when a channel's queue is full, its copy is
+    dropped and counted.
+    """
+
+    def __init__(
+        self,
+        sinks: Dict[str, Sink],
+        concurrency: Dict[str, int],
+        queue_size: int,
+        max_attempts: int,
+        retry_base_seconds: float,
+        retry_max_seconds: float = 300.0,
+    ):
+        """
+        Args:
+            sinks: Sink per channel name.
+            concurrency: Workers per channel; channels not listed get one.
+            queue_size: Notifications buffered per channel.
+            max_attempts: Deliveries tried before giving up.
+            retry_base_seconds: Backoff before the first retry, doubled after.
+            retry_max_seconds: Cap on the backoff.
+        """
+        self.sinks = sinks
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._channels: Dict[str, _Channel] = {}
+
+    def start(self) -> None:
+        """Start every channel's workers on the running loop."""
+        for name, sink in self.sinks.items():
+            channel = self._channels[name] = _Channel(sink, self.queue_size)
+            for _ in range(max(self.concurrency.get(name, 1), 1)):
+                channel.workers.append(asyncio.create_task(self._work(name, channel)))
+
+    def submit(self, notification: Notification) -> int:
+        """Queue a notification on every channel that accepts it; returns how many queued it."""
+        accepted = 0
+        for name, channel in self._channels.items():
+            if channel.sink.accepts(notification) and self._enqueue(name, channel, notification, 1):
+                accepted += 1
+        return accepted
+
+    def _enqueue(self, name: str, channel: _Channel, notification: Notification, attempt: int) -> bool:
+        try:
+            channel.queue.put_nowait((notification, attempt))
+        except asyncio.QueueFull:
+            metrics_instance.notifications_total.labels(channel=name, result="dropped").inc()
+            return False
+        metrics_instance.notification_queue_depth.labels(channel=name).set(channel.queue.qsize())
+        return True
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Full jitter spreads out retries of a burst that failed together
+        ceiling = min(self.retry_base_seconds * 2 ** (attempt - 1), self.retry_max_seconds)
+        return random.uniform(0, ceiling)
+
+    async def _work(self, name: str, channel: _Channel) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            notification, attempt = await channel.queue.get()
+            metrics_instance.notification_queue_depth.labels(channel=name).set(channel.queue.qsize())
+            try:
+                await channel.sink.send(notification)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt >= self.max_attempts:
+                    metrics_instance.notifications_total.labels(channel=name, result="failed").inc()
+                    logger.warning(
+                        f"Giving up on {notification.event} to {name} after {attempt} attempts",
+                        exc_info=True,
+                    )
+                else:
+                    metrics_instance.notifications_total.labels(channel=name, result="retried").inc()
+                    loop.call_later(
+                        self._retry_delay(attempt), self._requeue, name, channel, notification, attempt + 1
+                    )
+            else:
+                metrics_instance.notifications_total.labels(channel=name, result="sent").inc()
+            finally:
+                channel.queue.task_done()
+
+    def _requeue(self, name: str, channel: _Channel, notification: Notification, attempt: int) -> None:
+        self._enqueue(name, channel, notification, attempt)
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for queued deliveries; retries still waiting are not awaited."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(channel.queue.join() for channel in self._channels.values())),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Drain briefly, then stop the workers and close the sinks."""
+        await self.drain(timeout)
+        for channel in self._channels.values():
+            for worker in channel.workers:
+                worker.cancel()
+            await asyncio.gather(*channel.workers, return_exceptions=True)
+            await channel.sink.close()
+        self._channels.clear()
+
+
+def create_sinks() -> Dict[str, Sink]:
+    """Build the configured channels; stubs replace them all when enabled."""
+    if settings.NOTIFICATIONS_STUB:
+        return {"in_app": StubSink(), "slack": StubSink(), "email": StubSink()}
+    sinks: Dict[str, Sink] = {"in_app": InAppSink()}
+    if settings.SLACK_WEBHOOK_URL or settings.ORG_SLACK_WEBHOOK_URLS:
+        sinks["slack"] = SlackWebhookSink(
+            settings.ORG_SLACK_WEBHOOK_URLS, settings.SLACK_WEBHOOK_URL
+        )
+    if settings.SMTP_HOST and (settings.APPROVAL_NOTIFY_EMAILS or settings.ORG_APPROVAL_NOTIFY_EMAILS):
+        sinks["email"] = EmailSink(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            settings.SMTP_FROM,
+            settings.ORG_APPROVAL_NOTIFY_EMAILS,
+            settings.APPROVAL_NOTIFY_EMAILS,
+        )
+    return sinks
+
+
+# Global dispatcher instance
+notification_dispatcher = NotificationDispatcher(
+    sinks=create_sinks(),
+    concurrency=settings.NOTIFICATION_CHANNEL_CONCURRENCY,
+    queue_size=settings.NOTIFICATION_QUEUE_SIZE,
+    max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+    retry_base_seconds=settings.NOTIFICATION_RETRY_BASE_SECONDS,
+)
@@ -0,0 +1,612 @@
+"""
+Transactional outbox and webhook dispatcher.
+State changes stage their events as `outbox_events` rows in the caller's
+session, so an event goes out exactly when its change commits. The
+dispatcher claims due rows in batches with `FOR UPDATE SKIP LOCKED` and
+posts them over one shared keep-alive `httpx.AsyncClient` pool, HTTP/2
+where the server offers it. Each destination has a concurrency cap and a
+circuit breaker; failed deliveries back off exponentially with full jitter.
+Deliveries of a batch run in the background while the next batch is
+claimed, so a slow destination only holds up its own rows.
+
+Webhook destinations must resolve to public addresses; they are checked
+when a subscription is created and again before delivery.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.database import async_session_maker
+from control_plane.models import OutboxEvent, WebhookSubscription
+from control_plane.observability import metrics_instance
+from control_plane.schemas import OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+# (org_id, event_type, data)
+Event = Tuple[str, str, Dict[str, Any]]
+
+# (id, destination, body, headers, attempts, data_plane) of a claimed row
+ClaimedRow = Tuple[int, str, str, Dict[str, str], int, bool]
+
+# How long a destination that passed `check_destination` is trusted
+DESTINATION_CHECK_SECONDS = 60.0
+
+
+class DeliveryError(ValueError):
+    """A destination refused or failed a delivery."""
+
+
+class CircuitOpenError(DeliveryError):
+    """A destination's breaker is open; the delivery was not attempted."""
+
+
+class DestinationNotAllowedError(DeliveryError):
+    """A destination resolves to a private, loopback or link-local address."""
+
+
+async def check_destination(url: str) -> None:
+    """
+    Raise `DestinationNotAllowedError` unless every address the host of
+    `url` resolves to is public, so webhooks can't reach internal services
+    or cloud metadata endpoints such as 169.254.169.254.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if not host:
+        raise DestinationNotAllowedError("Destination has no host")
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+            )
+        except (socket.gaierror, UnicodeError) as exc:
+            raise DestinationNotAllowedError(f"Cannot resolve {host}") from exc
+        addresses = [ipaddress.ip_address(info[4][0]) for info in infos]
+    for address in addresses:
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise DestinationNotAllowedError(f"{host} resolves to non-public address {address}")
+
+
+def data_plane_url() -> str:
+    """Where events for the Data Plane are posted."""
+    return settings.DATA_PLANE_URL.rstrip("/") + settings.DATA_PLANE_EVENTS_PATH
+
+
+def sign(secret: str, body: str) -> str:
+    """Signature header value for a body: `sha256=<hex HMAC>`."""
+    digest = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def _subscribed(subscription: WebhookSubscription, event_type: str) -> bool:
+    return not subscription.events or event_type in subscription.events
+
+
+async def add_events(
+    session: AsyncSession, events: Sequence[Event], data_plane: bool = False
+) -> int:
+    """
+    Stage events for delivery in the caller's transaction, one row per
+    subscribed webhook, plus one for the Data Plane when `data_plane` is
+    set. Nothing is sent unless the session commits. Returns rows staged.
+    """
+    if not events:
+        return 0
+    orgs = {org_id for org_id, _, _ in events}
+    result = await session.execute(
+        select(WebhookSubscription).where(WebhookSubscription.org_id.in_(orgs))
+    )
+    subscriptions: Dict[str, List[WebhookSubscription]] = {}
+    for subscription in result.scalars():
+        subscriptions.setdefault(subscription.org_id, []).append(subscription)
+
+    now = datetime.utcnow()
+    rows = []
+    for org_id, event_type, data in events:
+        event_id = f"evt-{uuid.uuid4().hex}"
+        body = json.dumps(
+            {
+                "event_id": event_id,
+                "event_type": event_type,
+                "timestamp": now.isoformat() + "Z",
+                "org_id": org_id,
+                "data": data,
+            },
+            separators=(",", ":"),
+            default=str,
+        )
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": event_id,
+            "X-Webhook-Event": event_type,
+        }
+        targets = [
+            (subscription.url, subscription.secret, False)
+            for subscription in subscriptions.get(org_id, ())
+            if _subscribed(subscription, event_type)
+        ]
+        if data_plane:
+            targets.append((data_plane_url(), None, True))
+        for url, secret, internal in targets:
+            rows.append({
+                "event_id": event_id,
+                "org_id": org_id,
+                "event_type": event_type,
+                "destination": url,
+                "data_plane": internal,
+                "body": body,
+                "headers": {**headers, "X-Webhook-Signature": sign(secret, body)} if secret else headers,
+                "status": OutboxStatus.PENDING.value,
+                "attempts": 0,
+                "available_at": now,
+                "created_at": now,
+            })
+    if rows:
+        await session.execute(insert(OutboxEvent), rows)
+    return len(rows)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. Once `reset_seconds` have
+    passed it lets a single probe through; the probe's outcome closes it or
+    keeps it open for another period.
+    """
+
+    __slots__ = ("threshold", "reset_seconds", "failures", "opened_at", "probing")
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self, now: float) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or now - self.opened_at < self.reset_seconds:
+            return False
+        self.probing = True
+        return True
+
+    def record(self, ok: bool, now: float) -> None:
+        self.probing = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = now
+
+
+class WebhookSender:
+    """
+    Posts pre-serialized bodies over a shared connection pool.
+    Destinations are keyed by origin, so every webhook of one receiver
+    shares its concurrency cap and breaker.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        destination_concurrency: int,
+        breaker_threshold: int,
+        breaker_reset_seconds: float,
+        http2: bool = True,
+    ):
+        """
+        Args:
+            max_connections: Connections held open across all destinations.
+            destination_concurrency: Requests in flight per destination.
+            breaker_threshold: Consecutive failures that open a breaker.
+            breaker_reset_seconds: How long a breaker stays open before a probe.
+            http2: Negotiate HTTP/2 when the `h2` package is installed.
+        """
+        self.max_connections = max_connections
+        self.destination_concurrency = destination_concurrency
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.http2 = http2
+        self._client = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Origin -> monotonic time its last passed destination check expires
+        self._checked: Dict[str, float] = {}
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("h2 is not installed; webhooks fall back to HTTP/1.1")
+                    http2 = False
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60,
+                ),
+            )
+        return self._client
+
+    def breaker(self, destination: str) -> CircuitBreaker:
+        origin = _origin(destination)
+        breaker = self._breakers.get(origin)
+        if breaker is None:
+            breaker = self._breakers[origin] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_reset_seconds
+            )
+        return breaker
+
+    def open_breakers(self) -> int:
+        return sum(breaker.is_open for breaker in self._breakers.values())
+
+    async def send(
+        self,
+        url: str,
+        body: str,
+        headers: Dict[str, str],
+        timeout: float,
+        public_only: bool = False,
+    ) -> None:
+        """
+        Deliver one body; raises `DeliveryError` unless the receiver answered
+        2xx. With `public_only`, the destination's addresses are checked
+        first, at most once per `DESTINATION_CHECK_SECONDS`.
+        """
+        origin = _origin(url)
+        if public_only:
+            now = time.monotonic()
+            if self._checked.get(origin, 0.0) <= now:
+                await check_destination(url)
+                self._checked[origin] = now + DESTINATION_CHECK_SECONDS
+        breaker = self.breaker(url)
+        semaphore = self._semaphores.get(origin)
+        if semaphore is None:
+            semaphore = self._semaphores[origin] = asyncio.Semaphore(self.destination_concurrency)
+        async with semaphore:
+            # Checked once a slot is free, so sends queued behind failures are shed
+            if not breaker.allow(time.monotonic()):
+                raise CircuitOpenError(f"Circuit open for {origin}")
+            ok = False
+            try:
+                response = await self._get_client().post(
+                    url, content=body, headers=headers, timeout=timeout
+                )
+                if not 200 <= response.status_code < 300:
+                    raise DeliveryError(f"{origin} answered {response.status_code}")
+                ok = True
+            except DeliveryError:
+                raise
+            except Exception as exc:
+                raise DeliveryError(f"{origin}: {exc!r}") from exc
+            finally:
+                breaker.record(ok, time.monotonic())
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class OutboxDispatcher:
+    """
+    Drains the outbox in batches. Rows are claimed by pushing their
+    `available_at` forward, so a dispatcher that dies mid-batch only delays
+    them; a receiver may see an event twice and should dedupe on `event_id`.
+
+    Claimed rows are delivered by background tasks, and their results are
+    written in bulk on the next pass. Claiming pauses at `max_in_flight`
+    deliveries, and rows for a destination already holding
+    `destination_backlog` of them are put back for later.
+    """
+
+    def __init__(
+        self,
+        sender: WebhookSender,
+        batch_size: int,
+        poll_seconds: float,
+        max_attempts: int,
+        retry_base_seconds: float,
+        retry_max_seconds: float,
+        claim_seconds: float,
+        max_in_flight: int,
+        destination_backlog: int,
+        allow_private: bool = False,
+        session_factory: Callable[[], AsyncSession] = async_session_maker,
+    ):
+        """
+        Args:
+            sender: Delivers the claimed rows.
+            batch_size: Rows claimed per transaction.
+            poll_seconds: Idle wait between polls when not woken.
+            max_attempts: Deliveries tried before a row is marked dead.
+            retry_base_seconds: Backoff before the first retry, doubled after.
+            retry_max_seconds: Cap on the backoff.
+            claim_seconds: How long a claimed row is hidden from other dispatchers.
+            max_in_flight: Deliveries pending at once across destinations.
+            destination_backlog: Deliveries pending at once per destination.
+            allow_private: Deliver webhooks to non-public addresses too.
+            session_factory: Opens a session per claim and per result write.
+        """
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.claim_seconds = claim_seconds
+        self.max_in_flight = max_in_flight
+        self.destination_backlog = destination_backlog
+        self.allow_private = allow_private
+        self.session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._in_flight: Set["asyncio.Task[None]"] = set()
+        # Origin -> its deliveries in flight
+        self._backlog: Dict[str, int] = {}
+        self._results: List[Dict[str, Any]] = []
+        self._saturated = False
+
+    def wake(self) -> None:
+        """Skip the poll wait; call after committing new events."""
+        self._wakeup.set()
+
+    def _retry_delay(self, attempt: int) -> float:
+        ceiling = min(self.retry_base_seconds * 2 ** (attempt - 1), self.retry_max_seconds)
+        return random.uniform(0, ceiling)
+
+    def _timeout(self, data_plane: bool) -> float:
+        if data_plane:
+            return settings.DATA_PLANE_TIMEOUT_SECONDS
+        return settings.WEBHOOK_TIMEOUT_SECONDS
+
+    def _public_only(self, data_plane: bool) -> bool:
+        # The Data Plane is an internal service by design; rows are tagged
+        # when staged, never recognized by their URL
+        return not (self.allow_private or data_plane)
+
+    async def _claim(self, limit: int) -> List[ClaimedRow]:
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(
+                        OutboxEvent.id,
+                        OutboxEvent.destination,
+                        OutboxEvent.body,
+                        OutboxEvent.headers,
+                        OutboxEvent.attempts,
+                        OutboxEvent.data_plane,
+                    )
+                    .where(
+                        OutboxEvent.status == OutboxStatus.PENDING.value,
+                        OutboxEvent.available_at <= now,
+                    )
+                    .order_by(OutboxEvent.available_at, OutboxEvent.id)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if rows:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([row[0] for row in rows]))
+                    .values(available_at=now + timedelta(seconds=self.claim_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+        return [tuple(row) for row in rows]
+
+    async def _deliver(self, row: ClaimedRow) -> Dict[str, Any]:
+        row_id, destination, body, headers, attempts, data_plane = row
+        started = time.perf_counter()
+        try:
+            await self.sender.send(
+                destination,
+                body,
+                headers,
+                self._timeout(data_plane),
+                public_only=self._public_only(data_plane),
+            )
+        except DestinationNotAllowedError as exc:
+            metrics_instance.outbox_deliveries_total.labels(result="refused").inc()
+            logger.warning(f"Refusing outbox row {row_id}: {exc}")
+            return self._result(row_id, OutboxStatus.DEAD, attempts, 0, str(exc))
+        except CircuitOpenError:
+            # Not an attempt; look again once the breaker may let a probe through
+            metrics_instance.outbox_deliveries_total.labels(result="deferred").inc()
+            return self._result(
+                row_id, OutboxStatus.PENDING, attempts, self.sender.breaker_reset_seconds, None
+            )
+        except DeliveryError as exc:
+            attempt = attempts + 1
+            if attempt >= self.max_attempts:
+                metrics_instance.outbox_deliveries_total.labels(result="dead").inc()
+                logger.warning(f"Giving up on outbox row {row_id} after {attempt} attempts: {exc}")
+                return self._result(row_id, OutboxStatus.DEAD, attempt, 0, str(exc))
+            metrics_instance.outbox_deliveries_total.labels(result="retried").inc()
+            return self._result(
+                row_id, OutboxStatus.PENDING, attempt, self._retry_delay(attempt), str(exc)
+            )
+        finally:
+            metrics_instance.outbox_delivery_seconds.observe(time.perf_counter() - started)
+        metrics_instance.outbox_deliveries_total.labels(result="delivered").inc()
+        return self._result(row_id, OutboxStatus.DELIVERED, attempts + 1, 0, None)
+
+    @staticmethod
+    def _result(
+        row_id: int, status: OutboxStatus, attempts: int, delay: float, error: Optional[str]
+    ) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {
+            "id": row_id,
+            "status": status.value,
+            "attempts": attempts,
+            "available_at": now + timedelta(seconds=delay),
+            "last_error": error,
+            "delivered_at": now if status == OutboxStatus.DELIVERED else None,
+        }
+
+    async def _deliver_claimed(self, row: ClaimedRow, origin: str) -> None:
+        try:
+            # Not `self._results.append(await ...)`: the list may be swapped
+            # out by `_write_results` while the delivery is pending
+            result = await self._deliver(row)
+            self._results.append(result)
+        finally:
+            count = self._backlog[origin] - 1
+            if count:
+                self._backlog[origin] = count
+            else:
+                del self._backlog[origin]
+            # Resume claiming once a batch worth of capacity is free; this
+            # task is still counted until it returns
+            if self._saturated and len(self._in_flight) - 1 <= self.max_in_flight - self.batch_size:
+                self._saturated = False
+                self._wakeup.set()
+
+    async def _write_results(self) -> None:
+        """Write the outcomes of finished deliveries in one statement."""
+        if not self._results:
+            return
+        results, self._results = self._results, []
+        try:
+            async with self.session_factory() as session:
+                # ORM bulk UPDATE by primary key: one executemany for the batch
+                await session.execute(update(OutboxEvent), results)
+                await session.commit()
+        except BaseException:
+            self._results[:0] = results
+            raise
+        metrics_instance.outbox_breakers_open.set(self.sender.open_breakers())
+
+    async def run_once(self) -> int:
+        """
+        Write the results of finished deliveries, then claim a batch and
+        start delivering it without waiting; returns the rows claimed.
+        """
+        await self._write_results()
+        limit = min(self.batch_size, self.max_in_flight - len(self._in_flight))
+        if limit < self.batch_size:
+            self._saturated = True
+        if limit <= 0:
+            return 0
+        rows = await self._claim(limit)
+        for row in rows:
+            origin = _origin(row[1])
+            backlog = self._backlog.get(origin, 0)
+            if backlog >= self.destination_backlog:
+                # A slow destination keeps its backlog in the table, not in memory
+                metrics_instance.outbox_deliveries_total.labels(result="deferred").inc()
+                self._results.append(
+                    self._result(row[0], OutboxStatus.PENDING, row[4], self.retry_base_seconds, None)
+                )
+                continue
+            self._backlog[origin] = backlog + 1
+            task = asyncio.create_task(self._deliver_claimed(row, origin))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        return len(rows)
+
+    async def drain(self) -> None:
+        """Wait for deliveries in flight and write their results."""
+        while self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self._write_results()
+
+    async def run_forever(self) -> None:
+        """Drain continuously, waiting for a wakeup or the poll interval when idle."""
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        """Start draining on the running loop."""
+        self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """
+        Stop draining and close the connection pool. Results of finished
+        deliveries are written; rows still in flight are retried later.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        try:
+            await self._write_results()
+        except Exception:
+            logger.warning("Writing outbox results on shutdown failed", exc_info=True)
+        await self.sender.close()
+
+
+# Global dispatcher instance
+outbox_dispatcher = OutboxDispatcher(
+    sender=WebhookSender(
+        max_connections=settings.OUTBOX_MAX_CONNECTIONS,
+        destination_concurrency=settings.OUTBOX_DESTINATION_CONCURRENCY,
+        breaker_threshold=settings.OUTBOX_BREAKER_THRESHOLD,
+        breaker_reset_seconds=settings.OUTBOX_BREAKER_RESET_SECONDS,
+        http2=settings.OUTBOX_HTTP2,
+    ),
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_seconds=settings.OUTBOX_POLL_SECONDS,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    retry_base_seconds=settings.OUTBOX_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.OUTBOX_RETRY_MAX_SECONDS,
+    claim_seconds=settings.OUTBOX_CLAIM_SECONDS,
+    max_in_flight=settings.OUTBOX_MAX_IN_FLIGHT,
+    destination_backlog=settings.OUTBOX_DESTINATION_BACKLOG,
+    allow_private=settings.WEBHOOK_ALLOW_PRIVATE_DESTINATIONS,
+)
@@ -0,0 +1,353 @@
+"""
+Per-tenant rate limiting.
+Each authenticated request takes a token from three buckets: its org's,
+its user's, and its org's bucket for the route class it falls in. Buckets
+refill lazily when touched, so a check is a few dict lookups and float
+operations. Each org also has a cap on its in-flight requests.
+
+`MemoryBackend` keeps buckets per worker. `RedisBackend` shares them
+across workers through a script that checks and takes every bucket of a
+request atomically. In-flight caps are always per worker, since the event
+loop and connection pool they protect are.
+"""
+
+import logging
+import math
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from control_plane.config import settings
+from control_plane.observability import metrics_instance
+
+logger = logging.getLogger(__name__)
+
+
+class Limit:
+    """A token bucket rate: `rate` tokens per second, holding up to `burst`."""
+
+    __slots__ = ("name", "rate", "burst")
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+    @classmethod
+    def from_setting(cls, name: str, setting: Sequence[float]) -> "Limit":
+        """Build a limit from a `[rate, burst]` setting."""
+        rate, burst = setting
+        return cls(name, float(rate), float(burst))
+
+
+# One bucket check: the bucket's key and the limit it refills at
+Check = Tuple[str, Limit]
+
+
+class RateLimitBackend:
+    """Storage for token buckets."""
+
+    async def acquire(self, checks: Sequence[Check]) -> Tuple[float, Optional[Limit]]:
+        """
+        Take a token from every bucket, or from none if any is empty.
+        Returns `(0.0, None)` on success, otherwise the seconds until the
+        emptiest bucket has a token again and that bucket's limit.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release any connections."""
+
+
+class TokenBucket:
+    """Tokens left in one bucket as of `updated_at`."""
+
+    __slots__ = ("tokens", "updated_at", "limit")
+
+    def __init__(self, limit: Limit, now: float):
+        self.tokens = limit.burst
+        self.updated_at = now
+        self.limit = limit
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Buckets in a dict, refilled on access. When it reaches `max_keys`,
+    buckets that have refilled completely are dropped, since a new bucket
+    starts full anyway.
+    """
+
+    def __init__(self, max_keys: int):
+        """Initialize an empty table."""
+        self.max_keys = max_keys
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, checks: Sequence[Check]) -> Tuple[float, Optional[Limit]]:
+        now = time.monotonic()
+        buckets = self._buckets
+        wait, limiting = 0.0, None
+        touched: List[TokenBucket] = []
+        for key, limit in checks:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self.max_keys:
+                    self._sweep(now)
+                bucket = buckets[key] = TokenBucket(limit, now)
+            else:
+                tokens = bucket.tokens + (now - bucket.updated_at) * limit.rate
+                bucket.tokens = tokens if tokens < limit.burst else limit.burst
+                bucket.updated_at = now
+            if bucket.tokens < 1.0:
+                needed = (1.0 - bucket.tokens) / limit.rate
+                if needed > wait:
+                    wait, limiting = needed, limit
+            touched.append(bucket)
+        if limiting is None:
+            for bucket in touched:
+                bucket.tokens -= 1.0
+        return wait, limiting
+
+    def _sweep(self, now: float) -> None:
+        """Drop full buckets, then the oldest ones if the table is still near its bound."""
+        buckets = self._buckets
+        for key in [
+            key
+            for key, bucket in buckets.items()
+            if bucket.tokens + (now - bucket.updated_at) * bucket.limit.rate >= bucket.limit.burst
+        ]:
+            del buckets[key]
+        excess = len(buckets) - self.max_keys * 9 // 10
+        if excess > 0:
+            for key in list(buckets)[:excess]:
+                del buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# KEYS are bucket keys; ARGV is the time, then each key's rate and burst.
+# Returns the 1-based index of the limiting key (0 if tokens were taken)
+# and the wait as a string, since Lua numbers are returned as integers.
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local wait, limiting = 0, 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+  local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  local state = redis.call("HMGET", key, "tokens", "updated_at")
+  local left = tonumber(state[1]) or burst
+  local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+  left = math.min(burst, left + elapsed * rate)
+  tokens[i] = left
+  if left < 1 and (1 - left) / rate > wait then
+    wait, limiting = (1 - left) / rate, i
+  end
+end
+for i, key in ipairs(KEYS) do
+  local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  local left = tokens[i]
+  if limiting == 0 then
+    left = left - 1
+  end
+  redis.call("HSET", key, "tokens", left, "updated_at", now)
+  redis.call("PEXPIRE", key, math.ceil(burst / rate * 1000) + 1000)
+end
+return {limiting, tostring(wait)}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Buckets shared by every worker, in hashes on a `redis.asyncio`
+    client. Each request costs one script call.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        """Initialize the backend with a connected client."""
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(ACQUIRE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        """Create a backend using `redis.asyncio`."""
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        return cls(redis.from_url(url))
+
+    async def acquire(self, checks: Sequence[Check]) -> Tuple[float, Optional[Limit]]:
+        args: List[float] = [time.time()]
+        for _, limit in checks:
+            args += (limit.rate, limit.burst)
+        limiting, wait = await self._script(
+            keys=[self.prefix + key for key, _ in checks], args=args
+        )
+        if not limiting:
+            return 0.0, None
+        return float(wait), checks[int(limiting) - 1][1]
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class RouteClassifier:
+    """
+    Maps requests to route classes with one precompiled regex per HTTP
+    method; requests no pattern matches are `read` or `write` by method.
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[Tuple[str, str]]]):
+        """
+        Args:
+            patterns: `(route class, path regex)` pairs by HTTP method, or
+                `*` for every method; earlier pairs win.
+        """
+        shared = list(patterns.get("*", ()))
+        methods = set(patterns) - {"*"}
+        self._patterns = {
+            method: self._compile(list(patterns[method]) + shared) for method in methods
+        }
+        self._default = self._compile(shared)
+
+    @staticmethod
+    def _compile(pairs: List[Tuple[str, str]]) -> Optional["re.Pattern[str]"]:
+        if not pairs:
+            return None
+        # Group names must be unique, so each alternative gets an index
+        # that `classify` maps back to its class
+        return re.compile(
+            "|".join(f"(?P<c{index}_{name}>{pattern})" for index, (name, pattern) in enumerate(pairs))
+        )
+
+    def classify(self, method: str, path: str) -> str:
+        pattern = self._patterns.get(method, self._default)
+        if pattern is not None:
+            match = pattern.fullmatch(path)
+            if match is not None:
+                return match.lastgroup.split("_", 1)[1]
+        return "read" if method in ("GET", "HEAD", "OPTIONS") else "write"
+
+
+class RateLimiter:
+    """Admits requests against an org's, a user's and a route class's limits."""
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        org_limit: Limit,
+        user_limit: Limit,
+        class_limits: Dict[str, Limit],
+        max_in_flight: int,
+        in_flight_exempt: Iterable[str] = (),
+    ):
+        """
+        Args:
+            backend: Bucket storage.
+            org_limit: Rate of each org across all its requests.
+            user_limit: Rate of each user.
+            class_limits: Rate of each org's requests per route class;
+                classes without one only count against the other limits.
+            max_in_flight: Most requests of one org handled at once on
+                this worker.
+            in_flight_exempt: Route classes of long-lived requests that
+                don't count as in flight.
+        """
+        self.backend = backend
+        self.org_limit = org_limit
+        self.user_limit = user_limit
+        self.class_limits = class_limits
+        self.max_in_flight = max_in_flight
+        self.in_flight_exempt = frozenset(in_flight_exempt)
+        self._in_flight: Dict[str, int] = {}
+
+    async def admit(
+        self, org_id: Optional[str], user_id: Optional[str], route_class: str
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Admit a request, or return the name of the limit it hit and the
+        seconds to wait before retrying. An admitted request of an org
+        counts as in flight until `release(org_id, route_class)`.
+        """
+        tracked = org_id is not None and route_class not in self.in_flight_exempt
+        if tracked and self._in_flight.get(org_id, 0) >= self.max_in_flight:
+            metrics_instance.rate_limit_rejected_total.labels("in_flight", route_class).inc()
+            return "in_flight", 1.0
+
+        checks: List[Check] = []
+        if org_id is not None:
+            checks.append((f"org:{org_id}", self.org_limit))
+            class_limit = self.class_limits.get(route_class)
+            if class_limit is not None:
+                checks.append((f"class:{org_id}:{route_class}", class_limit))
+        if user_id is not None:
+            checks.append((f"user:{user_id}", self.user_limit))
+        if checks:
+            try:
+                wait, limiting = await self.backend.acquire(checks)
+            except Exception as exc:
+                # Fail open: an unreachable backend mustn't take the API down
+                metrics_instance.rate_limit_backend_errors_total.inc()
+                logger.warning("Rate limit backend failed: %r", exc)
+                wait, limiting = 0.0, None
+            if limiting is not None:
+                metrics_instance.rate_limit_rejected_total.labels(limiting.name, route_class).inc()
+                return limiting.name, wait
+
+        if tracked:
+            self._in_flight[org_id] = self._in_flight.get(org_id, 0) + 1
+        return None
+
+    def release(self, org_id: Optional[str], route_class: str) -> None:
+        """End an admitted request's in-flight count."""
+        if org_id is None or route_class in self.in_flight_exempt:
+            return
+        count = self._in_flight[org_id] - 1
+        if count:
+            self._in_flight[org_id] = count
+        else:
+            del self._in_flight[org_id]
+
+    def in_flight(self, org_id: str) -> int:
+        return self._in_flight.get(org_id, 0)
+
+
+def retry_after_header(wait_seconds: float) -> str:
+    """Retry-After value for a wait: whole seconds, at least 1."""
+    return str(max(1, math.ceil(wait_seconds)))
+
+
+def create_backend() -> RateLimitBackend:
+    """Build the backend selected by `RATE_LIMIT_BACKEND`."""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend.from_url(settings.REDIS_URL)
+    return MemoryBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+# Data Plane workers poll and report on /tasks and run completion; event
+# streams and task long polls stay open and so don't count as in flight
+route_classifier = RouteClassifier(
+    {
+        "*": [
+            ("stream", r"/api/v1/orgs/[^/]+/runs/events|/api/v1/tasks/next"),
+            ("worker", r"/api/v1/tasks/.*|/api/v1/runs/complete|/api/v1/agents/[^/]+/runs/[^/]+/complete"),
+        ],
+        "POST": [
+            ("ingest", r"/api/v1/orgs/[^/]+/(?:metrics|logs|memory/[^/]+)"),
+        ],
+    }
+)
+
+# Global limiter instance
+rate_limiter = RateLimiter(
+    create_backend(),
+    org_limit=Limit.from_setting("org", settings.RATE_LIMIT_ORG),
+    user_limit=Limit.from_setting("user", settings.RATE_LIMIT_USER),
+    class_limits={
+        name: Limit.from_setting("route_class", setting)
+        for name, setting in settings.RATE_LIMIT_ROUTE_CLASSES.items()
+    },
+    max_in_flight=settings.RATE_LIMIT_ORG_MAX_IN_FLIGHT,
+    in_flight_exempt=["stream"],
+)
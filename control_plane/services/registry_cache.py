@@ -0,0 +1,312 @@
+"""
+Read-through cache for agent registry reads.
+Serves `GET /agents` and `GET /agents/{agent_id}` without a database query
+while an entry is fresh, and coalesces concurrent misses into one load.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.database import session_router
+from control_plane.observability import metrics_instance
+from control_plane.responses import content_version
+
+logger = logging.getLogger(__name__)
+
+# Loads a JSON-compatible value from the database
+Loader = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class CacheBackend:
+    """
+    Storage for cache entries.
+    Values are JSON-compatible; entries may be dropped at any time after
+    `ttl_seconds`.
+    """
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return a stored value, or None."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """Store a value for at least `ttl_seconds`."""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Remove a value."""
+        raise NotImplementedError
+
+    async def counter(self, key: str) -> int:
+        """Return a counter's value, 0 if it was never incremented."""
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        """Atomically increment a counter and return its new value."""
+        raise NotImplementedError
+
+    async def ping(self) -> None:
+        """Raise if the backend can't be reached."""
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Bounded in-process LRU.
+    Each worker process has its own copy, so invalidation only reaches the
+    worker that handled the write; use `RedisBackend` with several workers.
+    """
+
+    def __init__(self, max_entries: int):
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend for any client speaking the `redis.asyncio` command API
+    (`get`, `set(ex=...)`, `delete`, `incr`, `ping`), including in-process
+    fakes. Values are stored as JSON.
+    """
+
+    def __init__(self, client: Any):
+        """Initialize the backend with a connected client."""
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        """Create a backend using `redis.asyncio`."""
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "AGENT_REGISTRY_CACHE_BACKEND=redis requires the 'redis' package"
+            ) from exc
+        return cls(redis.from_url(url))
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        await self.client.set(
+            key, json.dumps(value, separators=(",", ":")), ex=max(1, int(ttl_seconds))
+        )
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def counter(self, key: str) -> int:
+        return int(await self.client.get(key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(key))
+
+    async def ping(self) -> None:
+        await self.client.ping()
+
+
+class RegistryCache:
+    """
+    Read-through cache with single-flight loading and stale-while-revalidate.
+
+    An entry is fresh for `ttl_seconds`. For a further `stale_seconds` it
+    is still served, while one background task reloads it. Concurrent
+    misses on the same key share a single load. Listing keys carry a
+    version number, so one increment invalidates every cached page.
+    Each entry also records a version of its value, which responses use
+    as their ETag.
+
+    Loads may read from a replica up to `replica_lag_seconds` behind the
+    primary, so loads started that soon after an invalidation on this
+    worker are cached only for that long.
+    """
+
+    LISTINGS_VERSION_KEY = "registry:listings:version"
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl_seconds: float,
+        stale_seconds: float,
+        session_factory: Callable[[], AsyncSession] = session_router.read_session,
+        replica_lag_seconds: float = 0.0,
+    ):
+        """
+        Args:
+            backend: Entry storage.
+            ttl_seconds: How long an entry is served without reloading.
+            stale_seconds: How long an expired entry may still be served
+                while it is refreshed in the background.
+            session_factory: Opens a session for each load. Loads are
+                shared by concurrent requests and may outlive the one
+                that started them, so they never use a request's session.
+            replica_lag_seconds: Most replication lag loads may see.
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.session_factory = session_factory
+        self.replica_lag_seconds = replica_lag_seconds
+        self._invalidated_at = float("-inf")
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    def agent_key(self, agent_id: str) -> str:
+        """Cache key of an agent's detail view."""
+        return f"registry:agent:{agent_id}"
+
+    async def listing_key(self, **params: Any) -> str:
+        """Cache key of one listing page under the current listings version."""
+        version = await self.backend.counter(self.LISTINGS_VERSION_KEY)
+        query = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"registry:listings:{version}:{query}"
+
+    async def get_or_load(
+        self,
+        route: str,
+        key: str,
+        load: Loader,
+    ) -> Any:
+        """
+        Return the cached value for `key`, loading it with `load(session)`
+        on a miss. `None` results are not cached.
+        """
+        value, _ = await self.get_or_load_versioned(route, key, load)
+        return value
+
+    async def get_or_load_versioned(
+        self,
+        route: str,
+        key: str,
+        load: Loader,
+    ) -> Tuple[Any, Optional[str]]:
+        """`get_or_load`, also returning the version of the value."""
+        entry = await self.backend.get(key)
+        if entry is not None:
+            if entry["fresh_until"] > time.time():
+                metrics_instance.registry_cache_requests_total.labels(route, "hit").inc()
+            else:
+                metrics_instance.registry_cache_requests_total.labels(route, "stale").inc()
+                if key not in self._inflight:
+                    self._start_load(key, self._refresh(load))
+            # Entries written before versions were recorded have none
+            return entry["value"], entry.get("version")
+
+        metrics_instance.registry_cache_requests_total.labels(route, "miss").inc()
+        task = self._inflight.get(key) or self._start_load(key, self._load(load))
+        # Shielded so a cancelled request doesn't fail the other waiters
+        return await asyncio.shield(task)
+
+    async def invalidate_agent(self, agent_id: str) -> None:
+        """Drop an agent's detail entry and every listing page."""
+        key = self.agent_key(agent_id)
+        # A load started before the write must not store its result
+        self._inflight.pop(key, None)
+        self._invalidated_at = time.monotonic()
+        await self.backend.delete(key)
+        await self.backend.incr(self.LISTINGS_VERSION_KEY)
+
+    def _start_load(
+        self, key: str, load: Awaitable[Any]
+    ) -> "asyncio.Task[Tuple[Any, Optional[str]]]":
+        """Run a load as the single in-flight load for `key`."""
+
+        async def run() -> Tuple[Any, Optional[str]]:
+            current = asyncio.current_task()
+            ttl_seconds, stale_seconds = self.ttl_seconds, self.stale_seconds
+            if time.monotonic() - self._invalidated_at < self.replica_lag_seconds:
+                # May read a replica that hasn't caught up with the write yet
+                ttl_seconds, stale_seconds = self.replica_lag_seconds, 0
+            try:
+                value = await load
+                if value is None:
+                    return None, None
+                version = content_version(to_json(value))
+                if self._inflight.get(key) is current:
+                    await self.backend.set(
+                        key,
+                        {
+                            "value": value,
+                            "fresh_until": time.time() + ttl_seconds,
+                            "version": version,
+                        },
+                        ttl_seconds + stale_seconds,
+                    )
+                return value, version
+            finally:
+                if self._inflight.get(key) is current:
+                    del self._inflight[key]
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, load: Loader) -> Any:
+        """Run a load with a session of its own."""
+        async with self.session_factory() as session:
+            return await load(session)
+
+    async def _refresh(self, load: Loader) -> Any:
+        """Reload a stale entry, keeping it on failure."""
+        try:
+            return await self._load(load)
+        except Exception:
+            # Keep serving the stale entry; the next request retries
+            logger.warning("Registry cache refresh failed", exc_info=True)
+            return None
+
+
+def create_backend() -> CacheBackend:
+    """Build the backend selected by `AGENT_REGISTRY_CACHE_BACKEND`."""
+    if settings.AGENT_REGISTRY_CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(settings.REDIS_URL)
+    return MemoryBackend(max_entries=settings.AGENT_REGISTRY_CACHE_MAX_ENTRIES)
+
+
+# Global cache instance
+registry_cache = RegistryCache(
+    create_backend(),
+    ttl_seconds=settings.AGENT_REGISTRY_CACHE_TTL_SECONDS,
+    stale_seconds=settings.AGENT_REGISTRY_CACHE_STALE_SECONDS,
+    replica_lag_seconds=(
+        settings.DATABASE_REPLICA_MAX_LAG_SECONDS if settings.DATABASE_REPLICA_URLS else 0.0
+    ),
+)
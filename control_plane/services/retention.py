@@ -0,0 +1,320 @@
+"""
+Retention engine.
+Enforces the retention windows for task and episode memories, run
+records, logs and metrics from a background task in the app lifespan.
+
+- `TableRetention` deletes expired rows in bounded chunks found by a
+  primary-key range scan, never one large `DELETE`. Chunks are rate
+  limited, and each commits a checkpoint, so a pass resumes where it
+  stopped after a restart.
+- `PartitionRetention` drops whole time partitions (log segments, memory
+  index partitions, metric samples), so no data is rewritten.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.database import async_session_maker, upsert_insert
+from control_plane.models import AgentRun, OutboxEvent, RetentionCheckpoint, Task
+from control_plane.observability import metrics_instance
+from control_plane.schemas import OutboxStatus, TaskStatus
+from control_plane.services.leader import LeaderLock, background_leader
+from control_plane.services.log_store import log_store
+from control_plane.services.timeseries import timeseries_store
+from control_plane.services.vector_index import memory_indexes
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """Removes one kind of data once it is older than `retention`."""
+
+    # Whether the data is shared by every worker, so one of them runs the job
+    shared = False
+
+    def __init__(self, name: str, retention: timedelta):
+        self.name = name
+        self.retention = retention
+
+    def cutoff(self) -> datetime:
+        """Naive UTC time before which data has expired."""
+        return datetime.utcnow() - self.retention
+
+    async def run(self) -> int:
+        """Remove everything expired; returns how many rows or partitions went."""
+        raise NotImplementedError
+
+    def _report(
+        self, deleted: int, elapsed: float, oldest: Optional[datetime], cutoff: datetime
+    ) -> None:
+        """
+        Export a pass's progress. Lag is how long the data at `oldest`,
+        the oldest remaining when the pass started, had been expired.
+        """
+        metrics_instance.retention_deleted_total.labels(job=self.name).inc(deleted)
+        metrics_instance.retention_rows_per_second.labels(job=self.name).set(
+            deleted / elapsed if elapsed > 0 else 0.0
+        )
+        lag = (cutoff - oldest).total_seconds() if oldest is not None else 0.0
+        metrics_instance.retention_lag_seconds.labels(job=self.name).set(max(lag, 0.0))
+
+
+class TableRetention(RetentionJob):
+    """
+    Chunked deletes from a table with an increasing integer `id`.
+    Rows are visited in primary-key order from the checkpoint and the pass
+    stops at the first row still inside the window, which relies on ids
+    being assigned in `time_column` order. Rows not matching `where` (e.g.
+    tasks still queued) are kept; the checkpoint stops before the first of
+    them, so they are checked again on later passes.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        name: str,
+        model: Any,
+        retention: timedelta,
+        time_column: str = "created_at",
+        where: Optional[Any] = None,
+        chunk_size: int = settings.RETENTION_CHUNK_SIZE,
+        max_rows_per_second: float = settings.RETENTION_MAX_ROWS_PER_SECOND,
+        session_factory: Callable[[], AsyncSession] = async_session_maker,
+    ):
+        """
+        Args:
+            name: Job name, used for the checkpoint and metrics.
+            model: ORM model of the table.
+            retention: How long rows are kept.
+            time_column: Row timestamp the window applies to.
+            where: Extra condition a row must meet to be deleted.
+            chunk_size: Rows scanned per chunk and transaction.
+            max_rows_per_second: Deletion rate limit.
+            session_factory: Opens a session per pass.
+        """
+        super().__init__(name, retention)
+        self.model = model
+        self.time_column = getattr(model, time_column)
+        self.where = where
+        self.chunk_size = chunk_size
+        self.max_rows_per_second = max_rows_per_second
+        self.session_factory = session_factory
+
+    async def run(self) -> int:
+        cutoff = self.cutoff()
+        started = time.monotonic()
+        deleted = 0
+        async with self.session_factory() as session:
+            position = await session.scalar(
+                select(RetentionCheckpoint.position).where(RetentionCheckpoint.job == self.name)
+            ) or 0
+            oldest = await session.scalar(
+                select(self.time_column).where(self.model.id > position).order_by(self.model.id).limit(1)
+            )
+            # First expired row `where` kept back this pass
+            unfinished: Optional[int] = None
+            while True:
+                chunk_started = time.monotonic()
+                columns = [self.model.id, self.time_column]
+                if self.where is not None:
+                    columns.append(self.where)
+                rows = (
+                    await session.execute(
+                        select(*columns)
+                        .where(self.model.id > position)
+                        .order_by(self.model.id)
+                        .limit(self.chunk_size)
+                    )
+                ).all()
+                expired = []
+                for row in rows:
+                    if row[1] >= cutoff:
+                        break
+                    expired.append(row)
+                if not expired:
+                    break
+                ids = []
+                for row in expired:
+                    if self.where is None or row[2]:
+                        ids.append(row[0])
+                    elif unfinished is None:
+                        unfinished = row[0]
+                if ids:
+                    await session.execute(
+                        delete(self.model)
+                        .where(self.model.id.in_(ids))
+                        .execution_options(synchronize_session=False)
+                    )
+                position = expired[-1][0]
+                await self._save_checkpoint(
+                    session, position if unfinished is None else unfinished - 1
+                )
+                await session.commit()
+                deleted += len(ids)
+                if len(expired) < self.chunk_size:
+                    break
+                # Stay under the rate limit so deletes don't starve live traffic
+                pause = len(ids) / self.max_rows_per_second - (time.monotonic() - chunk_started)
+                await asyncio.sleep(max(pause, 0.0))
+        self._report(deleted, time.monotonic() - started, oldest, cutoff)
+        return deleted
+
+    async def _save_checkpoint(self, session: AsyncSession, position: int) -> None:
+        insert = upsert_insert(session)
+        stmt = insert(RetentionCheckpoint).values(
+            job=self.name, position=position, updated_at=datetime.utcnow()
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[RetentionCheckpoint.job],
+                set_={"position": stmt.excluded.position, "updated_at": stmt.excluded.updated_at},
+            )
+        )
+
+
+class PartitionRetention(RetentionJob):
+    """
+    Drops whole partitions older than the window.
+    `drop_before(cutoff)` removes partitions holding only data older than
+    `cutoff` and returns how many went; `oldest_end()` returns where the
+    oldest partition ends, for the lag metric. Stores that are not
+    thread-safe run on the event loop. Every worker runs these, since
+    each also drops the partitions it holds open or in memory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        retention: timedelta,
+        drop_before: Callable[[datetime], int],
+        oldest_end: Optional[Callable[[], Optional[datetime]]] = None,
+        in_thread: bool = True,
+    ):
+        super().__init__(name, retention)
+        self.drop_before = drop_before
+        self.oldest_end = oldest_end
+        self.in_thread = in_thread
+
+    async def run(self) -> int:
+        cutoff = self.cutoff()
+        started = time.monotonic()
+        if self.in_thread:
+            oldest_end = await asyncio.to_thread(self.oldest_end) if self.oldest_end else None
+            dropped = await asyncio.to_thread(self.drop_before, cutoff)
+        else:
+            oldest_end = self.oldest_end() if self.oldest_end else None
+            dropped = self.drop_before(cutoff)
+        self._report(dropped, time.monotonic() - started, oldest_end, cutoff)
+        return dropped
+
+
+class RetentionEngine:
+    """Runs every retention job in turn, forever."""
+
+    def __init__(
+        self,
+        jobs: List[RetentionJob],
+        interval_seconds: float,
+        leader: Optional[LeaderLock] = None,
+    ):
+        """
+        Args:
+            jobs: Jobs run in order each pass.
+            interval_seconds: Pause between passes.
+            leader: Elects the worker that runs shared jobs; without one,
+                every job runs here.
+        """
+        self.jobs = jobs
+        self.interval_seconds = interval_seconds
+        self.leader = leader
+
+    async def run_once(self) -> int:
+        """Run each job once; a failing job doesn't stop the others."""
+        total = 0
+        leads = self.leader is None or self.leader.is_leader()
+        for job in self.jobs:
+            if job.shared and not leads:
+                continue
+            try:
+                total += await job.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning(f"Retention job {job.name} failed", exc_info=True)
+        return total
+
+    async def run_forever(self) -> None:
+        """Run passes forever; cancel the task to stop."""
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+
+def _memory_job(namespace: str, days: int) -> PartitionRetention:
+    def oldest_end() -> Optional[datetime]:
+        day = memory_indexes.oldest(namespace)
+        if day is None:
+            return None
+        return datetime(day.year, day.month, day.day) + timedelta(days=memory_indexes.partition_days)
+
+    return PartitionRetention(
+        f"memory_{namespace}",
+        timedelta(days=days),
+        lambda cutoff: memory_indexes.drop_before(namespace, cutoff.date()),
+        oldest_end,
+    )
+
+
+def _oldest_log_day_end() -> Optional[datetime]:
+    day = log_store.oldest_day()
+    return datetime.fromisoformat(day) + timedelta(days=1) if day else None
+
+
+# Global engine instance
+retention_engine = RetentionEngine(
+    jobs=[
+        TableRetention(
+            "agent_runs",
+            AgentRun,
+            timedelta(days=settings.RUN_RETENTION_DAYS),
+        ),
+        TableRetention(
+            "tasks",
+            Task,
+            timedelta(days=settings.RUN_RETENTION_DAYS),
+            where=Task.status.in_([TaskStatus.COMPLETED.value, TaskStatus.FAILED.value]),
+        ),
+        TableRetention(
+            "outbox_events",
+            OutboxEvent,
+            timedelta(days=settings.OUTBOX_RETENTION_DAYS),
+            where=OutboxEvent.status != OutboxStatus.PENDING.value,
+        ),
+        _memory_job(settings.TASK_MEMORY_NAMESPACE, settings.TASK_MEMORY_RETENTION_DAYS),
+        _memory_job(settings.EPISODE_MEMORY_NAMESPACE, settings.EPISODE_MEMORY_RETENTION_DAYS),
+        PartitionRetention(
+            "logs",
+            timedelta(days=settings.LOG_RETENTION_DAYS),
+            lambda cutoff: log_store.drop_before(cutoff.date().isoformat()),
+            _oldest_log_day_end,
+        ),
+        PartitionRetention(
+            "metrics",
+            timedelta(days=settings.METRICS_RETENTION_DAYS),
+            lambda cutoff: timeseries_store.drop_before(
+                int(cutoff.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            ),
+            in_thread=False,
+        ),
+    ],
+    interval_seconds=settings.RETENTION_INTERVAL_SECONDS,
+    leader=background_leader,
+)
@@ -0,0 +1,172 @@
+"""
+Live run event fan-out.
+Run status changes and log lines are published to an in-process hub and
+pushed to dashboard subscribers over SSE or WebSocket, filtered by org and
+optionally run. Each event is serialized once per publish; subscribers
+only hold references to the shared frames.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from control_plane.config import settings
+from control_plane.observability import metrics_instance
+
+# (SSE frame, JSON payload) shared by every subscriber of an event
+Frame = Tuple[bytes, str]
+
+
+class Subscription:
+    """
+    A subscriber's bounded queue of events.
+    When the queue is full the oldest event is dropped, and the next
+    delivery starts with a `dropped` event so the client can resync.
+    """
+
+    __slots__ = ("org_id", "run_id", "_queue", "_waiter", "_dropped")
+
+    def __init__(self, org_id: str, run_id: Optional[str], max_queue: int):
+        """Create an empty subscription."""
+        self.org_id = org_id
+        self.run_id = run_id
+        self._queue: Deque[Frame] = deque(maxlen=max_queue)
+        self._waiter: Optional["asyncio.Future[None]"] = None
+        self._dropped = 0
+
+    def push(self, frame: Frame) -> None:
+        """Queue an event, dropping the oldest when full."""
+        if len(self._queue) == self._queue.maxlen:
+            self._dropped += 1
+            metrics_instance.run_events_dropped_total.inc()
+        self._queue.append(frame)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next_batch(self, timeout: float) -> Optional[List[Frame]]:
+        """
+        Wait up to `timeout` seconds for events and return all queued ones,
+        or None on timeout so the caller can send a keep-alive.
+        """
+        if not self._queue:
+            # A bare future plus timer is much cheaper than wait_for, which
+            # wraps every wait of every idle subscriber in a task
+            loop = asyncio.get_running_loop()
+            self._waiter = loop.create_future()
+            timer = loop.call_later(timeout, _wake, self._waiter)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+            if not self._queue:
+                return None
+        batch = list(self._queue)
+        self._queue.clear()
+        if self._dropped:
+            batch.insert(0, _frame("dropped", None, {"count": self._dropped}))
+            self._dropped = 0
+        return batch
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _frame(event_type: str, run_id: Optional[str], data: Any) -> Frame:
+    payload = json.dumps(
+        {"type": event_type, "run_id": run_id, "data": data},
+        separators=(",", ":"),
+        default=str,
+    )
+    return f"event: {event_type}\ndata: {payload}\n\n".encode(), payload
+
+
+class RunEventHub:
+    """
+    Pub/sub hub for run events within one Control Plane process.
+    Subscribers are indexed by org, then by run filter (None for every run
+    of the org), so a publish only touches matching subscribers and is a
+    dict lookup when an org has none.
+    """
+
+    def __init__(self, max_queue: int, keepalive_seconds: float):
+        """
+        Args:
+            max_queue: Events buffered per subscriber before dropping.
+            keepalive_seconds: Idle time before a keep-alive is sent.
+        """
+        self.max_queue = max_queue
+        self.keepalive_seconds = keepalive_seconds
+        self._subscribers: Dict[str, Dict[Optional[str], Set[Subscription]]] = {}
+
+    def subscribe(self, org_id: str, run_id: Optional[str] = None) -> Subscription:
+        """Register a subscriber for an org, or one of its runs."""
+        subscription = Subscription(org_id, run_id, self.max_queue)
+        self._subscribers.setdefault(org_id, {}).setdefault(run_id, set()).add(subscription)
+        metrics_instance.run_event_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber."""
+        by_run = self._subscribers.get(subscription.org_id, {})
+        subscribers = by_run.get(subscription.run_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        metrics_instance.run_event_subscribers.dec()
+        if not subscribers:
+            del by_run[subscription.run_id]
+            if not by_run:
+                del self._subscribers[subscription.org_id]
+
+    def has_subscribers(self, org_id: str) -> bool:
+        """Whether anyone is listening to an org's events."""
+        return org_id in self._subscribers
+
+    def publish(self, org_id: str, run_id: Optional[str], event_type: str, data: Any) -> int:
+        """Push an event to matching subscribers; returns how many got it."""
+        by_run = self._subscribers.get(org_id)
+        if not by_run:
+            return 0
+        org_wide = by_run.get(None, ())
+        run_only = by_run.get(run_id, ()) if run_id is not None else ()
+        if not org_wide and not run_only:
+            return 0
+        frame = _frame(event_type, run_id, data)
+        for subscription in org_wide:
+            subscription.push(frame)
+        for subscription in run_only:
+            subscription.push(frame)
+        return len(org_wide) + len(run_only)
+
+    def publish_status(self, org_id: str, run_id: str, status: str, **data: Any) -> int:
+        """Publish a run status change."""
+        return self.publish(org_id, run_id, "status", {"status": status, **data})
+
+    async def sse_stream(self, org_id: str, run_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Subscribe and encode events as a Server-Sent Events stream.
+        The subscription lives exactly as long as the stream is iterated.
+        """
+        subscription = self.subscribe(org_id, run_id)
+        try:
+            # Reconnect after 3s if the connection drops
+            yield b"retry: 3000\n\n"
+            while True:
+                batch = await subscription.next_batch(self.keepalive_seconds)
+                if batch is None:
+                    yield b": keepalive\n\n"
+                else:
+                    yield b"".join(sse for sse, _ in batch)
+        finally:
+            self.unsubscribe(subscription)
+
+
+# Global hub instance
+run_events = RunEventHub(
+    max_queue=settings.RUN_EVENTS_QUEUE_SIZE,
+    keepalive_seconds=settings.RUN_EVENTS_KEEPALIVE_SECONDS,
+)
@@ -0,0 +1,297 @@
+"""
+Agent run completion service.
+Validates run results reported by the Data Plane and records them with
+multi-row `INSERT ... ON CONFLICT (run_id) DO UPDATE` statements, so a
+redelivered completion overwrites rather than duplicates. A run is
+metered and announced only by the transaction whose conditional
+`UPDATE ... RETURNING` moves its task to completed, so concurrent or
+redelivered completions bill it once.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.database import upsert_insert
+from control_plane.models import AgentRun, Task
+from control_plane.schemas import (
+    CompletionItemStatus,
+    RunCompletion,
+    RunCompletionResult,
+    RunStatus,
+    TaskStatus,
+)
+from control_plane.services.billing_service import usage_meter
+from control_plane.services.outbox import add_events, outbox_dispatcher
+from control_plane.services.run_events import run_events
+from control_plane.services.timeseries import timeseries_store
+
+# Rows per INSERT statement; keeps bind parameters well under driver limits
+INSERT_CHUNK_SIZE = 500
+
+_completions = TypeAdapter(List[RunCompletion])
+_completion = TypeAdapter(RunCompletion)
+
+_UPSERT_COLUMNS = (
+    "status",
+    "outputs",
+    "logs",
+    "metrics",
+    "error",
+    "execution_time_ms",
+    "completed_at",
+)
+
+
+class MalformedBatchError(ValueError):
+    """Raised when a batch body isn't a JSON array or NDJSON stream."""
+
+
+def _error_message(error: dict) -> str:
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+def parse_completions(
+    body: bytes, ndjson: bool = False
+) -> Tuple[List[Optional[RunCompletion]], Dict[int, str]]:
+    """
+    Validate a batch of completions in one pass.
+
+    Returns the items in request order, with None in place of invalid
+    items, and a mapping of item index to validation error.
+    """
+    if ndjson:
+        lines = [line for line in body.splitlines() if line.strip()]
+        raw = b"[" + b",".join(lines) + b"]"
+    else:
+        raw = body
+
+    try:
+        return list(_completions.validate_json(raw)), {}
+    except ValidationError as exc:
+        errors = exc.errors()
+
+    if any(error["type"] == "json_invalid" for error in errors):
+        if not ndjson:
+            raise MalformedBatchError("Body must be a JSON array of run completions")
+        # A malformed NDJSON line only rejects that line
+        items: List[Optional[RunCompletion]] = []
+        failures: Dict[int, str] = {}
+        for index, line in enumerate(lines):
+            try:
+                items.append(_completion.validate_json(line))
+            except ValidationError as line_exc:
+                items.append(None)
+                error = line_exc.errors()[0]
+                failures[index] = _error_message({**error, "loc": (index, *error["loc"])})
+        return items, failures
+    if any(not error["loc"] or not isinstance(error["loc"][0], int) for error in errors):
+        raise MalformedBatchError("Body must be a JSON array of run completions")
+
+    # Item-level errors: report them and validate only the remaining items
+    failures = {}
+    for error in errors:
+        failures.setdefault(error["loc"][0], _error_message(error))
+    documents = json.loads(raw)
+    valid = [index for index in range(len(documents)) if index not in failures]
+    parsed = iter(_completions.validate_python([documents[index] for index in valid]))
+    items = [None if index in failures else next(parsed) for index in range(len(documents))]
+    return items, failures
+
+
+async def record_completions(
+    session: AsyncSession,
+    items: Sequence[Optional[RunCompletion]],
+    failures: Dict[int, str],
+    org_id: Optional[str] = None,
+) -> List[RunCompletionResult]:
+    """
+    Upsert valid completions and mark their tasks completed, all in one
+    transaction. When `org_id` is given, runs of other orgs are refused.
+    """
+    results: List[Optional[RunCompletionResult]] = [None] * len(items)
+    for index, detail in failures.items():
+        results[index] = RunCompletionResult(
+            index=index, status=CompletionItemStatus.INVALID, detail=detail
+        )
+
+    # The last report for a run wins; ON CONFLICT can't touch a row twice
+    latest: Dict[str, int] = {}
+    for index, item in enumerate(items):
+        if item is not None:
+            latest[item.run_id] = index
+
+    tasks: Dict[str, Tuple[str, str, Optional[str]]] = {}
+    run_ids = list(latest)
+    for start in range(0, len(run_ids), INSERT_CHUNK_SIZE):
+        result = await session.execute(
+            select(Task.run_id, Task.org_id, Task.agent_id, Task.deployment_id).where(
+                Task.run_id.in_(run_ids[start:start + INSERT_CHUNK_SIZE])
+            )
+        )
+        for run_id, task_org, agent_id, deployment_id in result:
+            tasks[run_id] = (task_org, agent_id, deployment_id)
+
+    now = datetime.utcnow()
+    rows = []
+    for index, item in enumerate(items):
+        if item is None:
+            continue
+        task = tasks.get(item.run_id)
+        if task is None:
+            status, detail = CompletionItemStatus.UNKNOWN_RUN, "Unknown run"
+        elif org_id is not None and task[0] != org_id:
+            status, detail = CompletionItemStatus.FORBIDDEN, "Run belongs to another org"
+        else:
+            status, detail = CompletionItemStatus.ACCEPTED, None
+            if latest[item.run_id] == index:
+                task_org, agent_id, deployment_id = task
+                rows.append(
+                    {
+                        "run_id": item.run_id,
+                        "org_id": task_org,
+                        "agent_id": agent_id,
+                        "deployment_id": deployment_id,
+                        "status": item.status.value,
+                        "outputs": item.outputs,
+                        "logs": item.logs,
+                        "metrics": item.metrics,
+                        "error": item.error,
+                        "execution_time_ms": item.execution_time_ms,
+                        "completed_at": _naive_utc(item.completed_at) if item.completed_at else now,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                )
+        results[index] = RunCompletionResult(
+            index=index, run_id=item.run_id, status=status, detail=detail
+        )
+
+    # Runs whose task this transaction completed; runs already completed
+    # are re-recorded but not metered or announced again
+    completed: Set[str] = set()
+    insert = upsert_insert(session)
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        stmt = insert(AgentRun).values(chunk)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[AgentRun.run_id],
+                set_={
+                    **{column: stmt.excluded[column] for column in _UPSERT_COLUMNS},
+                    "updated_at": now,
+                },
+            )
+        )
+        result = await session.execute(
+            update(Task)
+            .where(
+                Task.run_id.in_([row["run_id"] for row in chunk]),
+                Task.status != TaskStatus.COMPLETED.value,
+            )
+            .values(
+                status=TaskStatus.COMPLETED.value,
+                lease_owner=None,
+                lease_expires_at=None,
+                updated_at=now,
+            )
+            .returning(Task.run_id)
+            .execution_options(synchronize_session=False)
+        )
+        completed.update(result.scalars().all())
+    # Webhooks go out with the commit; redelivered completions don't repeat them
+    staged = await add_events(
+        session, [_run_event(row) for row in rows if row["run_id"] in completed]
+    )
+    await session.commit()
+    if staged:
+        outbox_dispatcher.wake()
+    _record_durations(rows)
+    _meter_usage(row for row in rows if row["run_id"] in completed)
+    for row in rows:
+        run_events.publish_status(
+            row["org_id"],
+            row["run_id"],
+            row["status"],
+            error=row["error"],
+            execution_time_ms=row["execution_time_ms"],
+        )
+    return results
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    """Naive UTC, as the DB columns, usage hours and metrics expect."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _run_event(row: dict) -> Tuple[str, str, dict]:
+    """Webhook event for a recorded run, in the documented payload format."""
+    completed_at = row["completed_at"].isoformat() + "Z"
+    if row["status"] == RunStatus.COMPLETED.value:
+        execution_time_ms = row["execution_time_ms"]
+        return row["org_id"], "agent.run.completed", {
+            "run_id": row["run_id"],
+            "agent_id": row["agent_id"],
+            "deployment_id": row["deployment_id"],
+            "status": row["status"],
+            "outputs": row["outputs"],
+            "duration_seconds": execution_time_ms / 1000 if execution_time_ms is not None else None,
+            "completed_at": completed_at,
+        }
+    return row["org_id"], "agent.run.failed", {
+        "run_id": row["run_id"],
+        "agent_id": row["agent_id"],
+        "deployment_id": row["deployment_id"],
+        "status": row["status"],
+        "error": row["error"],
+        "failed_at": completed_at,
+    }
+
+
+def _meter_usage(rows: Iterable[dict]) -> None:
+    """Meter completed runs for billing."""
+    for row in rows:
+        metrics = row["metrics"] or {}
+        records = metrics.get("records_processed")
+        cpu_seconds = metrics.get("cpu_seconds")
+        if isinstance(cpu_seconds, (int, float)) and cpu_seconds > 0:
+            cpu_ms = int(cpu_seconds * 1000)
+        else:
+            # Without a CPU figure, wall time on one CPU is billed
+            cpu_ms = row["execution_time_ms"] or 0
+        usage_meter.record(
+            row["org_id"],
+            row["agent_id"],
+            row["completed_at"],
+            records=max(int(records), 0) if isinstance(records, (int, float)) else 0,
+            cpu_ms=cpu_ms,
+        )
+
+
+def _record_durations(rows: List[dict]) -> None:
+    """Feed run durations into the org metrics store, one append per series."""
+    series: Dict[Tuple[str, str, str], Tuple[List[int], List[float]]] = {}
+    for row in rows:
+        if row["execution_time_ms"] is None:
+            continue
+        timestamps, values = series.setdefault(
+            (row["org_id"], row["agent_id"], row["status"]), ([], [])
+        )
+        completed_at = row["completed_at"].replace(tzinfo=timezone.utc)
+        timestamps.append(int(completed_at.timestamp() * 1000))
+        values.append(row["execution_time_ms"])
+    for (org_id, agent_id, status), (timestamps, values) in series.items():
+        timeseries_store.append(
+            org_id,
+            "agent_run_duration_ms",
+            timestamps,
+            values,
+            {"agent_id": agent_id, "status": status},
+        )
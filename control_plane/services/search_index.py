@@ -0,0 +1,291 @@
+"""
+In-process inverted index with BM25 ranking.
+Backs `/agents/search` so type-ahead queries never touch the database.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Mapping, Tuple, Union
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# A field is either free text or a list of short values (tags, tool names)
+FieldValue = Union[str, Iterable[str], None]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Inverted index over weighted document fields.
+
+    Each document is a mapping of field name to text; term frequencies are
+    scaled by the field weight before BM25 scoring, so a hit in a name
+    counts for more than a hit in a description. Query terms must all
+    match; the last term is also matched as a prefix for type-ahead.
+
+    Postings are kept impact-ordered (highest BM25 term score first) so a
+    query walks only the head of each list and stops once no unseen
+    document can enter the top results (Fagin's threshold algorithm).
+    Length normalization uses a reference average document length that is
+    refreshed when the real average drifts, which keeps impacts stable
+    between updates.
+    """
+
+    def __init__(
+        self,
+        field_weights: Mapping[str, float],
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_prefix_terms: int = 64,
+        min_prefix_length: int = 2,
+        length_drift: float = 0.1,
+    ):
+        """
+        Args:
+            field_weights: Weight applied to term frequencies per field.
+            k1: BM25 term-frequency saturation.
+            b: BM25 length normalization.
+            max_prefix_terms: Cap on index terms a prefix may expand to.
+            min_prefix_length: Shorter trailing tokens only match whole
+                terms, since a single letter would match most documents.
+            length_drift: Relative change in average document length that
+                triggers recomputing impacts.
+        """
+        self.field_weights = dict(field_weights)
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self.min_prefix_length = min_prefix_length
+        self.length_drift = length_drift
+        # term -> {doc key: weighted term frequency}
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        # term -> [(impact, doc key)] by descending impact, built lazily
+        self._ranked: Dict[str, List[Tuple[float, Any]]] = {}
+        # Sorted vocabulary for prefix range lookups
+        self._terms: List[str] = []
+        # doc key -> (weighted term frequencies, document length)
+        self._docs: Dict[Any, Tuple[Dict[str, float], float]] = {}
+        self._payloads: Dict[Any, Any] = {}
+        self._total_length = 0.0
+        self._reference_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._docs
+
+    def upsert(self, key: Any, fields: Mapping[str, FieldValue], payload: Any = None) -> None:
+        """Index a document, replacing any previous version with the same key."""
+        self.remove(key)
+
+        frequencies: Dict[str, float] = {}
+        for field, value in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            if not value or not weight:
+                continue
+            text = value if isinstance(value, str) else " ".join(value)
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+
+        length = sum(frequencies.values())
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._terms, term)
+            postings[key] = frequency
+            self._ranked.pop(term, None)
+        self._docs[key] = (frequencies, length)
+        self._payloads[key] = payload
+        self._total_length += length
+        self._check_reference_length()
+
+    def remove(self, key: Any) -> None:
+        """Remove a document; unknown keys are ignored."""
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        frequencies, length = doc
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[key]
+            self._ranked.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+        del self._payloads[key]
+        self._total_length -= length
+        self._check_reference_length()
+
+    def clear(self) -> None:
+        """Remove all documents."""
+        self._postings.clear()
+        self._ranked.clear()
+        self._terms.clear()
+        self._docs.clear()
+        self._payloads.clear()
+        self._total_length = 0.0
+        self._reference_length = 0.0
+
+    def _check_reference_length(self) -> None:
+        """Refresh the reference length, and so all impacts, on drift."""
+        average = self._total_length / len(self._docs) if self._docs else 0.0
+        if abs(average - self._reference_length) > self.length_drift * self._reference_length:
+            self._reference_length = average
+            self._ranked.clear()
+
+    def _impact(self, frequency: float, length: float) -> float:
+        """BM25 term score of one posting, before IDF."""
+        norm = 1 - self.b + self.b * length / (self._reference_length or 1.0)
+        return frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+
+    def _ranked_postings(self, term: str) -> List[Tuple[float, Any]]:
+        """Return a term's postings ordered by descending impact."""
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            docs = self._docs
+            ranked = sorted(
+                (
+                    (self._impact(frequency, docs[key][1]), key)
+                    for key, frequency in self._postings[term].items()
+                ),
+                key=lambda posting: posting[0],
+                reverse=True,
+            )
+            self._ranked[term] = ranked
+        return ranked
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings[term])
+        return math.log(1.0 + (len(self._docs) - df + 0.5) / (df + 0.5))
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """Return up to `max_prefix_terms` indexed terms starting with `prefix`."""
+        start = bisect_left(self._terms, prefix)
+        terms = []
+        for term in self._terms[start:start + self.max_prefix_terms]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _group_docs(self, terms: List[str]):
+        """Return the documents containing any of `terms`."""
+        if len(terms) == 1:
+            return self._postings[terms[0]].keys()
+        docs = set()
+        for term in terms:
+            docs.update(self._postings[term])
+        return docs
+
+    def search(
+        self, query: str, limit: int = 10, prefix: bool = True
+    ) -> Tuple[List[Tuple[Any, float]], int]:
+        """
+        Rank documents matching every query term.
+
+        Returns the top `limit` (payload, score) pairs and the total number
+        of matching documents.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._docs:
+            return [], 0
+
+        # Each query token becomes a group of alternative index terms: just
+        # itself, or every term it prefixes when it's the token being typed.
+        # A document's score is the sum over groups of its best alternative.
+        groups: List[List[str]] = []
+        for position, token in enumerate(tokens):
+            if (
+                prefix
+                and position == len(tokens) - 1
+                and len(token) >= self.min_prefix_length
+            ):
+                terms = self.expand_prefix(token)
+            else:
+                terms = [token] if token in self._postings else []
+            if not terms:
+                return [], 0
+            groups.append(terms)
+
+        # Set operations run in C, so materializing the matches up front is
+        # cheap and lets the walk below reject non-matching documents with
+        # one lookup instead of scoring them.
+        doc_sets = sorted((self._group_docs(terms) for terms in groups), key=len)
+        matches = doc_sets[0]
+        if len(doc_sets) > 1:
+            matches = set(matches)
+            for docs in doc_sets[1:]:
+                matches.intersection_update(docs)
+        total = len(matches)
+        if not total:
+            return [], 0
+
+        k1, b = self.k1, self.b
+        reference_length = self._reference_length or 1.0
+        # (group, idf * (k1 + 1), postings, impact-ordered postings)
+        lists = [
+            (
+                group,
+                self._idf(term) * (k1 + 1),
+                self._postings[term],
+                self._ranked_postings(term),
+            )
+            for group, terms in enumerate(groups)
+            for term in terms
+        ]
+        docs = self._docs
+
+        def score(key: Any) -> float:
+            norm = k1 * (1 - b + b * docs[key][1] / reference_length)
+            best = [0.0] * len(groups)
+            for group, weight, postings, _ in lists:
+                frequency = postings.get(key)
+                if frequency is not None:
+                    term_score = weight * frequency / (frequency + norm)
+                    if term_score > best[group]:
+                        best[group] = term_score
+            return sum(best)
+
+        top: List[Tuple[float, int, Any]] = []
+        seen = set()
+        depth = 0
+        while True:
+            frontier = [0.0] * len(groups)
+            active = [False] * len(groups)
+            for group, weight, _, ranked in lists:
+                if depth >= len(ranked):
+                    continue
+                impact, key = ranked[depth]
+                active[group] = True
+                bound = weight / (k1 + 1) * impact
+                if bound > frontier[group]:
+                    frontier[group] = bound
+                if key in seen or key not in matches:
+                    continue
+                seen.add(key)
+                entry = (score(key), -len(seen), key)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            # Once a group's lists are exhausted no unseen document can
+            # match it; otherwise stop when the frontier can't beat the top.
+            if not all(active) or len(seen) == total:
+                break
+            if len(top) == limit and top[0][0] >= sum(frontier):
+                break
+            depth += 1
+
+        results = [
+            (self._payloads[key], doc_score)
+            for doc_score, _, key in sorted(top, reverse=True)
+        ]
+        return results, total
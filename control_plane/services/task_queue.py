@@ -0,0 +1,462 @@
+"""
+Durable task queue for Data Plane workers.
+Tasks live in the `tasks` table. Workers lease batches with
+`SELECT ... FOR UPDATE SKIP LOCKED`, long-poll while the queue is empty,
+and get redelivered work when a lease expires.
+"""
+
+import asyncio
+import logging
+import math
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.database import async_session_maker
+from control_plane.models import Task
+from control_plane.observability import metrics_instance
+from control_plane.schemas import TaskStatus
+from control_plane.services.leader import LeaderLock, background_leader
+from control_plane.services.run_events import run_events
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker acts on a task it no longer holds."""
+
+
+class TaskNotifier:
+    """
+    Wakes long-polling workers when tasks become available.
+    Each notification wakes at most as many waiters as there are new tasks,
+    oldest waiter first, so a single enqueue doesn't stampede every idle
+    worker into the database.
+    """
+
+    def __init__(self):
+        """Initialize with no waiters."""
+        # (org filter, future); a None filter accepts tasks from any org
+        self._waiters: Deque[Tuple[Optional[str], "asyncio.Future[None]"]] = deque()
+
+    def register(self, org_id: Optional[str]) -> "asyncio.Future[None]":
+        """Register a waiter before checking the queue, so no wakeup is missed."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((org_id, future))
+        metrics_instance.task_queue_waiters.inc()
+        return future
+
+    def notify(self, org_id: str, count: int = 1) -> None:
+        """Wake up to `count` waiters that accept tasks from `org_id`."""
+        for waiter_org, future in list(self._waiters):
+            if count <= 0:
+                break
+            if future.done() or waiter_org not in (None, org_id):
+                continue
+            future.set_result(None)
+            self._discard(future)
+            count -= 1
+
+    def cancel(self, org_id: Optional[str], future: "asyncio.Future[None]") -> None:
+        """
+        Drop a waiter that no longer needs waking. If it had already been
+        woken, the wakeup is passed on to another waiter.
+        """
+        if future.done() and not future.cancelled():
+            if org_id is not None:
+                self.notify(org_id)
+            else:
+                self._notify_any()
+            return
+        future.cancel()
+        self._discard(future)
+
+    def _notify_any(self) -> None:
+        """Wake the oldest waiter regardless of its org filter."""
+        while self._waiters:
+            _, future = self._waiters[0]
+            self._discard(future)
+            if not future.done():
+                future.set_result(None)
+                return
+
+    def _discard(self, future: "asyncio.Future[None]") -> None:
+        for index, (_, waiter) in enumerate(self._waiters):
+            if waiter is future:
+                del self._waiters[index]
+                metrics_instance.task_queue_waiters.dec()
+                return
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+
+class TaskQueue:
+    """
+    Task queue backed by the async SQLAlchemy engine.
+
+    Fairness: orgs with queued work are kept in a rotation. A lease takes
+    an equal share of the batch from each org in turn and moves served
+    orgs to the back, so one org's backlog can't starve the others. The
+    rotation is per process, so it is refreshed from the table when a
+    long-poll re-checks and by the sweeper, which also requeues tasks
+    whose lease expired. Only the elected worker requeues; the sweepers
+    of the others just refresh their rotation.
+    """
+
+    def __init__(
+        self,
+        lease_seconds: float,
+        max_attempts: int,
+        recheck_seconds: float,
+        session_factory: Callable[[], AsyncSession] = async_session_maker,
+        leader: Optional[LeaderLock] = None,
+    ):
+        """
+        Args:
+            lease_seconds: How long a worker holds a task without heartbeats.
+            max_attempts: Deliveries before a task is marked failed.
+            recheck_seconds: How often a long-poll re-checks the table,
+                catching tasks enqueued by other Control Plane replicas.
+            session_factory: Opens sessions for the background sweeper.
+            leader: Elects the worker whose sweeper requeues expired
+                leases; without one, this worker does.
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.recheck_seconds = recheck_seconds
+        self.session_factory = session_factory
+        self.leader = leader
+        self.notifier = TaskNotifier()
+        # Orgs with queued work, in service order, mapped to a sequence
+        # number that changes whenever the org is marked ready again
+        self._ready_orgs: "OrderedDict[str, int]" = OrderedDict()
+        self._ready_seq = 0
+
+    async def enqueue(
+        self,
+        session: AsyncSession,
+        org_id: str,
+        agent_id: str,
+        payload: Dict[str, Any],
+        deployment_id: Optional[str] = None,
+    ) -> Task:
+        """Insert a task and wake one waiting worker."""
+        task = Task(
+            run_id=f"run-{uuid.uuid4().hex}",
+            org_id=org_id,
+            agent_id=agent_id,
+            deployment_id=deployment_id,
+            payload=payload,
+            status=TaskStatus.QUEUED.value,
+            max_attempts=self.max_attempts,
+        )
+        session.add(task)
+        await session.commit()
+        metrics_instance.tasks_enqueued_total.inc()
+        self._mark_ready(org_id)
+        self.notifier.notify(org_id)
+        run_events.publish_status(org_id, task.run_id, task.status, agent_id=agent_id)
+        return task
+
+    async def lease(
+        self,
+        session: AsyncSession,
+        worker_id: str,
+        limit: int,
+        org_id: Optional[str] = None,
+        refresh: bool = False,
+    ) -> List[Task]:
+        """
+        Lease up to `limit` queued tasks in one transaction, restricted to
+        `org_id` when given (BYOC workers) or shared fairly across orgs.
+        With `refresh`, or when no org is known to have work, orgs are
+        first re-read from the table to catch other replicas' enqueues.
+        """
+        now = datetime.utcnow()
+        if org_id is None and (refresh or not self._ready_orgs):
+            await self._refresh_ready(session)
+        ready = dict(self._ready_orgs)
+        orgs = [org_id] if org_id is not None else list(ready)
+        leased: List[Task] = []
+        drained: Set[str] = set()
+        # Rows this transaction already locked aren't skipped by SKIP LOCKED,
+        # so later passes resume after the last id taken from each org
+        last_ids: Dict[str, int] = {}
+
+        # Each pass takes an equal share from every org still holding work
+        while len(leased) < limit and orgs:
+            share = math.ceil((limit - len(leased)) / len(orgs))
+            for org in orgs:
+                wanted = min(share, limit - len(leased))
+                if wanted <= 0:
+                    break
+                stmt = select(Task).where(
+                    Task.org_id == org,
+                    Task.status == TaskStatus.QUEUED.value,
+                    Task.available_at <= now,
+                )
+                if org in last_ids:
+                    stmt = stmt.where(Task.id > last_ids[org])
+                result = await session.execute(
+                    stmt.order_by(Task.id)
+                    .limit(wanted)
+                    .with_for_update(skip_locked=True)
+                )
+                tasks = list(result.scalars())
+                leased.extend(tasks)
+                if tasks:
+                    last_ids[org] = tasks[-1].id
+                if len(tasks) < wanted:
+                    drained.add(org)
+            orgs = [org for org in orgs if org not in drained]
+
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        for task in leased:
+            task.status = TaskStatus.LEASED.value
+            task.lease_owner = worker_id
+            task.lease_expires_at = expires_at
+            task.attempts += 1
+        # Commit even when empty so no connection is held while long-polling
+        await session.commit()
+
+        for org in drained:
+            # Keep orgs that had tasks enqueued while this lease ran
+            if self._ready_orgs.get(org) == ready.get(org):
+                self._ready_orgs.pop(org, None)
+        for task in leased:
+            if task.org_id in self._ready_orgs:
+                self._ready_orgs.move_to_end(task.org_id)
+        if leased:
+            metrics_instance.tasks_leased_total.inc(len(leased))
+        for task in leased:
+            run_events.publish_status(
+                task.org_id, task.run_id, task.status, attempt=task.attempts
+            )
+        return leased
+
+    async def lease_next(
+        self,
+        session: AsyncSession,
+        worker_id: str,
+        limit: int,
+        org_id: Optional[str] = None,
+        wait_seconds: float = 0,
+    ) -> List[Task]:
+        """Lease tasks, waiting up to `wait_seconds` for work to arrive."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_seconds
+        refresh = False
+        while True:
+            future = self.notifier.register(org_id)
+            woken = False
+            try:
+                tasks = await self.lease(session, worker_id, limit, org_id, refresh)
+                remaining = deadline - loop.time()
+                if tasks or remaining <= 0:
+                    return tasks
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(future), min(remaining, self.recheck_seconds)
+                    )
+                    woken = True
+                    refresh = False
+                except asyncio.TimeoutError:
+                    # Work enqueued on another replica only shows up in the table
+                    refresh = True
+            finally:
+                # A wakeup this worker didn't use is handed to another waiter
+                if not woken:
+                    self.notifier.cancel(org_id, future)
+
+    async def heartbeat(
+        self,
+        session: AsyncSession,
+        task_id: int,
+        worker_id: str,
+        org_id: Optional[str] = None,
+    ) -> Task:
+        """Extend a lease held by `worker_id`."""
+        task = await self._update_owned(
+            session,
+            task_id,
+            worker_id,
+            org_id,
+            lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+        )
+        await session.commit()
+        return task
+
+    async def ack(
+        self,
+        session: AsyncSession,
+        task_id: int,
+        worker_id: str,
+        org_id: Optional[str] = None,
+    ) -> Task:
+        """Mark a leased task as completed."""
+        task = await self._update_owned(
+            session,
+            task_id,
+            worker_id,
+            org_id,
+            status=TaskStatus.COMPLETED.value,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        await session.commit()
+        run_events.publish_status(task.org_id, task.run_id, task.status)
+        return task
+
+    async def nack(
+        self,
+        session: AsyncSession,
+        task_id: int,
+        worker_id: str,
+        org_id: Optional[str] = None,
+        retry_delay_seconds: float = 0,
+    ) -> Task:
+        """Release a leased task for redelivery, or fail it when out of attempts."""
+        out_of_attempts = Task.attempts >= Task.max_attempts
+        task = await self._update_owned(
+            session,
+            task_id,
+            worker_id,
+            org_id,
+            status=case(
+                (out_of_attempts, TaskStatus.FAILED.value), else_=TaskStatus.QUEUED.value
+            ),
+            available_at=case(
+                (out_of_attempts, Task.available_at),
+                else_=datetime.utcnow() + timedelta(seconds=retry_delay_seconds),
+            ),
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        await session.commit()
+        run_events.publish_status(task.org_id, task.run_id, task.status)
+        if task.status == TaskStatus.QUEUED.value:
+            self._mark_ready(task.org_id)
+            if not retry_delay_seconds:
+                self.notifier.notify(task.org_id)
+        return task
+
+    async def sweep(self, session: AsyncSession) -> int:
+        """
+        Requeue tasks whose lease expired, failing those out of attempts,
+        and refresh the org rotation. Returns the number of requeued tasks.
+        """
+        now = datetime.utcnow()
+        expired = Task.status == TaskStatus.LEASED.value, Task.lease_expires_at <= now
+        requeued = await session.execute(
+            update(Task)
+            .where(*expired, Task.attempts < Task.max_attempts)
+            .values(
+                status=TaskStatus.QUEUED.value,
+                lease_owner=None,
+                lease_expires_at=None,
+                available_at=now,
+            )
+            .returning(Task.org_id, Task.run_id)
+            .execution_options(synchronize_session=False)
+        )
+        requeued_runs = requeued.all()
+        requeued_orgs = [org for org, _ in requeued_runs]
+        failed = await session.execute(
+            update(Task)
+            .where(*expired, Task.attempts >= Task.max_attempts)
+            .values(status=TaskStatus.FAILED.value, lease_owner=None, lease_expires_at=None)
+            .returning(Task.org_id, Task.run_id)
+            .execution_options(synchronize_session=False)
+        )
+        failed_runs = failed.all()
+        await self._refresh_ready(session)
+        await session.commit()
+
+        for org in requeued_orgs:
+            self.notifier.notify(org)
+        if requeued_orgs:
+            metrics_instance.tasks_redelivered_total.inc(len(requeued_orgs))
+        for org, run_id in requeued_runs:
+            run_events.publish_status(org, run_id, TaskStatus.QUEUED.value, reason="lease_expired")
+        for org, run_id in failed_runs:
+            run_events.publish_status(org, run_id, TaskStatus.FAILED.value, reason="lease_expired")
+        return len(requeued_orgs)
+
+    async def run_sweeper(self, interval_seconds: float) -> None:
+        """Sweep expired leases forever; cancel the task to stop."""
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    if self.leader is None or self.leader.is_leader():
+                        await self.sweep(session)
+                    else:
+                        await self._refresh_ready(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Task lease sweep failed", exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+    async def _refresh_ready(self, session: AsyncSession) -> None:
+        """Add orgs with queued tasks in the table to the rotation."""
+        ready = await session.execute(
+            select(Task.org_id).where(Task.status == TaskStatus.QUEUED.value).distinct()
+        )
+        for (org,) in ready:
+            if org not in self._ready_orgs:
+                self._mark_ready(org)
+
+    def _mark_ready(self, org_id: str) -> None:
+        """Add an org to the rotation, or note new work for one already in it."""
+        # Assigning to an existing key keeps the org's place in the rotation
+        self._ready_seq += 1
+        self._ready_orgs[org_id] = self._ready_seq
+
+    async def _update_owned(
+        self,
+        session: AsyncSession,
+        task_id: int,
+        worker_id: str,
+        org_id: Optional[str],
+        **values: Any,
+    ) -> Task:
+        """
+        Update a task leased by `worker_id` whose lease hasn't expired,
+        belonging to `org_id` when given, and return it. The lease is
+        checked in the UPDATE itself, so a sweeper or another worker
+        taking the task meanwhile can't be overwritten.
+        """
+        conditions = [
+            Task.id == task_id,
+            Task.status == TaskStatus.LEASED.value,
+            Task.lease_owner == worker_id,
+            Task.lease_expires_at > datetime.utcnow(),
+        ]
+        if org_id is not None:
+            conditions.append(Task.org_id == org_id)
+        result = await session.execute(
+            update(Task)
+            .where(*conditions)
+            .values(**values)
+            .returning(Task)
+            .execution_options(populate_existing=True)
+        )
+        task = result.scalar_one_or_none()
+        if task is None:
+            raise LeaseLostError(f"Task {task_id} is not leased by {worker_id}")
+        return task
+
+
+# Global queue instance
+task_queue = TaskQueue(
+    lease_seconds=settings.TASK_QUEUE_LEASE_SECONDS,
+    max_attempts=settings.TASK_QUEUE_MAX_ATTEMPTS,
+    recheck_seconds=settings.TASK_QUEUE_RECHECK_SECONDS,
+    leader=background_leader,
+)
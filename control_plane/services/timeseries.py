@@ -0,0 +1,334 @@
+"""
+In-memory columnar time-series store for org metrics.
+Backs `/orgs/{org_id}/metrics`. Samples are kept per org and metric in
+NumPy columns (timestamps, values, label codes) so range queries and
+downsampling run as array operations, and responses are serialized
+straight from the columns.
+"""
+
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic_core import to_json
+
+from control_plane.config import settings
+
+# Aggregations supported by `TimeSeriesStore.query_json`
+AGGREGATIONS = ("min", "max", "avg", "sum", "count", "p95")
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class InvalidQueryError(ValueError):
+    """Raised for a query the store can't answer."""
+
+
+def now_ms() -> int:
+    """Current time in epoch milliseconds."""
+    return int(time.time() * 1000)
+
+
+class LabelDictionary:
+    """Dictionary encoding of label sets to small integer codes."""
+
+    def __init__(self):
+        """Initialize an empty dictionary."""
+        self._codes: Dict[LabelSet, int] = {}
+        self._labels: List[Dict[str, str]] = []
+
+    def encode(self, labels: Mapping[str, str]) -> int:
+        """Return the code of a label set, assigning one if new."""
+        key = tuple(sorted(labels.items()))
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self._labels)
+            self._labels.append(dict(key))
+        return code
+
+    def decode(self, code: int) -> Dict[str, str]:
+        """Return the label set of a code."""
+        return self._labels[code]
+
+    def matching(self, matchers: Mapping[str, str]) -> np.ndarray:
+        """Return the codes of label sets containing every matcher."""
+        return np.fromiter(
+            (
+                code
+                for code, labels in enumerate(self._labels)
+                if all(labels.get(name) == value for name, value in matchers.items())
+            ),
+            dtype=np.int32,
+        )
+
+
+class MetricColumns:
+    """
+    Append-optimized columns for one metric.
+    Buffers grow by doubling; out-of-order appends are accepted and sorted
+    lazily before the next read.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """Allocate empty columns."""
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.label_codes = np.empty(capacity, dtype=np.int32)
+        self.size = 0
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray, label_code: int) -> None:
+        """Append samples that share one label set."""
+        count = len(timestamps)
+        if not count:
+            return
+        self._reserve(self.size + count)
+        end = self.size + count
+        if (self.size and timestamps[0] < self.timestamps[self.size - 1]) or (
+            count > 1 and np.any(timestamps[1:] < timestamps[:-1])
+        ):
+            self._sorted = False
+        self.timestamps[self.size:end] = timestamps
+        self.values[self.size:end] = values
+        self.label_codes[self.size:end] = label_code
+        self.size = end
+
+    def window(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return views of the samples with `start <= timestamp <= end`."""
+        self._ensure_sorted()
+        timestamps = self.timestamps[:self.size]
+        lo = np.searchsorted(timestamps, start, side="left")
+        hi = np.searchsorted(timestamps, end, side="right")
+        return timestamps[lo:hi], self.values[lo:hi], self.label_codes[lo:hi]
+
+    def drop_before(self, cutoff: int) -> int:
+        """Drop samples older than `cutoff`; returns how many were dropped."""
+        self._ensure_sorted()
+        dropped = int(np.searchsorted(self.timestamps[:self.size], cutoff, side="left"))
+        if dropped:
+            kept = self.size - dropped
+            for column in (self.timestamps, self.values, self.label_codes):
+                column[:kept] = column[dropped:self.size]
+            self.size = kept
+            if self.size < len(self.timestamps) // 4:
+                self._resize(max(1024, self.size * 2))
+        return dropped
+
+    def _reserve(self, needed: int) -> None:
+        if needed > len(self.timestamps):
+            self._resize(max(needed, len(self.timestamps) * 2))
+
+    def _resize(self, capacity: int) -> None:
+        for name in ("timestamps", "values", "label_codes"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _ensure_sorted(self) -> None:
+        if self._sorted:
+            return
+        order = np.argsort(self.timestamps[:self.size], kind="stable")
+        for column in (self.timestamps, self.values, self.label_codes):
+            column[:self.size] = column[:self.size][order]
+        self._sorted = True
+
+
+def downsample(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    label_codes: np.ndarray,
+    start: int,
+    end: int,
+    step: int,
+    aggregations: Sequence[str],
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Aggregate samples into `step`-wide buckets per series.
+
+    Returns the series code and bucket start of every non-empty bucket,
+    ordered by series then time, and one array per aggregation.
+    """
+    if len(timestamps) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, {
+            aggregation: np.empty(0, dtype=np.int64 if aggregation == "count" else np.float64)
+            for aggregation in aggregations
+        }
+    bucket_count = (end - start) // step + 1
+    keys = label_codes.astype(np.int64) * bucket_count + (timestamps - start) // step
+    # Sort by bucket, then by value inside each bucket, so min, max and
+    # percentiles become index lookups
+    order = np.lexsort((values, keys))
+    keys = keys[order]
+    values = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(starts, len(keys)))
+
+    results: Dict[str, np.ndarray] = {}
+    for aggregation in aggregations:
+        if aggregation == "min":
+            results[aggregation] = values[starts]
+        elif aggregation == "max":
+            results[aggregation] = values[starts + counts - 1]
+        elif aggregation == "sum":
+            results[aggregation] = np.add.reduceat(values, starts)
+        elif aggregation == "avg":
+            results[aggregation] = np.add.reduceat(values, starts) / counts
+        elif aggregation == "count":
+            results[aggregation] = counts
+        elif aggregation == "p95":
+            # Nearest-rank percentile
+            ranks = np.ceil(0.95 * counts).astype(np.int64) - 1
+            results[aggregation] = values[starts + ranks]
+    bucket_keys = keys[starts]
+    return (
+        bucket_keys // bucket_count,
+        start + (bucket_keys % bucket_count) * step,
+        results,
+    )
+
+
+class TimeSeriesStore:
+    """
+    Per-org metric store.
+    Samples older than the retention window are compacted away on append,
+    once they exceed a tenth of the window, so no background task is
+    needed.
+    """
+
+    def __init__(self, retention_seconds: float, max_buckets: int):
+        """
+        Args:
+            retention_seconds: How long samples are kept.
+            max_buckets: Upper bound on buckets per series in one query.
+        """
+        self.retention_ms = int(retention_seconds * 1000)
+        self.max_buckets = max_buckets
+        self._metrics: Dict[str, Dict[str, MetricColumns]] = {}
+        self._labels: Dict[str, LabelDictionary] = {}
+
+    def append(
+        self,
+        org_id: str,
+        metric_name: str,
+        timestamps: Iterable[int],
+        values: Iterable[float],
+        labels: Optional[Mapping[str, str]] = None,
+    ) -> int:
+        """Append samples (epoch-ms timestamps) sharing one label set."""
+        timestamp_column = np.asarray(timestamps, dtype=np.int64)
+        value_column = np.asarray(values, dtype=np.float64)
+        if timestamp_column.shape != value_column.shape or timestamp_column.ndim != 1:
+            raise InvalidQueryError("timestamps and values must be equal-length lists")
+        if not np.all(np.isfinite(value_column)):
+            raise InvalidQueryError("values must be finite numbers")
+
+        cutoff = now_ms() - self.retention_ms
+        keep = timestamp_column >= cutoff
+        if not np.all(keep):
+            timestamp_column = timestamp_column[keep]
+            value_column = value_column[keep]
+
+        label_code = self._labels.setdefault(org_id, LabelDictionary()).encode(labels or {})
+        columns = self._metrics.setdefault(org_id, {}).get(metric_name)
+        if columns is None:
+            columns = self._metrics[org_id][metric_name] = MetricColumns()
+        columns.append(timestamp_column, value_column, label_code)
+
+        if columns.size and columns.timestamps[0] < cutoff - self.retention_ms // 10:
+            columns.drop_before(cutoff)
+        return len(timestamp_column)
+
+    def metric_names(self, org_id: str) -> List[str]:
+        """List the metrics recorded for an org."""
+        return sorted(self._metrics.get(org_id, {}))
+
+    def compact(self) -> int:
+        """Drop every sample outside the retention window."""
+        return self.drop_before(now_ms() - self.retention_ms)
+
+    def drop_before(self, cutoff: int) -> int:
+        """Drop every org's samples older than `cutoff` (epoch ms)."""
+        return sum(
+            columns.drop_before(cutoff)
+            for metrics in self._metrics.values()
+            for columns in metrics.values()
+        )
+
+    def query_json(
+        self,
+        org_id: str,
+        metric_name: str,
+        start: int,
+        end: int,
+        step: Optional[int] = None,
+        aggregations: Sequence[str] = ("avg",),
+        matchers: Optional[Mapping[str, str]] = None,
+    ) -> bytes:
+        """
+        Run a range query and serialize the result as JSON.
+
+        The response holds one entry per series with parallel
+        `timestamps` and value arrays: raw `values` without a step, or one
+        array per aggregation with a step (in milliseconds).
+        """
+        if end < start:
+            raise InvalidQueryError("end must not be before start")
+        unknown = set(aggregations) - set(AGGREGATIONS)
+        if unknown:
+            raise InvalidQueryError(f"Unknown aggregations: {', '.join(sorted(unknown))}")
+        if step is not None and (end - start) // step + 1 > self.max_buckets:
+            raise InvalidQueryError(f"Queries are limited to {self.max_buckets} buckets")
+
+        series: List[dict] = []
+        columns = self._metrics.get(org_id, {}).get(metric_name)
+        if columns is not None:
+            dictionary = self._labels[org_id]
+            timestamps, values, codes = columns.window(start, end)
+            if matchers:
+                mask = np.isin(codes, dictionary.matching(matchers))
+                timestamps, values, codes = timestamps[mask], values[mask], codes[mask]
+
+            if step is None:
+                order = np.argsort(codes, kind="stable")
+                series_codes = codes[order]
+                columns_out = {"values": values[order]}
+                timestamps = timestamps[order]
+            else:
+                series_codes, timestamps, columns_out = downsample(
+                    timestamps, values, codes, start, end, step, aggregations
+                )
+
+            boundaries = np.flatnonzero(
+                np.concatenate(([True], series_codes[1:] != series_codes[:-1]))
+            ) if len(series_codes) else np.empty(0, dtype=np.int64)
+            ends = np.append(boundaries[1:], len(series_codes))
+            for lo, hi in zip(boundaries.tolist(), ends.tolist()):
+                entry = {
+                    "labels": dictionary.decode(int(series_codes[lo])),
+                    "timestamps": timestamps[lo:hi].tolist(),
+                }
+                for name, column in columns_out.items():
+                    entry[name] = column[lo:hi].tolist()
+                series.append(entry)
+
+        return to_json(
+            {
+                "metric_name": metric_name,
+                "start": start,
+                "end": end,
+                "step": step,
+                "series": series,
+            }
+        )
+
+
+# Global store instance
+timeseries_store = TimeSeriesStore(
+    retention_seconds=settings.METRICS_RETENTION_DAYS * 86400,
+    max_buckets=settings.METRICS_MAX_BUCKETS,
+)
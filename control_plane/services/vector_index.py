@@ -0,0 +1,607 @@
+"""
+Local approximate-nearest-neighbor indexes for agent memory.
+Task summaries, episodes and knowledge vectors are searched by cosine
+similarity without a remote vector store, so BYOC installs can run
+without Vertex Vector Search. Indexes are stored per org, namespace and
+optionally agent, in memory-mapped files that are appended to
+incrementally:
+
+- `FlatIndex`: exact search over float16 vectors.
+- `IVFIndex`: inverted-file index over int8-quantized vectors. Vectors are
+  assigned to the nearest of `nlist` spherical k-means centroids and a
+  query scans only the `nprobe` closest lists.
+
+Namespaces with a retention window are split into time partitions, each a
+separate index, so expired memories are removed by deleting directories.
+
+Workers may share an index directory. Appends hold an exclusive `flock` on
+the index's `lock` file, so there is one writer at a time, and a worker
+picks up rows the others appended before its next add or search. `flock`
+is only reliable on local filesystems, so `MEMORY_INDEX_PATH` must not be
+on a network mount.
+"""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+import numpy as np
+
+from control_plane.config import settings
+
+# Rows dequantized per matrix product in exhaustive scans
+SCAN_CHUNK_ROWS = 16384
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class VectorIndexError(ValueError):
+    """Raised for malformed vectors or namespace names."""
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so inner product is cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the `k` highest scores, best first."""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an exclusive, or shared, `flock` on `path` across processes."""
+    with path.open("a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+class MappedArray:
+    """Append-only 2-D array in a memory-mapped file, grown by doubling."""
+
+    def __init__(self, path: Path, dtype: Any, width: int, count: int):
+        """Map `path`, of which the first `count` rows are valid."""
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.count = count
+        self._row_bytes = self.dtype.itemsize * width
+        capacity = path.stat().st_size // self._row_bytes if path.exists() else 0
+        self._map(max(capacity, count, 1024))
+
+    def _map(self, capacity: int) -> None:
+        with self.path.open("ab") as handle:
+            if handle.tell() < capacity * self._row_bytes:
+                handle.truncate(capacity * self._row_bytes)
+        self.array = np.memmap(
+            self.path, dtype=self.dtype, mode="r+", shape=(capacity, self.width)
+        )
+
+    def append(self, rows: np.ndarray) -> None:
+        """Append rows, growing the file when full."""
+        needed = self.count + len(rows)
+        if needed > len(self.array):
+            self.array.flush()
+            self._map(max(needed, 2 * len(self.array)))
+        self.array[self.count:needed] = rows
+        self.count = needed
+
+    def sync(self, count: int) -> None:
+        """Adopt rows up to `count` that another process appended."""
+        if count > len(self.array):
+            self._map(max(count, self.path.stat().st_size // self._row_bytes))
+        self.count = count
+
+    def view(self) -> np.ndarray:
+        """The valid rows."""
+        return self.array[:self.count]
+
+    def flush(self) -> None:
+        """Write dirty pages to disk."""
+        self.array.flush()
+
+
+class VectorIndex:
+    """
+    Base class for a namespace's index.
+
+    Rows are identified by caller-supplied ids, kept with their metadata in
+    `records.jsonl`. Adding an id again supersedes the earlier row. The
+    records file is written after the vectors, so its length is the number
+    of complete rows after a crash, and also the number other workers may
+    read while an append is under way.
+    """
+
+    def __init__(self, path: Path, dim: int):
+        """Open or create the index stored in directory `path`."""
+        self.path = path
+        self.dim = dim
+        path.mkdir(parents=True, exist_ok=True)
+        self._records_path = path / "records.jsonl"
+        self._lock_path = path / "lock"
+        self._records_size = 0
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._latest: Dict[str, int] = {}
+        with file_lock(self._lock_path):
+            self._read_records()
+            self._open_files()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        """Append vectors under `ids`."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim or len(vectors) != len(ids):
+            raise VectorIndexError(f"Expected {len(ids)} vectors of dimension {self.dim}")
+        metadata = metadata or [{}] * len(ids)
+        lines = "".join(
+            json.dumps({"id": row_id, "metadata": meta}) + "\n"
+            for row_id, meta in zip(ids, metadata)
+        ).encode()
+        with self._lock, file_lock(self._lock_path):
+            self._sync()
+            self._append(normalize(vectors))
+            start = len(self.ids)
+            with self._records_path.open("ab") as records:
+                # Drop a torn write
+                records.truncate(self._records_size)
+                records.write(lines)
+            self._records_size += len(lines)
+            self.ids.extend(ids)
+            self.metadata.extend(metadata)
+            for offset, row_id in enumerate(ids):
+                self._latest[row_id] = start + offset
+
+    def search(
+        self, query: np.ndarray, k: int, threshold: float = -1.0
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Return up to `k` (id, cosine similarity, metadata) at or above `threshold`."""
+        query = np.asarray(query, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise VectorIndexError(f"Expected a vector of dimension {self.dim}")
+        query = normalize(query)
+        with self._lock:
+            if self._stale():
+                with file_lock(self._lock_path, shared=True):
+                    self._sync()
+            # Over-fetch so superseded rows can be dropped
+            rows, scores = self._search(query, k + min(k, len(self.ids) - len(self._latest)))
+            matches = []
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                if score < threshold or len(matches) == k:
+                    break
+                row_id = self.ids[row]
+                if self._latest.get(row_id) == row:
+                    matches.append((row_id, score, self.metadata[row]))
+        return matches
+
+    def _read_records(self) -> None:
+        """Load the records appended since the last read."""
+        if not self._records_path.exists():
+            return
+        with self._records_path.open("rb") as records:
+            records.seek(self._records_size)
+            # The last piece is empty or a record still being written
+            lines = records.read().split(b"\n")[:-1]
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # Torn write
+            self._latest[record["id"]] = len(self.ids)
+            self.ids.append(record["id"])
+            self.metadata.append(record.get("metadata") or {})
+            self._records_size += len(line) + 1
+
+    def _stale(self) -> bool:
+        """Whether the records file has grown since the last read."""
+        try:
+            return self._records_path.stat().st_size > self._records_size
+        except FileNotFoundError:
+            return False
+
+    def _sync(self) -> None:
+        """Pick up rows other workers appended; call with the file lock held."""
+        start = len(self.ids)
+        self._read_records()
+        if len(self.ids) > start:
+            self._adopt(start)
+
+    def _open_files(self) -> None:
+        """Map the vector files for the rows read from `records.jsonl`."""
+        raise NotImplementedError
+
+    def _adopt(self, start: int) -> None:
+        """Extend the vector files to rows another worker appended from `start`."""
+        raise NotImplementedError
+
+    def _append(self, vectors: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best `k` rows and their scores, best first."""
+        raise NotImplementedError
+
+
+class FlatIndex(VectorIndex):
+    """Exact search over float16 vectors."""
+
+    def _open_files(self) -> None:
+        self.vectors = MappedArray(self.path / "vectors.f16", np.float16, self.dim, len(self.ids))
+
+    def _adopt(self, start: int) -> None:
+        self.vectors.sync(len(self.ids))
+
+    def _append(self, vectors: np.ndarray) -> None:
+        self.vectors.append(vectors.astype(np.float16))
+        self.vectors.flush()
+
+    def _search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = self.vectors.view()
+        scores = np.empty(len(vectors), dtype=np.float32)
+        # NumPy has no BLAS path for float16, so scan in float32 chunks
+        for start in range(0, len(vectors), SCAN_CHUNK_ROWS):
+            chunk = vectors[start:start + SCAN_CHUNK_ROWS].astype(np.float32)
+            scores[start:start + len(chunk)] = chunk @ query
+        best = top_k(scores, k)
+        return best, scores[best]
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index over int8 vectors.
+    Each vector is stored as int8 codes plus a float32 scale. Until
+    `train_size` vectors have arrived, searches scan everything; then
+    centroids are trained with spherical k-means, existing rows are
+    assigned to lists, and later rows are assigned as they are added.
+    """
+
+    def __init__(self, path: Path, dim: int, nlist: int, nprobe: int, train_size: int):
+        """
+        Args:
+            path: Directory holding the index files.
+            dim: Vector dimension.
+            nlist: Number of inverted lists.
+            nprobe: Lists scanned per query.
+            train_size: Vectors to collect before training centroids.
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = max(train_size, nlist)
+        self._centroids_path = path / "centroids.npy"
+        self.centroids: Optional[np.ndarray] = None
+        self._members: List[List[np.ndarray]] = []
+        super().__init__(path, dim)
+
+    def _open_files(self) -> None:
+        count = len(self.ids)
+        self.codes = MappedArray(self.path / "codes.i8", np.int8, self.dim, count)
+        self.scales = MappedArray(self.path / "scales.f32", np.float32, 1, count)
+        self.assignments = MappedArray(self.path / "lists.i32", np.int32, 1, count)
+        if self._centroids_path.exists():
+            self.centroids = np.load(self._centroids_path)
+            self._rebuild_lists()
+
+    def _adopt(self, start: int) -> None:
+        count = len(self.ids)
+        for column in (self.codes, self.scales, self.assignments):
+            column.sync(count)
+        if self.centroids is None:
+            # Another worker may have trained while appending these rows
+            if self._centroids_path.exists():
+                self.centroids = np.load(self._centroids_path)
+                self._rebuild_lists()
+        else:
+            self._add_members(self.assignments.view()[start:count, 0], start)
+
+    def _append(self, vectors: np.ndarray) -> None:
+        scales = np.abs(vectors).max(axis=1, keepdims=True) / 127
+        scales[scales == 0] = 1
+        start = self.codes.count
+        self.codes.append(np.rint(vectors / scales).astype(np.int8))
+        self.scales.append(scales.astype(np.float32))
+        if self.centroids is None:
+            self.assignments.append(np.full((len(vectors), 1), -1, dtype=np.int32))
+        else:
+            lists = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+            self.assignments.append(lists[:, None])
+            self._add_members(lists, start)
+        for column in (self.codes, self.scales, self.assignments):
+            column.flush()
+        if self.centroids is None and self.codes.count >= self.train_size:
+            self._train()
+
+    def _dequantize(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = self.codes.view() if rows is None else self.codes.view()[rows]
+        scales = self.scales.view() if rows is None else self.scales.view()[rows]
+        return codes.astype(np.float32) * scales
+
+    def _scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Scale after the product: one multiply per row instead of per element
+        codes = self.codes.view()[rows].astype(np.float32)
+        return (codes @ query) * self.scales.view()[rows, 0]
+
+    def _train(self, iterations: int = 10) -> None:
+        """Fit centroids on a sample with spherical k-means and assign every row."""
+        rng = np.random.default_rng(0)
+        count = self.codes.count
+        sample_rows = np.sort(rng.choice(count, min(count, self.nlist * 64), replace=False))
+        sample = normalize(self._dequantize(sample_rows))
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)]
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            empty = ~np.any(sums, axis=1)
+            # Reseed empty lists with random sample points
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize(sums)
+        self.centroids = centroids.astype(np.float32)
+
+        assignments = np.empty(count, dtype=np.int32)
+        for start in range(0, count, SCAN_CHUNK_ROWS):
+            rows = np.arange(start, min(start + SCAN_CHUNK_ROWS, count))
+            assignments[rows] = np.argmax(self._dequantize(rows) @ self.centroids.T, axis=1)
+        self.assignments.view()[:, 0] = assignments
+        self.assignments.flush()
+        # Replaced whole, so other workers never load a partial file
+        partial = self.path / "centroids.npy.partial"
+        with partial.open("wb") as handle:
+            np.save(handle, self.centroids)
+        os.replace(partial, self._centroids_path)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        lists = self.assignments.view()[:, 0]
+        order = np.argsort(lists, kind="stable")
+        bounds = np.searchsorted(lists[order], np.arange(self.nlist + 1))
+        self._members = [[order[bounds[i]:bounds[i + 1]]] for i in range(self.nlist)]
+
+    def _add_members(self, lists: np.ndarray, start: int) -> None:
+        rows = np.arange(start, start + len(lists))
+        for list_id in np.unique(lists).tolist():
+            self._members[list_id].append(rows[lists == list_id])
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        chunks = self._members[list_id]
+        if len(chunks) > 1:
+            # Compact incremental appends on first read
+            chunks[:] = [np.concatenate(chunks)]
+        return chunks[0]
+
+    def _search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.centroids is None:
+            scores = np.empty(self.codes.count, dtype=np.float32)
+            for start in range(0, self.codes.count, SCAN_CHUNK_ROWS):
+                rows = np.arange(start, min(start + SCAN_CHUNK_ROWS, self.codes.count))
+                scores[rows] = self._scores(rows, query)
+            best = top_k(scores, k)
+            return best, scores[best]
+
+        probes = top_k(self.centroids @ query, self.nprobe)
+        rows = np.concatenate([self._list_rows(list_id) for list_id in probes.tolist()])
+        if not len(rows):
+            return rows, np.empty(0, dtype=np.float32)
+        rows.sort()  # Sequential reads from the mapped files
+        scores = self._scores(rows, query)
+        best = top_k(scores, k)
+        return rows[best], scores[best]
+
+
+INDEX_BACKENDS: Dict[str, Type[VectorIndex]] = {"flat": FlatIndex, "ivf": IVFIndex}
+
+
+class PartitionedIndex:
+    """
+    A namespace's index split into partitions of `partition_days` days.
+    Each partition is an index in `{path}/{first day}/`; vectors are added
+    to the current partition and searches merge every partition's hits,
+    skipping ids re-added to a newer partition. Partitions are opened on
+    first search, so dropping old ones never loads them. Each search
+    re-lists the directory, picking up partitions other workers created or
+    dropped.
+    """
+
+    def __init__(self, path: Path, open_index: Callable[[Path], VectorIndex], partition_days: int):
+        """
+        Args:
+            path: Directory holding one subdirectory per partition.
+            open_index: Opens or creates a partition's index.
+            partition_days: Days covered by each partition.
+        """
+        self.path = path
+        self.open_index = open_index
+        self.partition_days = partition_days
+        self._names = self._scan()
+        self._open: Dict[str, VectorIndex] = {}
+        self._lock = threading.Lock()
+
+    def _scan(self) -> List[str]:
+        """Partition names on disk, newest first."""
+        if not self.path.exists():
+            return []
+        return sorted((child.name for child in self.path.iterdir() if child.is_dir()), reverse=True)
+
+    def _partition(self, name: str) -> VectorIndex:
+        """Open a partition, creating it if needed."""
+        with self._lock:
+            index = self._open.get(name)
+            if index is None:
+                index = self._open[name] = self.open_index(self.path / name)
+                if name not in self._names:
+                    self._names = sorted(self._names + [name], reverse=True)
+        return index
+
+    def _partitions(self) -> List[VectorIndex]:
+        """Every partition, newest first."""
+        with self._lock:
+            self._names = self._scan()
+            for name in list(self._open):
+                if name not in self._names:
+                    del self._open[name]
+            for name in self._names:
+                if name not in self._open:
+                    self._open[name] = self.open_index(self.path / name)
+            return [self._open[name] for name in self._names]
+
+    def partition_start(self, day: date) -> date:
+        """First day of the partition holding `day`."""
+        ordinal = day.toordinal()
+        return date.fromordinal(ordinal - ordinal % self.partition_days)
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._partitions())
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        """Append vectors under `ids` to the current partition."""
+        name = self.partition_start(datetime.utcnow().date()).isoformat()
+        self._partition(name).add(ids, vectors, metadata)
+
+    def search(
+        self, query: np.ndarray, k: int, threshold: float = -1.0
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Return up to `k` (id, cosine similarity, metadata) at or above `threshold`."""
+        matches = []
+        newer: List[VectorIndex] = []
+        for index in self._partitions():
+            for match in index.search(query, k, threshold):
+                if not any(match[0] in partition._latest for partition in newer):
+                    matches.append(match)
+            newer.append(index)
+        matches.sort(key=lambda match: -match[1])
+        return matches[:k]
+
+    def drop_before(self, day: date) -> int:
+        """Delete partitions that end on or before `day`; returns how many."""
+        cutoff = (day - timedelta(days=self.partition_days)).isoformat()
+        with self._lock:
+            expired = [name for name in self._names if name <= cutoff]
+            self._names = [name for name in self._names if name > cutoff]
+            for name in expired:
+                self._open.pop(name, None)
+        for name in expired:
+            shutil.rmtree(self.path / name, ignore_errors=True)
+        return len(expired)
+
+    def oldest(self) -> Optional[date]:
+        """First day of the oldest partition, or None."""
+        return date.fromisoformat(self._names[-1]) if self._names else None
+
+
+class MemoryIndexes:
+    """
+    Opens indexes lazily per org, namespace and optional agent.
+    Layout: `{root}/{org_id}/{namespace}/{agent_id or _org}/`.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        dim: int,
+        backend: str,
+        partitioned: Sequence[str] = (),
+        partition_days: int = 7,
+    ):
+        """
+        Args:
+            root: Directory holding every org's indexes.
+            dim: Embedding dimension.
+            backend: "ivf" or "flat".
+            partitioned: Namespaces split into time partitions for retention.
+            partition_days: Days covered by each partition.
+        """
+        if backend not in INDEX_BACKENDS:
+            raise ValueError(f"Unknown memory index backend: {backend}")
+        self.root = Path(root)
+        self.dim = dim
+        self.backend = backend
+        self.partitioned = set(partitioned)
+        self.partition_days = partition_days
+        self._indexes: Dict[Tuple[str, str, str], Union[VectorIndex, PartitionedIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, org_id: str, namespace: str, agent_id: Optional[str] = None
+    ) -> Union[VectorIndex, PartitionedIndex]:
+        """Return a namespace's index, creating it on first use."""
+        key = (org_id, namespace, agent_id or "_org")
+        for part in key[:2] + ((agent_id,) if agent_id else ()):
+            if not _NAME.match(part):
+                raise VectorIndexError(f"Invalid name: {part}")
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                path = self.root.joinpath(*key)
+                if namespace in self.partitioned:
+                    index = PartitionedIndex(path, self._open, self.partition_days)
+                else:
+                    index = self._open(path)
+                self._indexes[key] = index
+        return index
+
+    def _partitioned(self, namespace: str) -> List[PartitionedIndex]:
+        """Every org's and agent's index of a partitioned namespace."""
+        if namespace not in self.partitioned:
+            raise ValueError(f"Namespace is not partitioned: {namespace}")
+        indexes = []
+        for path in self.root.glob(f"*/{namespace}/*"):
+            org_id, _, scope = path.relative_to(self.root).parts
+            indexes.append(self.get(org_id, namespace, None if scope == "_org" else scope))
+        return indexes
+
+    def drop_before(self, namespace: str, day: date) -> int:
+        """Delete a namespace's partitions that end on or before `day`."""
+        return sum(index.drop_before(day) for index in self._partitioned(namespace))
+
+    def oldest(self, namespace: str) -> Optional[date]:
+        """First day of a namespace's oldest partition, or None."""
+        return min(
+            (day for index in self._partitioned(namespace) if (day := index.oldest())),
+            default=None,
+        )
+
+    def _open(self, path: Path) -> VectorIndex:
+        if self.backend == "ivf":
+            return IVFIndex(
+                path,
+                self.dim,
+                nlist=settings.MEMORY_IVF_LISTS,
+                nprobe=settings.MEMORY_IVF_PROBES,
+                train_size=settings.MEMORY_IVF_TRAIN_SIZE,
+            )
+        return INDEX_BACKENDS[self.backend](path, self.dim)
+
+
+# Global index registry
+memory_indexes = MemoryIndexes(
+    root=settings.MEMORY_INDEX_PATH,
+    dim=settings.MEMORY_EMBEDDING_DIM,
+    backend=settings.MEMORY_INDEX_BACKEND,
+    partitioned=(settings.TASK_MEMORY_NAMESPACE, settings.EPISODE_MEMORY_NAMESPACE),
+    partition_days=settings.MEMORY_PARTITION_DAYS,
+)
@@ -0,0 +1,60 @@
+"""
+Webhook subscription service.
+Orgs register endpoints for platform events; deliveries are staged and
+sent by the outbox dispatcher.
+"""
+
+import secrets
+import uuid
+from typing import List
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from control_plane.config import settings
+from control_plane.models import WebhookSubscription
+from control_plane.schemas import WebhookCreate
+from control_plane.services.outbox import check_destination
+
+
+async def create_webhook(
+    session: AsyncSession, org_id: str, request: WebhookCreate
+) -> WebhookSubscription:
+    """
+    Subscribe an endpoint; a signing secret is generated when none is given.
+    Raises `DestinationNotAllowedError` for endpoints on non-public addresses.
+    """
+    if not settings.WEBHOOK_ALLOW_PRIVATE_DESTINATIONS:
+        await check_destination(str(request.url))
+    webhook = WebhookSubscription(
+        webhook_id=f"wh-{uuid.uuid4().hex}",
+        org_id=org_id,
+        url=str(request.url),
+        events=list(dict.fromkeys(request.events)),
+        secret=request.secret or secrets.token_hex(32),
+    )
+    session.add(webhook)
+    await session.commit()
+    return webhook
+
+
+async def list_webhooks(session: AsyncSession, org_id: str) -> List[WebhookSubscription]:
+    """An org's subscriptions, oldest first."""
+    result = await session.execute(
+        select(WebhookSubscription)
+        .where(WebhookSubscription.org_id == org_id)
+        .order_by(WebhookSubscription.id)
+    )
+    return list(result.scalars().all())
+
+
+async def delete_webhook(session: AsyncSession, org_id: str, webhook_id: str) -> bool:
+    """Unsubscribe; events already staged are still delivered."""
+    result = await session.execute(
+        delete(WebhookSubscription).where(
+            WebhookSubscription.org_id == org_id,
+            WebhookSubscription.webhook_id == webhook_id,
+        )
+    )
+    await session.commit()
+    return result.rowcount > 0
@@ -0,0 +1,143 @@
+"""
+Startup profiling.
+With `CONTROL_PLANE_STARTUP_PROFILE=1` in the environment, the
+`control_plane` package installs an import timer as it loads, before
+anything else of ours is imported. Startup then logs the slowest modules
+by their own import time, and the first request served logs how long
+after the package import it completed.
+"""
+
+import importlib.abc
+import logging
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("CONTROL_PLANE_STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+class _TimedLoader:
+    """Delegates to a module loader, timing `exec_module`."""
+
+    def __init__(self, loader, timer: "ImportTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self._timer.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.leave(module.__name__)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Times every module imported after `install`. A module's self time
+    excludes the modules it imported; its total time includes them.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (self seconds, total seconds) per module
+        self.times: Dict[str, Tuple[float, float]] = {}
+        self._stack: List[List[float]] = []
+        self._finding = False
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if self._finding:
+            return None
+        # Let the remaining finders resolve it, then wrap the loader
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def enter(self) -> None:
+        # [start, seconds spent in nested imports]
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def leave(self, name: str) -> None:
+        started, nested = self._stack.pop()
+        total = time.perf_counter() - started
+        self.times[name] = (total - nested, total)
+        if self._stack:
+            self._stack[-1][1] += total
+
+    def elapsed(self) -> float:
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self.started
+
+    def slowest(self, limit: int) -> List[Tuple[str, float, float]]:
+        """The `limit` modules with the most self time: (name, self, total)."""
+        ranked = sorted(self.times.items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, own, total) for name, (own, total) in ranked[:limit]]
+
+    def report(self, limit: int = 25) -> None:
+        """Log the slowest modules and overall time since the package import."""
+        lines = [
+            f"{own * 1000:9.1f} {total * 1000:9.1f}  {name}"
+            for name, own, total in self.slowest(limit)
+        ]
+        logger.info(
+            "Startup took %.3fs after the control_plane import; %d modules imported. "
+            "Slowest by self time (ms self, ms total):\n%s",
+            self.elapsed(),
+            len(self.times),
+            "\n".join(lines),
+        )
+
+
+class FirstRequestProbe:
+    """ASGI middleware that logs when the first HTTP response completes."""
+
+    def __init__(self, app: "ASGIApp", timer: ImportTimer) -> None:
+        self.app = app
+        self.timer = timer
+        self.reported = False
+
+    async def __call__(self, scope: "Scope", receive: "Receive", send: "Send") -> None:
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and not self.reported:
+            self.reported = True
+            logger.info(
+                "First request (%s %s) served %.3fs after the control_plane import",
+                scope["method"],
+                scope["path"],
+                self.timer.elapsed(),
+            )
+
+
+# Installed by `control_plane/__init__.py` when profiling is enabled
+import_timer: Optional[ImportTimer] = ImportTimer() if ENABLED else None
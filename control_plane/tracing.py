@@ -0,0 +1,305 @@
+"""
+Trace sampling and span export pipeline.
+Imported by `observability.setup_tracing` only when tracing is enabled.
+
+Sampling happens in two stages:
+- Head: `RouteSampler` follows a sampled parent, applies per-route ratios
+  (health checks are never sampled) and otherwise a trace-id ratio.
+- Tail: traces the head sampler passed over are still recorded and held
+  by `TailSamplingProcessor` until their local root span ends; the whole
+  trace is kept if any span errored or the root ran slower than the
+  threshold, and discarded otherwise.
+
+Kept spans go through `SpanPipeline`, a bounded queue exported in batches
+from one thread, which counts what it drops instead of blocking requests.
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Sequence, Set
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import Link, SpanKind, StatusCode, get_current_span
+from opentelemetry.util.types import Attributes
+
+from control_plane.observability import metrics_instance
+
+logger = logging.getLogger(__name__)
+
+
+class SpanPipeline(SpanProcessor):
+    """
+    Bounded queue in front of an exporter.
+    Spans are exported by a worker thread once `max_batch_size` are queued
+    or `schedule_delay_seconds` have passed; when the queue is full new
+    spans are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int,
+        max_batch_size: int,
+        schedule_delay_seconds: float,
+    ):
+        """
+        Args:
+            exporter: Backend the batches are sent to.
+            max_queue_size: Spans held before new ones are dropped.
+            max_batch_size: Spans per export call.
+            schedule_delay_seconds: Longest a span waits for a batch to fill.
+        """
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.schedule_delay_seconds = schedule_delay_seconds
+        self._queue: Deque[ReadableSpan] = collections.deque()
+        self._condition = threading.Condition()
+        # Exporters aren't required to be thread-safe
+        self._export_lock = threading.Lock()
+        self._shutdown = False
+        self._worker = threading.Thread(target=self._run, name="SpanPipeline", daemon=True)
+        self._worker.start()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context.trace_flags.sampled:
+            self.enqueue([span])
+
+    def enqueue(self, spans: Sequence[ReadableSpan]) -> None:
+        """Queue spans for export, dropping what doesn't fit."""
+        with self._condition:
+            if self._shutdown:
+                return
+            room = self.max_queue_size - len(self._queue)
+            if room < len(spans):
+                metrics_instance.trace_spans_dropped_total.labels(reason="queue_full").inc(
+                    len(spans) - max(room, 0)
+                )
+                spans = spans[:max(room, 0)]
+            self._queue.extend(spans)
+            if len(self._queue) >= self.max_batch_size:
+                self._condition.notify()
+
+    def _take(self) -> List[ReadableSpan]:
+        count = min(len(self._queue), self.max_batch_size)
+        batch = [self._queue.popleft() for _ in range(count)]
+        metrics_instance.trace_queue_depth.set(len(self._queue))
+        return batch
+
+    def _export(self, batch: List[ReadableSpan]) -> None:
+        with self._export_lock:
+            try:
+                result = self.exporter.export(batch)
+            except Exception:
+                logger.exception("Span export failed")
+                result = SpanExportResult.FAILURE
+        if result == SpanExportResult.SUCCESS:
+            metrics_instance.trace_spans_exported_total.inc(len(batch))
+        else:
+            metrics_instance.trace_spans_dropped_total.labels(reason="export_failed").inc(len(batch))
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if len(self._queue) < self.max_batch_size and not self._shutdown:
+                    self._condition.wait(self.schedule_delay_seconds)
+                batch = self._take()
+                done = self._shutdown and not self._queue
+            if batch:
+                self._export(batch)
+            if done:
+                return
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        deadline = time.monotonic() + timeout_millis / 1000
+        while time.monotonic() < deadline:
+            with self._condition:
+                batch = self._take()
+            if not batch:
+                return True
+            self._export(batch)
+        return False
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify()
+        self._worker.join(self.schedule_delay_seconds + 30)
+        self.exporter.shutdown()
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Buffers traces the head sampler didn't sample, from local root start to
+    local root end, then keeps them if they errored or were slow. At most
+    `max_traces` are buffered; the oldest are evicted and counted. A trace
+    holds at most `max_spans_per_trace` spans besides its root; later ones
+    are dropped and counted, though an error among them still keeps the
+    trace.
+    """
+
+    def __init__(
+        self,
+        pipeline: SpanPipeline,
+        keep_errors: bool,
+        slow_seconds: float,
+        max_traces: int,
+        max_spans_per_trace: int,
+    ):
+        """
+        Args:
+            pipeline: Where sampled and kept spans are sent.
+            keep_errors: Keep traces with a span whose status is ERROR.
+            slow_seconds: Keep traces whose root took at least this long; 0 disables.
+            max_traces: Traces buffered at once.
+            max_spans_per_trace: Spans buffered per trace, besides the root.
+        """
+        self.pipeline = pipeline
+        self.keep_errors = keep_errors
+        self.slow_ns = int(slow_seconds * 1e9) if slow_seconds > 0 else None
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "collections.OrderedDict[int, List[ReadableSpan]]" = collections.OrderedDict()
+        # Buffered traces with an error among their dropped overflow spans
+        self._overflow_errors: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def is_buffering(self, trace_id: int) -> bool:
+        """Whether a local root of this trace is being held for a decision."""
+        return trace_id in self._traces
+
+    @staticmethod
+    def _is_local_root(span: ReadableSpan) -> bool:
+        return span.parent is None or span.parent.is_remote
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        if span.context.trace_flags.sampled or not self._is_local_root(span):
+            return
+        evicted = 0
+        with self._lock:
+            self._traces[span.context.trace_id] = []
+            while len(self._traces) > self.max_traces:
+                trace_id, spans = self._traces.popitem(last=False)
+                self._overflow_errors.discard(trace_id)
+                evicted += len(spans) or 1
+        if evicted:
+            metrics_instance.trace_spans_dropped_total.labels(reason="tail_evicted").inc(evicted)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context.trace_flags.sampled:
+            self.pipeline.enqueue([span])
+            return
+        trace_id = span.context.trace_id
+        root = self._is_local_root(span)
+        overflow = False
+        with self._lock:
+            spans = self._traces.pop(trace_id, None) if root else self._traces.get(trace_id)
+            if spans is None:
+                return
+            if root:
+                spans.append(span)
+                overflow_error = trace_id in self._overflow_errors
+                self._overflow_errors.discard(trace_id)
+            elif len(spans) < self.max_spans_per_trace:
+                spans.append(span)
+            else:
+                overflow = True
+                if span.status.status_code == StatusCode.ERROR:
+                    self._overflow_errors.add(trace_id)
+        if overflow:
+            metrics_instance.trace_spans_dropped_total.labels(reason="tail_overflow").inc()
+        if not root:
+            return
+
+        decision = "discarded"
+        if self.keep_errors and (
+            overflow_error or any(s.status.status_code == StatusCode.ERROR for s in spans)
+        ):
+            decision = "error"
+        elif self.slow_ns is not None and span.end_time - span.start_time >= self.slow_ns:
+            decision = "slow"
+        metrics_instance.trace_tail_decisions_total.labels(decision=decision).inc()
+        if decision != "discarded":
+            self.pipeline.enqueue(spans)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.pipeline.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self.pipeline.shutdown()
+
+
+class RouteSampler(Sampler):
+    """
+    Parent-based head sampler with per-route ratios.
+    A sampled parent is followed. A new trace is sampled at the ratio for
+    its `http.target`, or the default ratio; a ratio of 0 drops the trace
+    outright. Unsampled traces are recorded for the tail processor, when
+    there is one, instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        ratio: float,
+        route_ratios: Dict[str, float],
+        tail: Optional[TailSamplingProcessor] = None,
+    ):
+        self.default = TraceIdRatioBased(ratio)
+        self.routes = {route: TraceIdRatioBased(value) for route, value in route_ratios.items()}
+        self.tail = tail
+        self._unsampled = Decision.RECORD_ONLY if tail is not None else Decision.DROP
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state=None,
+    ) -> SamplingResult:
+        parent = get_current_span(parent_context).get_span_context()
+        parent_state = parent.trace_state if parent.is_valid else None
+        sampled = None
+        if parent.is_valid:
+            if parent.trace_flags.sampled:
+                return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, parent_state)
+            if not parent.is_remote:
+                # A child of an unsampled local span: record it only while
+                # its trace is buffered, so it can still be kept
+                buffered = self.tail is not None and self.tail.is_buffering(trace_id)
+                return SamplingResult(
+                    Decision.RECORD_ONLY if buffered else Decision.DROP, None, parent_state
+                )
+            # The caller decided not to sample; only the tail can keep it
+            sampled = False
+
+        sampler = self.default
+        route = self.routes.get(attributes.get("http.target")) if attributes else None
+        if route is not None:
+            if route.rate == 0:
+                return SamplingResult(Decision.DROP, None, parent_state)
+            sampler = route
+        if sampled is None:
+            result = sampler.should_sample(parent_context, trace_id, name, kind, attributes, links)
+            sampled = result.decision.is_sampled()
+        if sampled:
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, parent_state)
+        return SamplingResult(self._unsampled, attributes, parent_state)
+
+    def get_description(self) -> str:
+        return f"RouteSampler{{{self.default.rate}, routes={len(self.routes)}}}"
@@ -0,0 +1,43 @@
+"""Tests for the in-memory metric store."""
+
+import json
+
+import numpy as np
+
+from control_plane.services.timeseries import AGGREGATIONS, TimeSeriesStore, downsample, now_ms
+
+
+def test_downsample_empty_window():
+    empty_ints = np.empty(0, dtype=np.int64)
+    codes, starts, results = downsample(
+        empty_ints, np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int32),
+        0, 60000, 1000, AGGREGATIONS,
+    )
+    assert len(codes) == len(starts) == 0
+    assert set(results) == set(AGGREGATIONS)
+    assert all(len(column) == 0 for column in results.values())
+
+
+def test_query_step_over_window_without_samples():
+    store = TimeSeriesStore(retention_seconds=3600, max_buckets=1000)
+    now = now_ms()
+    store.append("org", "latency", [now - 1000, now - 500], [1.0, 3.0])
+    body = json.loads(
+        store.query_json("org", "latency", now - 600000, now - 300000, step=60000, aggregations=AGGREGATIONS)
+    )
+    assert body["series"] == []
+
+
+def test_query_step_aggregates_buckets():
+    store = TimeSeriesStore(retention_seconds=3600, max_buckets=1000)
+    start = now_ms() - 60000
+    store.append("org", "latency", [start, start + 10, start + 1000], [4.0, 2.0, 5.0], {"route": "/a"})
+    body = json.loads(
+        store.query_json("org", "latency", start, start + 1999, step=1000, aggregations=("min", "max", "count"))
+    )
+    [series] = body["series"]
+    assert series["labels"] == {"route": "/a"}
+    assert series["timestamps"] == [start, start + 1000]
+    assert series["min"] == [2.0, 5.0]
+    assert series["max"] == [4.0, 5.0]
+    assert series["count"] == [2, 1]